@@ -0,0 +1,28 @@
+import asyncio
+from typing import Any, Dict, List
+
+from alembic import command
+from alembic.config import Config
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(latencies: List[float]) -> Dict[str, Any]:
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 2),
+    }
+
+
+async def migrate() -> None:
+    # Scratch databases get their schema the same way deployments do.
+    await asyncio.to_thread(command.upgrade, Config("alembic.ini"), "head")
@@ -0,0 +1,130 @@
+"""Disk and egress savings of compressed storage against its CPU cost.
+
+Compresses sample corpora (or the given files) in ``FILE_CHUNK_SIZE``
+chunks, the same way uploads are stored, e.g.::
+
+    python -m benchmarks.compression --files app.log export.csv
+
+For every codec and level the script prints one JSON document with the
+stored size, the share of disk saved (equal to the egress saved for
+clients that send a matching ``Accept-Encoding``) and CPU seconds per GB
+to compress on upload and to decompress for clients that do not.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.config import settings
+from src.config.file import Compression
+from src.storage.compression import compressor, decompressor, zstandard
+
+LEVELS = {Compression.GZIP: [1, 6, 9], Compression.ZSTD: [1, 3, 9]}
+
+
+def json_logs(size: int) -> bytes:
+    levels = ["DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR"]
+    lines = []
+    total = 0
+    for number in range(size):
+        line = json.dumps(
+            {
+                "ts": 1700000000 + number,
+                "level": random.choice(levels),
+                "logger": f"src.services.module{number % 12}",
+                "msg": f"request {number} handled in {random.randint(1, 900)} ms",
+                "user_id": f"user-{random.randint(1, 500)}",
+            }
+        ).encode()
+        lines.append(line)
+        total += len(line) + 1
+        if total >= size:
+            break
+    return b"\n".join(lines)
+
+
+def csv_rows(size: int) -> bytes:
+    rows = [b"id,city,amount,created_at"]
+    total = 0
+    for number in range(size):
+        row = (
+            f"{number},city{random.randint(1, 200)},"
+            f"{random.random() * 1000:.2f},2024-01-{number % 28 + 1:02d}"
+        ).encode()
+        rows.append(row)
+        total += len(row) + 1
+        if total >= size:
+            break
+    return b"\n".join(rows)
+
+
+CORPORA: Dict[str, Callable[[int], bytes]] = {
+    "json_logs": json_logs,
+    "csv": csv_rows,
+    "random": os.urandom,
+}
+
+
+def chunks(data: bytes, size: int) -> List[bytes]:
+    return [data[offset : offset + size] for offset in range(0, len(data), size)]
+
+
+def run(data: bytes, encoding: Compression, level: int) -> Dict[str, Any]:
+    parts = chunks(data, settings.file.chunk_size)
+
+    started = time.process_time()
+    codec = compressor(encoding, level)
+    stored = [codec.compress(part) for part in parts] + [codec.flush()]
+    compress_seconds = time.process_time() - started
+
+    started = time.process_time()
+    codec = decompressor(encoding)
+    restored = b"".join(codec.decompress(part) for part in stored if part)
+    decompress_seconds = time.process_time() - started
+    assert restored == data
+
+    stored_size = sum(len(part) for part in stored)
+    gigabytes = len(data) / 1024**3
+    return {
+        "stored_bytes": stored_size,
+        "ratio": round(len(data) / max(stored_size, 1), 2),
+        "disk_saved_percent": round((1 - stored_size / len(data)) * 100, 1),
+        "egress_saved_percent": round((1 - stored_size / len(data)) * 100, 1),
+        "compress_cpu_s_per_gb": round(compress_seconds / gigabytes, 2),
+        "decompress_cpu_s_per_gb": round(decompress_seconds / gigabytes, 2),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    random.seed(0)
+    samples: List[Tuple[str, bytes]] = []
+    for path in args.files:
+        with open(path, "rb") as buffer:
+            samples.append((os.path.basename(path), buffer.read()))
+    if not samples:
+        samples = [
+            (name, generate(args.size * 1024 * 1024))
+            for name, generate in CORPORA.items()
+        ]
+
+    codecs = [Compression.GZIP] + ([Compression.ZSTD] if zstandard else [])
+    results: Dict[str, Any] = {}
+    for name, data in samples:
+        results[name] = {"original_bytes": len(data)}
+        for encoding in codecs:
+            for level in LEVELS[encoding]:
+                results[name][f"{encoding.value}-{level}"] = run(data, encoding, level)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", nargs="*", default=[])
+    parser.add_argument(
+        "--size", type=int, default=32, help="size of each sample corpus in MB"
+    )
+    main(parser.parse_args())
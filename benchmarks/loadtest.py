@@ -0,0 +1,359 @@
+"""End-to-end load test of the service.
+
+Starts ``benchmarks.server`` on a free port (or targets ``--base-url``),
+seeds users and files in the configured database, and runs the selected
+scenarios, e.g.::
+
+    DB_URI=sqlite+aiosqlite:///bench.sqlite python -m benchmarks.loadtest \\
+        --duration 10 --output results.json --baseline baseline.json
+
+Run it with the same ``.env`` as the service so minted tokens are accepted.
+The result is one JSON document with RPS, latency percentiles, bytes/s and
+database queries per request for every scenario. With ``--baseline`` the
+run is compared against a stored result and the exit code is non-zero
+when RPS or p99 regress by more than ``--tolerance``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import update
+
+from src.models.base import async_session, engine
+from src.models.blob import Blob
+from src.models.file import File
+from src.models.user import User
+from src.services.auth import AuthService
+
+from .common import migrate, summary
+
+SCENARIOS = ["upload", "download", "list", "list_offset", "mixed"]
+
+
+@dataclass
+class Stats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class Context:
+    clients: List[httpx.AsyncClient]
+    file_ids: List[List[str]]
+    payload: bytes
+    page_size: int
+    stats: Stats = field(default_factory=Stats)
+
+
+Operation = Callable[[Context, int], Awaitable[httpx.Response]]
+
+cursors: Dict[int, Optional[str]] = {}
+
+
+async def upload(ctx: Context, worker: int) -> httpx.Response:
+    # Unique content per request, otherwise every upload is deduplicated.
+    payload = uuid.uuid4().bytes + ctx.payload[16:]
+    client = ctx.clients[worker % len(ctx.clients)]
+    return await client.post(
+        "/file/", files={"file": ("bench.mp3", payload, "audio/mpeg")}
+    )
+
+
+async def download(ctx: Context, worker: int) -> httpx.Response:
+    user = worker % len(ctx.clients)
+    file_id = random.choice(ctx.file_ids[user])
+    return await ctx.clients[user].get(f"/file/{file_id}/download")
+
+
+async def list_page(ctx: Context, worker: int) -> httpx.Response:
+    # Walks the whole history with cursors, one page per call.
+    user = worker % len(ctx.clients)
+    cursor = cursors.get(worker)
+    params: Dict[str, Any] = {"limit": ctx.page_size}
+    if cursor:
+        params["cursor"] = cursor
+    response = await ctx.clients[user].get("/file/", params=params)
+    if response.is_success:
+        cursors[worker] = response.json().get("next_cursor")
+    return response
+
+
+async def list_offset(ctx: Context, worker: int) -> httpx.Response:
+    user = worker % len(ctx.clients)
+    offset = random.randrange(max(len(ctx.file_ids[user]) - ctx.page_size, 1))
+    return await ctx.clients[user].get(
+        "/file/", params={"limit": ctx.page_size, "offset": offset}
+    )
+
+
+async def mixed(ctx: Context, worker: int) -> httpx.Response:
+    operation = random.choices(
+        [list_page, download, upload], weights=[60, 30, 10], k=1
+    )[0]
+    return await operation(ctx, worker)
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "upload": upload,
+    "download": download,
+    "list": list_page,
+    "list_offset": list_offset,
+    "mixed": mixed,
+}
+
+
+async def worker_loop(
+    ctx: Context, operation: Operation, worker: int, deadline: float
+) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await operation(ctx, worker)
+        except httpx.HTTPError:
+            ctx.stats.errors += 1
+            continue
+        ctx.stats.latencies.append(time.perf_counter() - started)
+        sent = int(response.request.headers.get("content-length", 0))
+        ctx.stats.bytes += len(response.content) + sent
+        if not response.is_success:
+            ctx.stats.errors += 1
+
+
+async def query_count(client: httpx.AsyncClient) -> Optional[int]:
+    try:
+        response = await client.get("/__bench__/stats")
+    except httpx.HTTPError:
+        return None
+    if not response.is_success:
+        return None
+    return int(response.json()["queries"])
+
+
+async def run_scenario(
+    ctx: Context, name: str, concurrency: int, duration: float
+) -> Dict[str, Any]:
+    ctx.stats = Stats()
+    cursors.clear()
+    queries_before = await query_count(ctx.clients[0])
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(
+        *(
+            worker_loop(ctx, OPERATIONS[name], worker, deadline)
+            for worker in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    queries_after = await query_count(ctx.clients[0])
+    requests = len(ctx.stats.latencies)
+    result = summary(ctx.stats.latencies)
+    result.update(
+        {
+            "errors": ctx.stats.errors,
+            "rps": round(requests / elapsed, 2),
+            "bytes_per_second": round(ctx.stats.bytes / elapsed),
+            "db_queries": None,
+            "db_queries_per_request": None,
+        }
+    )
+    if queries_before is not None and queries_after is not None:
+        queries = queries_after - queries_before
+        result["db_queries"] = queries
+        result["db_queries_per_request"] = round(queries / max(requests, 1), 2)
+    return result
+
+
+async def seed(
+    clients: List[httpx.AsyncClient], payload: bytes, files_per_user: int
+) -> List[List[str]]:
+    # One real upload per user, then cheap copies of its row so that deep
+    # pagination has something to walk through.
+    file_ids: List[List[str]] = []
+    for client in clients:
+        response = await client.post(
+            "/file/", files={"file": ("seed.mp3", payload, "audio/mpeg")}
+        )
+        response.raise_for_status()
+        file_ids.append([response.json()["id"]])
+
+    async with async_session() as db:
+        for ids in file_ids:
+            template = await db.get(File, ids[0])
+            assert template is not None
+            for _ in range(files_per_user - 1):
+                file = File(
+                    id=str(uuid.uuid4()),
+                    user_id=template.user_id,
+                    filename=template.filename,
+                    size=template.size,
+                    format=template.format,
+                    path=template.path,
+                    checksum=template.checksum,
+                )
+                db.add(file)
+                ids.append(str(file.id))
+            await db.execute(
+                update(Blob)
+                .where(Blob.checksum == template.checksum)
+                .values(ref_count=Blob.ref_count + files_per_user - 1)
+            )
+        await db.commit()
+    return file_ids
+
+
+async def create_users(count: int) -> List[str]:
+    user_ids = [str(uuid.uuid4()) for _ in range(count)]
+    async with async_session() as db:
+        for user_id in user_ids:
+            db.add(
+                User(
+                    id=user_id,
+                    yandex_id=f"bench-{user_id}",
+                    email=f"{user_id}@bench.local",
+                    login=f"bench-{user_id[:8]}",
+                    name="Bench",
+                )
+            )
+        await db.commit()
+    return user_ids
+
+
+def start_server() -> tuple[subprocess.Popen[bytes], str]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.server", "--port", str(port)]
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                response = await client.get("/openapi.json")
+                if response.is_success:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Service at {base_url} did not start")
+            await asyncio.sleep(0.2)
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    regressions = []
+    for name, result in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {before['rps']} -> {result['rps']}")
+        if result["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p99 {before['p99_ms']}ms -> {result['p99_ms']}ms"
+            )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        # The service refuses to start on a database that is not migrated.
+        await migrate()
+        server, base_url = start_server()
+
+    try:
+        await wait_ready(base_url)
+        user_ids = await create_users(args.users)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        clients = [
+            httpx.AsyncClient(
+                base_url=base_url,
+                headers={
+                    "Authorization": "Bearer "
+                    + AuthService.create_tokens(user_id).access_token
+                },
+                limits=limits,
+                timeout=None,
+            )
+            for user_id in user_ids
+        ]
+        payload = os.urandom(args.size * 1024)
+        try:
+            file_ids = await seed(clients, payload, args.files_per_user)
+            ctx = Context(clients, file_ids, payload, args.page_size)
+            results: Dict[str, Any] = {
+                "config": {
+                    "users": args.users,
+                    "concurrency": args.concurrency,
+                    "duration_s": args.duration,
+                    "upload_size_kb": args.size,
+                    "files_per_user": args.files_per_user,
+                    "page_size": args.page_size,
+                },
+                "scenarios": {},
+            }
+            for name in args.scenarios:
+                results["scenarios"][name] = await run_scenario(
+                    ctx, name, args.concurrency, args.duration
+                )
+        finally:
+            for client in clients:
+                await client.aclose()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        await engine.dispose()
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as buffer:
+            regressions = compare(results, json.load(buffer), args.tolerance)
+        results["regressions"] = regressions
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as buffer:
+            buffer.write(document)
+    print(document)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--base-url", help="target a running service instead of starting one"
+    )
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--size", type=int, default=256, help="upload size in KB")
+    parser.add_argument("--files-per-user", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--output", help="also write the result to this file")
+    parser.add_argument("--baseline", help="compare against a stored result")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
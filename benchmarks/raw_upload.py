@@ -0,0 +1,124 @@
+"""Multipart ``POST /file/`` vs. raw-body ``PUT /file/`` uploads.
+
+Starts ``benchmarks.server`` on a free port, uploads the same payload both
+ways and reads the server's ``/proc/<pid>/io`` around each run (Linux), e.g.::
+
+    DB_URI=sqlite+aiosqlite:///bench.sqlite python -m benchmarks.raw_upload \\
+        --size 16 --uploads 64 --concurrency 8
+
+Start it with the same ``.env`` as the service so minted tokens are
+accepted. The script prints one JSON document with throughput, latency
+percentiles and write amplification per mode: bytes the server passed to
+``write()`` and bytes that reached the block layer, each divided by the
+bytes uploaded.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from src.models.base import engine
+from src.services.auth import AuthService
+
+from .common import migrate, summary
+from .loadtest import create_users, start_server, wait_ready
+
+MODES = ["multipart", "raw"]
+
+
+def process_io(pid: int) -> Dict[str, int]:
+    try:
+        with open(f"/proc/{pid}/io") as buffer:
+            pairs = (line.split(":") for line in buffer)
+            return {name: int(value) for name, value in pairs}
+    except OSError:
+        return {}
+
+
+async def upload(client: httpx.AsyncClient, mode: str, payload: bytes) -> None:
+    if mode == "multipart":
+        files = {"file": ("bench.bin", payload, "application/octet-stream")}
+        response = await client.post("/file/", files=files)
+    else:
+        response = await client.put(
+            "/file/",
+            params={"filename": "bench.bin"},
+            headers={"content-type": "application/octet-stream"},
+            content=payload,
+        )
+    response.raise_for_status()
+
+
+async def run(
+    client: httpx.AsyncClient, pid: int, mode: str, args: argparse.Namespace
+) -> Dict[str, Any]:
+    payload = os.urandom(args.size * 1024 * 1024)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await upload(client, mode, payload)
+            latencies.append(time.perf_counter() - started)
+
+    before = process_io(pid)
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.uploads)))
+    elapsed = time.perf_counter() - started
+    after = process_io(pid)
+
+    uploaded = len(payload) * args.uploads
+    result = summary(latencies)
+    result["mb_per_s"] = round(uploaded / elapsed / 1024 / 1024, 1)
+    if before and after:
+        for name, counter in (("write_calls", "wchar"), ("disk", "write_bytes")):
+            written = after[counter] - before[counter]
+            result[f"{name}_amplification"] = round(written / uploaded, 2)
+    return result
+
+
+async def main(args: argparse.Namespace) -> int:
+    await migrate()
+    server, base_url = start_server()
+    try:
+        await wait_ready(base_url)
+        (user_id,) = await create_users(1)
+        token = AuthService.create_tokens(user_id).access_token
+        async with httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {token}"},
+            limits=httpx.Limits(max_connections=args.concurrency),
+            timeout=None,
+        ) as client:
+            results: Dict[str, Any] = {
+                "config": {
+                    "size_mb": args.size,
+                    "uploads": args.uploads,
+                    "concurrency": args.concurrency,
+                }
+            }
+            for mode in MODES:
+                await upload(client, mode, b"warm-up")
+                results[mode] = await run(client, server.pid, mode, args)
+    finally:
+        server.terminate()
+        server.wait()
+        await engine.dispose()
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=16, help="upload size in MB")
+    parser.add_argument("--uploads", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,144 @@
+"""Cost of building a ``GET /file/`` page from ORM objects vs. plain rows.
+
+Fills a scratch database with one user's files and times both ways of
+turning a page into response bytes, e.g.::
+
+    DB_URI=sqlite+aiosqlite:///bench.sqlite python -m benchmarks.serialization --limit 1000
+
+``orm`` loads ``File`` objects, validates the response model from their
+attributes and lets FastAPI validate and dump it again; ``projection``
+selects the response columns only and dumps them with a single validation.
+The script prints one JSON document with latency percentiles per path and
+checks that both produce the same JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.base import async_session, engine
+from src.models.file import File
+from src.models.user import User, UserRole
+from src.routes.common import json_response
+from src.schemas.file import (
+    FileAdminResponse,
+    FileListAdminResponse,
+    FileListUserResponse,
+)
+from src.services.file import FileService
+from src.services.pagination import projection
+
+from .common import migrate, summary
+
+USER_ID = str(uuid.uuid5(uuid.NAMESPACE_URL, "bench-serialization"))
+
+# What the route declared as response_model before pages became rows.
+response_field = create_model_field(
+    "Response", FileListAdminResponse | FileListUserResponse, mode="serialization"
+)
+
+
+async def seed(rows: int) -> None:
+    async with async_session() as db:
+        existing = (
+            await db.execute(
+                select(func.count()).select_from(File).where(File.user_id == USER_ID)
+            )
+        ).scalar_one()
+        if existing >= rows:
+            return
+        if await db.get(User, USER_ID) is None:
+            db.add(User(id=USER_ID, login="bench", name="bench", role=UserRole.CLIENT))
+            await db.flush()
+        now = datetime.utcnow()
+        await db.execute(
+            insert(File),
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_id": USER_ID,
+                    "filename": f"track_{i}.mp3",
+                    "size": 1024 * i,
+                    "format": "mp3",
+                    "content_type": "audio/mpeg",
+                    "path": f"bench/{i}",
+                    "checksum": f"{i:064x}",
+                    "stored_size": 1024 * i,
+                    "metadata_": {"duration": i, "bitrate": 320000},
+                    "created_at": now - timedelta(seconds=i),
+                }
+                for i in range(existing, rows)
+            ],
+        )
+        await db.commit()
+
+
+def page(files: List[Any], next_cursor: Any) -> Dict[str, Any]:
+    return {"objects": files, "total_count": None, "next_cursor": next_cursor}
+
+
+async def orm(db: AsyncSession, limit: int) -> bytes:
+    files, _, next_cursor = await FileService.get_list(db, USER_ID, limit=limit)
+    model = FileListAdminResponse.model_validate(page(files, next_cursor))
+    return await serialize_response(
+        field=response_field, response_content=model, dump_json=True
+    )
+
+
+async def rows(db: AsyncSession, limit: int) -> bytes:
+    files, _, next_cursor = await FileService.get_list(
+        db, USER_ID, limit=limit, columns=projection(File, FileAdminResponse)
+    )
+    response = json_response(FileListAdminResponse, page(files, next_cursor))
+    return bytes(response.body)
+
+
+async def measure(
+    build: Callable[[AsyncSession, int], Any], limit: int, requests: int
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    async with async_session() as db:
+        for _ in range(requests):
+            started = time.perf_counter()
+            await build(db, limit)
+            latencies.append(time.perf_counter() - started)
+            # Every request gets a fresh session in the service.
+            db.expunge_all()
+    return summary(latencies)
+
+
+async def main(args: argparse.Namespace) -> None:
+    await migrate()
+    await seed(args.limit)
+
+    async with async_session() as db:
+        same = json.loads(await orm(db, args.limit)) == json.loads(
+            await rows(db, args.limit)
+        )
+
+    results: Dict[str, Any] = {"limit": args.limit, "same_output": same}
+    for name, build in (("orm", orm), ("projection", rows)):
+        await measure(build, args.limit, 5)
+        results[name] = await measure(build, args.limit, args.requests)
+    results["speedup_p50"] = round(
+        results["orm"]["p50_ms"] / max(results["projection"]["p50_ms"], 0.01), 2
+    )
+    await engine.dispose()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
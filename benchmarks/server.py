@@ -0,0 +1,39 @@
+"""The service with a database query counter, for ``benchmarks.loadtest``.
+
+::
+
+    python -m benchmarks.server --port 8000
+
+Exposes ``GET /__bench__/stats`` with the number of SQL statements executed
+since start. Not meant for production use.
+"""
+
+import argparse
+from typing import Any, Dict
+
+import uvicorn
+from sqlalchemy import event
+
+from src.app import app
+from src.models.base import engine
+
+queries = 0
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def count_query(*args: Any) -> None:
+    global queries
+    queries += 1
+
+
+@app.get("/__bench__/stats", include_in_schema=False)
+async def bench_stats() -> Dict[str, int]:
+    return {"queries": queries}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,106 @@
+"""Latency of concurrent ``GET /file/`` calls during a burst of large uploads.
+
+Run against a started service (``make run``) and a user that exists in the
+database, e.g.::
+
+    python -m benchmarks.upload_latency --user-id <uuid> --uploads 16 --size 64
+
+Start the service with the same ``.env`` so the minted token is accepted.
+The script prints one JSON document with the list latency measured while
+idle and while the uploads are in flight.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+import httpx
+
+from src.services.auth import AuthService
+
+from .common import summary
+
+
+async def probe(
+    client: httpx.AsyncClient, stop: asyncio.Event, latencies: List[float]
+) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/file/", params={"limit": 10})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def upload(client: httpx.AsyncClient, size: int) -> None:
+    payload = os.urandom(1024 * 1024) * (size // (1024 * 1024))
+    response = await client.post(
+        "/file/",
+        files={"file": ("bench.mp3", payload, "audio/mpeg")},
+        timeout=None,
+    )
+    response.raise_for_status()
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    probes: int,
+    duration: float | None,
+    uploads: int,
+    size: int,
+) -> List[float]:
+    latencies: List[float] = []
+    stop = asyncio.Event()
+    workers = [
+        asyncio.create_task(probe(client, stop, latencies)) for _ in range(probes)
+    ]
+    if uploads:
+        await asyncio.gather(*(upload(client, size) for _ in range(uploads)))
+    else:
+        await asyncio.sleep(duration or 0)
+    stop.set()
+    await asyncio.gather(*workers)
+    return latencies
+
+
+async def main(args: argparse.Namespace) -> None:
+    token = args.token or AuthService.create_tokens(args.user_id).access_token
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=httpx.Limits(max_connections=args.probes + args.uploads),
+    ) as client:
+        idle = await measure(client, args.probes, args.idle_seconds, 0, 0)
+        burst = await measure(
+            client, args.probes, None, args.uploads, args.size * 1024 * 1024
+        )
+
+    print(
+        json.dumps(
+            {
+                "uploads": args.uploads,
+                "upload_size_mb": args.size,
+                "probes": args.probes,
+                "idle": summary(idle),
+                "burst": summary(burst),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--user-id", help="mint an access token for this user")
+    parser.add_argument("--token", help="use an existing access token")
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--size", type=int, default=16, help="upload size in MB")
+    parser.add_argument("--probes", type=int, default=8)
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    if not args.token and not args.user_id:
+        parser.error("either --user-id or --token is required")
+    asyncio.run(main(args))
@@ -0,0 +1,71 @@
+"""blobs and upload sessions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:10:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "blobs",
+        sa.Column("checksum", sa.String(length=64), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("path", sa.String(length=512), nullable=False),
+        sa.Column("encoding", sa.String(length=16), nullable=True),
+        sa.Column("stored_size", sa.BigInteger(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("checksum"),
+        sa.UniqueConstraint("path", name="blobs_path_key"),
+    )
+
+    # Rows of deduplicated files share the path of their blob. Existing rows
+    # keep a NULL checksum until their bytes are moved into a blob. SQLite
+    # leaves the baseline's constraint unnamed; name it like PostgreSQL does.
+    with op.batch_alter_table(
+        "files", naming_convention={"uq": "%(table_name)s_%(column_0_name)s_key"}
+    ) as batch_op:
+        batch_op.drop_constraint("files_path_key", type_="unique")
+        batch_op.add_column(sa.Column("checksum", sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column("encoding", sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column("stored_size", sa.BigInteger(), nullable=True))
+        batch_op.create_index("ix_files_checksum", ["checksum"])
+
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("content_type", sa.String(length=255), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("part_size", sa.Integer(), nullable=False),
+        sa.Column("part_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_upload_sessions_user_id", "upload_sessions", ["user_id"])
+    op.create_index("ix_upload_sessions_expires_at", "upload_sessions", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("upload_sessions")
+    # Fails once several rows share a blob path, which the previous schema
+    # cannot represent.
+    with op.batch_alter_table("files") as batch_op:
+        batch_op.drop_index("ix_files_checksum")
+        batch_op.drop_column("stored_size")
+        batch_op.drop_column("encoding")
+        batch_op.drop_column("checksum")
+        batch_op.create_unique_constraint("files_path_key", ["path"])
+    op.drop_table("blobs")
@@ -0,0 +1,51 @@
+"""per-user usage counters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:20:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(
+            sa.Column("used_bytes", sa.BigInteger(), server_default="0", nullable=False)
+        )
+        batch_op.add_column(
+            sa.Column("file_count", sa.Integer(), server_default="0", nullable=False)
+        )
+
+    # Counted like UsageService does: every row, soft-deleted ones included.
+    users = sa.table(
+        "users",
+        sa.column("id", sa.String()),
+        sa.column("used_bytes", sa.BigInteger()),
+        sa.column("file_count", sa.Integer()),
+    )
+    files = sa.table("files", sa.column("user_id", sa.String()), sa.column("size"))
+    owned = files.c.user_id == users.c.id
+    op.execute(
+        users.update().values(
+            used_bytes=sa.select(sa.func.coalesce(sa.func.sum(files.c.size), 0))
+            .where(owned)
+            .scalar_subquery(),
+            file_count=sa.select(sa.func.count())
+            .select_from(files)
+            .where(owned)
+            .scalar_subquery(),
+        )
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("file_count")
+        batch_op.drop_column("used_bytes")
@@ -0,0 +1,86 @@
+"""file metadata and listing indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:30:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.create_index(
+        "ix_users_created_at_id_active",
+        "users",
+        [sa.text("created_at DESC"), "id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+    # Existing rows were never sniffed and keep a NULL content type.
+    with op.batch_alter_table("files") as batch_op:
+        batch_op.add_column(
+            sa.Column("content_type", sa.String(length=255), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column(
+                "metadata",
+                sa.JSON(none_as_null=True).with_variant(
+                    postgresql.JSONB(none_as_null=True), "postgresql"
+                ),
+                nullable=True,
+            )
+        )
+    op.create_index("ix_files_content_type", "files", ["content_type"])
+    op.create_index(
+        "ix_files_user_id_created_at_id_active",
+        "files",
+        ["user_id", sa.text("created_at DESC"), "id"],
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_files_deleted_at",
+        "files",
+        ["deleted_at"],
+        postgresql_where=sa.text("deleted_at IS NOT NULL"),
+    )
+    op.create_index("ix_files_metadata", "files", ["metadata"], postgresql_using="gin")
+    op.create_index(
+        "ix_files_filename_trgm",
+        "files",
+        ["filename"],
+        postgresql_using="gin",
+        postgresql_ops={"filename": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_files_user_id_filename_lower",
+        "files",
+        ["user_id", sa.func.lower(sa.column("filename")).label("filename_lower")],
+        postgresql_ops={"filename_lower": "text_pattern_ops"},
+    )
+    op.create_index("ix_files_user_id_format", "files", ["user_id", "format"])
+    op.create_index("ix_files_user_id_size", "files", ["user_id", "size"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_files_user_id_size", table_name="files")
+    op.drop_index("ix_files_user_id_format", table_name="files")
+    op.drop_index("ix_files_user_id_filename_lower", table_name="files")
+    op.drop_index("ix_files_filename_trgm", table_name="files")
+    op.drop_index("ix_files_metadata", table_name="files")
+    op.drop_index("ix_files_deleted_at", table_name="files")
+    op.drop_index("ix_files_user_id_created_at_id_active", table_name="files")
+    op.drop_index("ix_files_content_type", table_name="files")
+    with op.batch_alter_table("files") as batch_op:
+        batch_op.drop_column("metadata")
+        batch_op.drop_column("content_type")
+    op.drop_index("ix_users_created_at_id_active", table_name="users")
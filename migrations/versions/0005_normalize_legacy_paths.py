@@ -0,0 +1,82 @@
+"""normalize legacy file paths
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+"""
+
+import logging
+
+import sqlalchemy as sa
+from alembic import context, op
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.util import await_
+
+from src.models.released_object import ReleasedObject
+from src.services.storage_migration import StorageMigrationService
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger(f"alembic.{__name__}")
+
+BATCH_SIZE = 100
+
+
+async def normalize(connection: AsyncConnection) -> None:
+    # Files stored before deduplication sit under a key built from the name
+    # the user gave them. Turn them into blobs, keyed by content, in the
+    # migration's transaction. The old keys stay in storage, since a rollback
+    # or a worker of the previous version may still read them, and are left
+    # to the maintenance sweep.
+    moved = failed = 0
+    async with AsyncSession(
+        bind=connection,
+        join_transaction_mode="create_savepoint",
+        expire_on_commit=False,
+    ) as db:
+        after = ""
+        while True:
+            batch = await StorageMigrationService.get_legacy_batch(
+                db, after, BATCH_SIZE
+            )
+            if not batch:
+                break
+            after = batch[-1][0]
+            for file_id, path in batch:
+                try:
+                    old_key = await StorageMigrationService.move_legacy_file(
+                        db, file_id, path
+                    )
+                except Exception as e:
+                    # Such rows keep working from their old key.
+                    logger.warning(f"Moving file {file_id} failed: {str(e)}")
+                    failed += 1
+                    continue
+                if old_key is not None:
+                    db.add(ReleasedObject(key=old_key))
+                    await db.commit()
+                    moved += 1
+    logger.info(f"Moved {moved} legacy files, {failed} failed")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "released_objects",
+        sa.Column("key", sa.String(length=512), nullable=False),
+        sa.Column("released_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+    if context.is_offline_mode():
+        logger.warning("Legacy file paths are only normalized in online mode")
+        return
+    await_(normalize(context.config.attributes["connection"]))
+
+
+def downgrade() -> None:
+    # Blob keys work with every earlier version, so moved rows stay moved;
+    # old keys not swept yet are left in storage.
+    op.drop_table("released_objects")
@@ -0,0 +1,41 @@
+"""64-bit file sizes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def alter_size(
+    existing_type: sa.types.TypeEngine[int], type_: sa.types.TypeEngine[int]
+) -> None:
+    # SQLite alters the column by copying the table, which loses expression
+    # indexes, so that one is recreated afterwards.
+    recreate = op.get_bind().dialect.name == "sqlite"
+    if recreate:
+        op.drop_index("ix_files_user_id_filename_lower", table_name="files")
+    with op.batch_alter_table("files") as batch_op:
+        batch_op.alter_column("size", existing_type=existing_type, type_=type_)
+    if recreate:
+        op.create_index(
+            "ix_files_user_id_filename_lower",
+            "files",
+            ["user_id", sa.func.lower(sa.column("filename")).label("filename_lower")],
+        )
+
+
+def upgrade() -> None:
+    # Resumable uploads finalize files of 2 GiB and more.
+    alter_size(sa.Integer(), sa.BigInteger())
+
+
+def downgrade() -> None:
+    alter_size(sa.BigInteger(), sa.Integer())
@@ -1,11 +1,27 @@
+import asyncio
 import logging
+import signal
+import threading
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import exc, select
+from sqlalchemy import exc
 
-from .models.base import Base, engine
-from .routes import auth, exc_handlers, file, user
+from .config import settings
+from .models.base import engine
+from .models.replica import replicas
+from .models.schema import check_schema
+from .routes import (
+    admission,
+    auth,
+    exc_handlers,
+    file,
+    metrics,
+    upload_session,
+    user,
+)
+from .services.admission import SETTINGS_TOPIC
+from .services.channel import channel
 from .services.exceptions import (
     AccessDeniedExc,
     BadRequestExc,
@@ -13,41 +29,84 @@ from .services.exceptions import (
     ObjectNotFoundExc,
     SomethingWrongExc,
 )
+from .services.maintenance import MaintenanceService
+from .services.metadata import MetadataService
+from .services.upload_session import UploadSessionService
+from .storage import io, storage
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+background_tasks: list[asyncio.Task[None]] = []
+
+# Added first so CORS wraps its 429 responses and browsers can read them.
+app.add_middleware(admission.AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
+if settings.metrics.enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
     try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-            await conn.execute(select(1))
-            logger.info("Database initialized successfully")
+        await check_schema()
+        logger.info("Database schema is up to date")
 
     except exc.SQLAlchemyError as e:
         logger.error(f"Database initialization failed: {str(e)}")
         raise RuntimeError("Database connection error") from e
 
+    MetadataService.start()
+
+    if replicas:
+        await replicas.check()
+        background_tasks.append(asyncio.create_task(replicas.run_health_checks()))
+
+    if settings.cache.channel_path:
+        await channel.start(settings.cache.channel_path)
+    if threading.current_thread() is threading.main_thread():
+        # Sibling workers reload too; SIGHUP to the supervisor restarts them.
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP, channel.publish, SETTINGS_TOPIC, "file"
+        )
+
+    background_tasks.append(
+        asyncio.create_task(UploadSessionService.run_garbage_collector())
+    )
+    if settings.maintenance.enabled:
+        background_tasks.append(asyncio.create_task(MaintenanceService.run_worker()))
+
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    if threading.current_thread() is threading.main_thread():
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+    channel.stop()
+    await MetadataService.stop()
     await engine.dispose()
+    await replicas.dispose()
+    await storage.close()
+    io.shutdown_executor()
 
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(user.router, prefix="/user", tags=["user"])
+app.include_router(upload_session.router, prefix="/file/sessions", tags=["file"])
 app.include_router(file.router, prefix="/file", tags=["file"])
+if settings.metrics.enabled:
+    app.include_router(metrics.router, prefix=settings.metrics.path)
 
 app.add_exception_handler(BadRequestExc, exc_handlers.bad_request_exc_handler)
 app.add_exception_handler(NotAuthorizedExc, exc_handlers.not_authorized_exc_handler)
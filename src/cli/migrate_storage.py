@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, List, Tuple
+
+from ..models.base import async_session, engine
+from ..services.blob import BlobService
+from ..services.storage_migration import StorageMigrationService
+from ..storage import io, storage
+
+logger = logging.getLogger(__name__)
+
+
+class Migration:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.moved = 0
+        self.failed = 0
+        # Old keys stay readable for a grace period so that requests which
+        # loaded a row just before the switch can still finish.
+        self.pending: Deque[Tuple[float, List[str]]] = deque()
+
+    async def purge(self, force: bool = False) -> None:
+        while self.pending and (force or self.pending[0][0] <= time.monotonic()):
+            deadline, keys = self.pending.popleft()
+            await asyncio.sleep(max(deadline - time.monotonic(), 0))
+            for key in keys:
+                await BlobService.purge(key)
+
+    async def run_batches(self, kind: str) -> None:
+        after = ""
+        while True:
+            async with async_session() as db:
+                if kind == "blobs":
+                    batch = await StorageMigrationService.get_blob_batch(
+                        db, after, self.args.batch_size
+                    )
+                else:
+                    batch = await StorageMigrationService.get_legacy_batch(
+                        db, after, self.args.batch_size
+                    )
+                if not batch:
+                    return
+                after = batch[-1][0]
+
+                released = []
+                for key, path in batch:
+                    if kind == "blobs" and not StorageMigrationService.needs_move(path):
+                        continue
+                    if self.args.dry_run:
+                        logger.info(f"Would move {kind} {key}: {path}")
+                        self.moved += 1
+                        continue
+                    try:
+                        if kind == "blobs":
+                            old_key = await StorageMigrationService.move_blob(
+                                db, key, path
+                            )
+                        else:
+                            old_key = await StorageMigrationService.move_legacy_file(
+                                db, key, path
+                            )
+                    except Exception as e:
+                        logger.warning(f"Moving {kind} {key} failed: {str(e)}")
+                        self.failed += 1
+                        continue
+                    if old_key is not None:
+                        released.append(old_key)
+                        self.moved += 1
+
+            if released:
+                self.pending.append((time.monotonic() + self.args.grace, released))
+            logger.info(f"Moved {self.moved} objects, {self.failed} failed")
+            await self.purge()
+            await asyncio.sleep(self.args.pause)
+
+    async def run(self) -> None:
+        try:
+            await self.run_batches("blobs")
+            await self.run_batches("files")
+            await self.purge(force=True)
+        finally:
+            await storage.close()
+            await engine.dispose()
+            io.shutdown_executor()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Move stored files into the sharded storage layout"
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument(
+        "--pause", type=float, default=1.0, help="seconds to sleep between batches"
+    )
+    parser.add_argument(
+        "--grace",
+        type=float,
+        default=60.0,
+        help="seconds to keep old copies after their rows are switched",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(Migration(args).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+
+import uvicorn
+from sqlalchemy.engine import make_url
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the service in worker processes")
+    parser.add_argument("--host", default=settings.server.host)
+    parser.add_argument("--port", type=int, default=settings.server.port)
+    parser.add_argument("--workers", type=int, default=settings.server.workers)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    channel_path = None
+    if args.workers > 1:
+        if make_url(settings.db.uri).get_backend_name() != "postgresql":
+            logger.warning("Only PostgreSQL coordinates maintenance between workers")
+        if settings.cache.channel_path is None:
+            # Workers inherit the environment, so they all join one channel
+            # and invalidate each other's caches.
+            channel_path = tempfile.mkdtemp(prefix="file-uploader-channel-")
+            os.environ["CACHE_CHANNEL_PATH"] = channel_path
+            logger.info(f"Cache invalidation channel at {channel_path}")
+
+    try:
+        uvicorn.run(
+            "src.app:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            # In-flight requests, uploads included, get this long to finish
+            # after SIGTERM before the workers are stopped.
+            timeout_graceful_shutdown=int(settings.server.shutdown_timeout_seconds),
+        )
+    finally:
+        if channel_path is not None:
+            shutil.rmtree(channel_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .cache import Cache
 from .db import DB
 from .file import File
 from .jwt import JWT
+from .maintenance import Maintenance
+from .metrics import Metrics
 from .server import Server
+from .storage import Storage
 from .yandex import Yandex
 
 
@@ -13,6 +17,10 @@ class Settings(BaseSettings):
     yandex: Yandex
     file: File
     db: DB
+    cache: Cache = Cache()
+    storage: Storage = Storage()
+    metrics: Metrics = Metrics()
+    maintenance: Maintenance = Maintenance()
 
     model_config = SettingsConfigDict(
         env_nested_delimiter="_",
@@ -23,3 +31,10 @@ class Settings(BaseSettings):
 
 
 settings: Settings = Settings()
+
+
+def reload_settings() -> None:
+    # Re-reads the environment and .env. Only code that looks settings up
+    # on every use, like the upload limits, sees the new file section; the
+    # rest was configured at startup.
+    settings.file = Settings().file
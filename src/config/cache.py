@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+
+class Cache(BaseModel):
+    enabled: bool = Field(default=True)
+    user_ttl_seconds: float = Field(default=30, gt=0)
+    user_max_size: int = Field(default=10000, gt=0)
+    count_ttl_seconds: float = Field(default=60, gt=0)
+    count_max_size: int = Field(default=10000, gt=0)
+    channel_path: str | None = Field(default=None)
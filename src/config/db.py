@@ -1,7 +1,21 @@
-from pydantic import BaseModel, Field
+import json
+from typing import Any, List
+
+from pydantic import BaseModel, Field, field_validator
 
 
 class DB(BaseModel):
     uri: str = Field()
     pool_size: int = Field(default=20)
     max_overflow: int = Field(default=10)
+    replica_uris: List[str] = Field(default=[])
+    replica_sticky_seconds: float = Field(default=5, ge=0)
+    replica_check_interval_seconds: float = Field(default=10, gt=0)
+    replica_check_timeout_seconds: float = Field(default=2, gt=0)
+    replica_max_lag_seconds: float = Field(default=30, gt=0)
+
+    @field_validator("replica_uris", mode="before")
+    def parse_json(cls: "DB", value: Any) -> Any:
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
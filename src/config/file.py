@@ -1,16 +1,61 @@
 import json
-from typing import List
+from enum import Enum
+from importlib.util import find_spec
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
 
+class FsyncPolicy(str, Enum):
+    NONE = "none"
+    ON_CLOSE = "on-close"
+    PER_CHUNK = "per-chunk"
+
+
+class Compression(str, Enum):
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+
 class File(BaseModel):
     max_size: int = Field()
-    # upload_path: str = Field()
     supported_formats: list[str] = Field(default=["*"])
+    chunk_size: int = Field(default=1024 * 1024, gt=0)
+    fsync_policy: FsyncPolicy = Field(default=FsyncPolicy.NONE)
+    preallocate: bool = Field(default=False)
+    io_workers: int = Field(default=8, gt=0)
+    part_min_size: int = Field(default=5, gt=0)
+    part_max_size: int = Field(default=64, gt=0)
+    session_expire_minutes: int = Field(default=24 * 60, gt=0)
+    session_gc_interval_seconds: int = Field(default=300, gt=0)
+    compression: Dict[str, Compression] = Field(default={})
+    compression_level: Optional[int] = Field(default=None)
+    quota: Dict[str, int] = Field(default={})
+    metadata_workers: int = Field(default=2, ge=0)
+    upload_max_concurrency: int = Field(default=0, ge=0)
+    upload_queue_timeout_seconds: float = Field(default=10, ge=0)
+    upload_user_max_concurrency: int = Field(default=0, ge=0)
+    upload_user_rate: float = Field(default=0, ge=0)
+    upload_user_burst: Optional[float] = Field(default=None, ge=0)
+    upload_retry_after_seconds: int = Field(default=1, gt=0)
 
     @field_validator("supported_formats", mode="before")
     def parse_json(cls: "File", value: str) -> List[str]:
         if isinstance(value, str):
             return json.loads(value)
         return value
+
+    @field_validator("compression", "quota", mode="before")
+    def parse_mapping(cls: "File", value: Any) -> Any:
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+    @field_validator("compression")
+    def check_compression(
+        cls: "File", value: Dict[str, Compression]
+    ) -> Dict[str, Compression]:
+        # Also guards settings reloads, which skip the startup checks.
+        if Compression.ZSTD in value.values() and find_spec("zstandard") is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        return value
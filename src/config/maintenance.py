@@ -0,0 +1,11 @@
+from pydantic import BaseModel, Field
+
+
+class Maintenance(BaseModel):
+    enabled: bool = Field(default=True)
+    interval_seconds: int = Field(default=3600, gt=0)
+    retention_days: int = Field(default=30, ge=0)
+    batch_size: int = Field(default=500, gt=0)
+    batch_pause_seconds: float = Field(default=0.5, ge=0)
+    temp_max_age_hours: float = Field(default=24, gt=0)
+    orphan_min_age_hours: float = Field(default=24, gt=0)
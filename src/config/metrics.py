@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+
+
+class Metrics(BaseModel):
+    enabled: bool = Field(default=False)
+    path: str = Field(default="/metrics")
@@ -3,3 +3,7 @@ from pydantic import BaseModel, Field
 
 class Server(BaseModel):
     debug: bool = Field(default=False)
+    host: str = Field(default="0.0.0.0")
+    port: int = Field(default=8000, gt=0)
+    workers: int = Field(default=1, gt=0)
+    shutdown_timeout_seconds: float = Field(default=30, gt=0)
@@ -0,0 +1,22 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class StorageBackendType(str, Enum):
+    LOCAL = "local"
+    S3 = "s3"
+
+
+class Storage(BaseModel):
+    backend: StorageBackendType = Field(default=StorageBackendType.LOCAL)
+    path: str = Field(default="/uploads")
+    staging_path: str = Field(default="/uploads/.sessions")
+    shard_depth: int = Field(default=2, ge=0, le=4)
+    shard_width: int = Field(default=2, ge=1, le=4)
+    s3_endpoint: str | None = Field(default=None)
+    s3_bucket: str | None = Field(default=None)
+    s3_region: str = Field(default="us-east-1")
+    s3_access_key: str | None = Field(default=None)
+    s3_secret_key: str | None = Field(default=None)
+    s3_part_size: int = Field(default=8, ge=5)
@@ -5,6 +5,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from ..config import settings
+from .instrumentation import TimedQueuePool, instrument
+from .replica import RoutingSession
 
 engine = create_async_engine(
     settings.db.uri,
@@ -12,10 +14,17 @@ engine = create_async_engine(
     echo=settings.server.debug,
     pool_size=settings.db.pool_size,
     max_overflow=settings.db.max_overflow,
+    poolclass=TimedQueuePool if settings.metrics.enabled else None,
 )
+if settings.metrics.enabled:
+    instrument(engine)
 
 async_session = sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False
+    bind=engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    expire_on_commit=False,
+    autoflush=False,
 )
 
 Base = declarative_base()
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+
+from .base import Base
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    checksum = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    path = Column(String(512), nullable=False, unique=True)
+    encoding = Column(String(16), nullable=True)
+    stored_size = Column(BigInteger, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
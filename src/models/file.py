@@ -2,7 +2,17 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -19,10 +29,52 @@ class File(Base):
         String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
     )
     filename = Column(String(255), nullable=False)
-    size = Column(Integer, nullable=False)
+    size = Column(BigInteger, nullable=False)
     format = Column(String(255), nullable=False)
-    path = Column(String(512), nullable=False, unique=True)
+    content_type = Column(String(255), nullable=True, index=True)
+    path = Column(String(512), nullable=False)
+    checksum = Column(String(64), nullable=True, index=True)
+    encoding = Column(String(16), nullable=True)
+    stored_size = Column(BigInteger, nullable=True)
+    # "metadata" is reserved on declarative classes.
+    metadata_ = Column(
+        "metadata",
+        JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"),
+        nullable=True,
+    )
     created_at = Column(DateTime, default=datetime.utcnow)
     deleted_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="files")
+
+    __table_args__ = (
+        Index(
+            "ix_files_user_id_created_at_id_active",
+            user_id,
+            created_at.desc(),
+            id,
+            postgresql_where=deleted_at.is_(None),
+        ),
+        Index(
+            "ix_files_deleted_at",
+            deleted_at,
+            postgresql_where=deleted_at.is_not(None),
+        ),
+        Index("ix_files_metadata", metadata_, postgresql_using="gin"),
+        # Substring search; trigram indexes also serve ILIKE.
+        Index(
+            "ix_files_filename_trgm",
+            filename,
+            postgresql_using="gin",
+            postgresql_ops={"filename": "gin_trgm_ops"},
+        ),
+        # Prefix search within one user's files.
+        Index(
+            "ix_files_user_id_filename_lower",
+            user_id,
+            func.lower(filename).label("filename_lower"),
+            postgresql_ops={"filename_lower": "text_pattern_ops"},
+        ),
+        Index("ix_files_user_id_format", user_id, format),
+        Index("ix_files_user_id_size", user_id, size),
+    )
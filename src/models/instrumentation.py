@@ -0,0 +1,73 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..services.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    Labels,
+    query_stats,
+    registry,
+)
+
+pool_checkout_seconds = Histogram(
+    registry,
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+queries_total = Counter(registry, "db_queries_total", "Executed SQL statements")
+query_seconds = Histogram(
+    registry, "db_query_duration_seconds", "SQL statement execution time"
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - started)
+
+
+def _before_execute(conn: Any, *args: Any) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn: Any, *args: Any) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    queries_total.inc()
+    query_seconds.observe(elapsed)
+    stats = query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+
+def _pool_state(engine: AsyncEngine) -> Dict[Labels, float]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("overflow",): max(pool.overflow(), 0),
+        ("max_overflow",): pool._max_overflow,
+    }
+
+
+def instrument(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_execute)
+    Gauge(
+        registry,
+        "db_pool_connections",
+        "Connection pool state; checked_out near size + max_overflow means saturation",
+        callback=lambda: _pool_state(engine),
+        labels=("state",),
+    )
@@ -0,0 +1,37 @@
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import text
+
+from .base import engine
+
+# Advisory locks coordinate the workers of one deployment; other databases
+# run with a single worker and need no locking.
+
+
+def lock_key(name: str) -> int:
+    return zlib.crc32(f"file-uploader:{name}".encode())
+
+
+@asynccontextmanager
+async def try_lock(name: str) -> AsyncIterator[bool]:
+    # Yields False while another worker holds the lock.
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    key = {"key": lock_key(name)}
+    async with engine.connect() as conn:
+        acquired = bool(
+            (
+                await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), key)
+            ).scalar()
+        )
+        await conn.commit()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), key)
+                await conn.commit()
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, String
+
+from .base import Base
+
+
+class ReleasedObject(Base):
+    # Storage keys no row points to any more but which may still be read by
+    # requests or workers that started before the switch; the maintenance
+    # sweep deletes them once they are older than the orphan grace period.
+    __tablename__ = "released_objects"
+
+    key = Column(String(512), primary_key=True)
+    released_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import random
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from ..config import settings
+from ..services.cache import TTLCache
+from ..services.channel import channel
+from ..services.metrics import Counter, Gauge, Labels, registry
+
+logger = logging.getLogger(__name__)
+
+STICKY_TOPIC = "replica"
+
+# Keys in Session.info.
+READ_REPLICA = "read_replica"
+USER_ID = "user_id"
+WROTE = "wrote"
+
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+# Users who committed a write recently read from the primary until their
+# change has had time to reach the replicas.
+sticky_users: TTLCache[str, bool] = TTLCache(
+    ttl=settings.db.replica_sticky_seconds, max_size=settings.cache.user_max_size
+)
+channel.subscribe(STICKY_TOPIC, lambda user_id: sticky_users.set(user_id, True))
+
+reads = Counter(
+    registry,
+    "db_reads_total",
+    "Reads that could be served by a replica, by where they went",
+    labels=("target",),
+)
+
+
+class Replica:
+    def __init__(self, uri: str) -> None:
+        self.name = make_url(uri).render_as_string(hide_password=True)
+        self.engine = create_async_engine(
+            uri,
+            future=True,
+            echo=settings.server.debug,
+            pool_size=settings.db.pool_size,
+            max_overflow=settings.db.max_overflow,
+        )
+        self.healthy = False
+        event.listen(self.engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context: Any) -> None:
+        # A dropped connection takes the replica out of rotation right away
+        # instead of failing requests until the next check.
+        if context.is_disconnect:
+            self.mark(False)
+
+    def mark(self, healthy: bool) -> None:
+        if healthy != self.healthy:
+            state = "healthy" if healthy else "unhealthy"
+            log = logger.info if healthy else logger.warning
+            log(f"Replica {self.name} is {state}")
+        self.healthy = healthy
+
+    async def lag(self) -> float:
+        async with self.engine.connect() as conn:
+            if self.engine.dialect.name != "postgresql":
+                await conn.execute(select(1))
+                return 0.0
+            return float((await conn.execute(LAG_QUERY)).scalar() or 0)
+
+    async def check(self) -> None:
+        try:
+            lag = await asyncio.wait_for(
+                self.lag(), settings.db.replica_check_timeout_seconds
+            )
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"Replica {self.name} check failed: {str(e)}")
+            self.mark(False)
+            return
+        if lag > settings.db.replica_max_lag_seconds:
+            if self.healthy:
+                logger.warning(f"Replica {self.name} is {lag:.1f}s behind")
+            self.mark(False)
+            return
+        self.mark(True)
+
+
+class ReplicaSet:
+    def __init__(self, uris: List[str]) -> None:
+        self.replicas = [Replica(uri) for uri in uris]
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        return random.choice(healthy) if healthy else None
+
+    async def check(self) -> None:
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def run_health_checks(self) -> None:
+        while True:
+            await asyncio.sleep(settings.db.replica_check_interval_seconds)
+            await self.check()
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def state(self) -> Dict[Labels, float]:
+        return {(replica.name,): float(replica.healthy) for replica in self.replicas}
+
+
+replicas = ReplicaSet(settings.db.replica_uris)
+Gauge(
+    registry,
+    "db_replica_healthy",
+    "1 while a replica passes health checks and receives reads",
+    callback=replicas.state,
+    labels=("replica",),
+)
+
+
+class RoutingSession(Session):
+    # Everything goes to the primary unless a read_replica() block routed
+    # this session's reads elsewhere; flushes always go to the primary.
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        engine = self.info.get(READ_REPLICA)
+        if engine is not None and not self._flushing:
+            return engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session: Session, flush_context: Any) -> None:
+    session.info[WROTE] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _on_execute(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[WROTE] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session: Session) -> None:
+    user_id = session.info.get(USER_ID)
+    if session.info.pop(WROTE, False) and user_id is not None:
+        stick(user_id)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(WROTE, None)
+
+
+def stick(user_id: str) -> None:
+    if replicas:
+        channel.publish(STICKY_TOPIC, user_id)
+
+
+def set_user(db: AsyncSession, user_id: str) -> None:
+    db.info[USER_ID] = user_id
+
+
+@contextmanager
+def read_replica(db: AsyncSession, user_id: Optional[str] = None) -> Iterator[None]:
+    user_id = user_id or db.info.get(USER_ID)
+    replica = None
+    # Uncommitted writes of this session and recent ones of this user are
+    # only visible on the primary.
+    if replicas and not db.info.get(WROTE):
+        if user_id is None or sticky_users.get(user_id) is None:
+            replica = replicas.pick()
+
+    if replica is None:
+        reads.inc(labels=("primary",))
+        yield
+        return
+
+    reads.inc(labels=("replica",))
+    db.info[READ_REPLICA] = replica.engine
+    try:
+        yield
+    finally:
+        db.info.pop(READ_REPLICA, None)
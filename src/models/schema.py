@@ -0,0 +1,39 @@
+from typing import Optional
+
+from sqlalchemy import exc, text
+
+from . import blob, file, released_object, upload_session, user  # noqa: F401
+from .base import Base, engine
+
+# Head revision in migrations/versions. Set it to the revision of every new
+# migration, in the same commit.
+SCHEMA_VERSION = "0006"
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+async def get_schema_version() -> Optional[str]:
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+        except exc.ProgrammingError:
+            return None
+        except exc.OperationalError as e:
+            # SQLite reports a missing table as an operational error.
+            if "no such table" not in str(e):
+                raise
+            return None
+        return result.scalar_one_or_none()
+
+
+async def check_schema() -> None:
+    # The only schema work left at startup: one query instead of the catalog
+    # lookups create_all made for every table. Migrations run separately.
+    version = await get_schema_version()
+    if version != SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema is at {version or 'no version'}, expected "
+            f"{SCHEMA_VERSION}; run `make migrate`"
+        )
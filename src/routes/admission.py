@@ -0,0 +1,81 @@
+import re
+from typing import Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.admission import AdmissionService, Rejected
+from ..services.auth import AuthService, TokenType
+from ..services.exceptions import NotAuthorizedExc
+
+UPLOAD_ROUTES = (
+    ("POST", re.compile(r"^/file/?$")),
+    ("PUT", re.compile(r"^/file/?$")),
+    ("PUT", re.compile(r"^/file/sessions/[^/]+/parts/[^/]+$")),
+)
+
+
+def is_upload(scope: Scope) -> bool:
+    return any(
+        scope["method"] == method and pattern.match(scope["path"])
+        for method, pattern in UPLOAD_ROUTES
+    )
+
+
+def token_user_id(headers: Headers) -> Optional[str]:
+    # Only the signature is checked here; the route still loads the user.
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        return AuthService.verify_token(token.strip(), TokenType.ACCESS).get("sub")
+    except NotAuthorizedExc:
+        return None
+
+
+def content_length(headers: Headers) -> Optional[int]:
+    try:
+        return int(headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+
+class AdmissionMiddleware:
+    # Runs before the body is read, so a rejected upload costs no disk I/O.
+    # Requests without a valid token only count against the global limit.
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not is_upload(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        user_id = token_user_id(headers)
+        size = content_length(headers)
+        try:
+            await AdmissionService.acquire(user_id, size)
+        except Rejected as e:
+            response = JSONResponse(
+                {"msg": "Too many uploads, retry later"},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"retry-after": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        async def receive_wrapper() -> Message:
+            message = await receive()
+            AdmissionService.charge(user_id, len(message.get("body", b"")))
+            return message
+
+        try:
+            await self.app(
+                scope, receive if size is not None else receive_wrapper, send
+            )
+        finally:
+            AdmissionService.release(user_id)
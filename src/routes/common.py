@@ -0,0 +1,12 @@
+from typing import Any, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def json_response(schema: Type[BaseModel], data: Any) -> Response:
+    # List pages are validated once and dumped straight to JSON bytes by
+    # pydantic-core; returning the model would make FastAPI validate it again.
+    return Response(
+        schema.model_validate(data).model_dump_json(), media_type="application/json"
+    )
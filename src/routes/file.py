@@ -1,13 +1,36 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from secrets import token_hex
+from typing import AsyncIterator
+from urllib.parse import quote, unquote
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, Query, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from fastapi.responses import FileResponse as FastFileResponse
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..config.file import Compression
 from ..models.base import get_db
+from ..models.file import File
 from ..models.user import User, UserRole
 from ..schemas.file import (
     FileAdminResponse,
+    FileBatchAdminResponse,
+    FileBatchDeleteRequest,
+    FileBatchRequest,
+    FileBatchResponse,
+    FileBatchUserResponse,
     FileListAdminResponse,
     FileListUserResponse,
     FileResponse,
@@ -15,10 +38,169 @@ from ..schemas.file import (
     GetFilesListAdminRequest,
 )
 from ..services.auth import AccessType, AuthService
+from ..services.exceptions import BadRequestExc, ObjectNotFoundExc
 from ..services.file import FileService
+from ..services.pagination import projection
+from ..storage import storage
+from ..storage.archive import stream_zip
+from .common import json_response
 
 router = APIRouter()
 
+MAX_RANGES = 100
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def if_range_matches(if_range: str, headers: dict[str, str]) -> bool:
+    # Strong comparison, as FileResponse does: the exact ETag or date.
+    if if_range.startswith("W/"):
+        return False
+    return if_range in (headers["etag"], headers.get("last-modified"))
+
+
+def last_modified(created_at: datetime) -> str:
+    return format_datetime(created_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def accepts_encoding(accept_encoding: str | None, encoding: str) -> bool:
+    if accept_encoding is None:
+        return False
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        quality = params.strip().removeprefix("q=")
+        try:
+            return not params or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def content_disposition(filename: str) -> str:
+    # Plain ASCII for old clients, the exact name for everyone else.
+    fallback = "".join(
+        char if " " <= char < "\x7f" and char not in '"\\' else "_" for char in filename
+    )
+    encoded = quote(filename, safe="")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{encoded}"
+
+
+def unique_ids(ids: list[UUID]) -> list[str]:
+    return list(dict.fromkeys(str(file_id) for file_id in ids))
+
+
+def parse_range(range_header: str, size: int) -> list[tuple[int, int]] | None:
+    # None means the header is ignored and the whole file is sent.
+    unit, _, spec = range_header.partition("=")
+    specs = spec.split(",")
+    if unit.strip() != "bytes" or len(specs) > MAX_RANGES:
+        return None
+    ranges = []
+    for item in specs:
+        first, _, last = item.strip().partition("-")
+        try:
+            if not first:
+                ranges.append((max(size - int(last), 0), size))
+            else:
+                ranges.append((int(first), min(int(last) + 1, size) if last else size))
+        except ValueError:
+            return None
+    return ranges
+
+
+def merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+async def read_ranges(
+    file_path: str, ranges: list[tuple[int, int]], parts: list[bytes], closing: bytes
+) -> AsyncIterator[bytes]:
+    for (start, end), part in zip(ranges, parts):
+        yield part
+        async for chunk in storage.read(file_path, start, end):
+            yield chunk
+        yield b"\r\n"
+    yield closing
+
+
+async def stream_stored_file(
+    file_path: str,
+    media_type: str,
+    headers: dict[str, str],
+    range_header: str | None,
+    if_range: str | None,
+) -> Response:
+    stat = await storage.stat(file_path)
+    if stat is None:
+        raise ObjectNotFoundExc("File not found on disk")
+
+    headers = {**headers, "accept-ranges": "bytes"}
+    byte_ranges = None
+    if range_header is not None and (
+        if_range is None or if_range_matches(if_range, headers)
+    ):
+        byte_ranges = parse_range(range_header, stat.size)
+
+    if byte_ranges is None:
+        headers["content-length"] = str(stat.size)
+        return StreamingResponse(
+            storage.read(file_path), media_type=media_type, headers=headers
+        )
+
+    ranges = merge_ranges([(start, end) for start, end in byte_ranges if start < end])
+    if not ranges:
+        headers["content-range"] = f"bytes */{stat.size}"
+        return Response(
+            status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+            headers=headers,
+        )
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["content-range"] = f"bytes {start}-{end - 1}/{stat.size}"
+        headers["content-length"] = str(end - start)
+        return StreamingResponse(
+            storage.read(file_path, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    # Same layout as FileResponse sends for local files.
+    boundary = token_hex(13)
+    parts = [
+        (
+            f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end - 1}/{stat.size}\r\n\r\n"
+        ).encode("latin-1")
+        for start, end in ranges
+    ]
+    closing = f"--{boundary}--".encode("latin-1")
+    headers["content-length"] = str(
+        sum(len(part) + end - start + 2 for part, (start, end) in zip(parts, ranges))
+        + len(closing)
+    )
+    return StreamingResponse(
+        read_ranges(file_path, ranges, parts, closing),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
+    )
+
 
 @router.get("/", response_model=FileListAdminResponse | FileListUserResponse)
 async def get_files_list(
@@ -27,26 +209,33 @@ async def get_files_list(
     ),
     db: AsyncSession = Depends(get_db),
     body: GetFilesListAdminRequest = Query(),
-) -> FileListAdminResponse | FileListUserResponse:
+) -> Response:
+    schema, page_schema = FileAdminResponse, FileListAdminResponse
     if user.role == UserRole.CLIENT:
         body.is_history = True
         body.include_deleted = False
-    files, count = await FileService.get_list(
+        body.estimate_count = False
+        schema, page_schema = FileResponse, FileListUserResponse
+    files, count, next_cursor = await FileService.get_list(
         db,
         str(user.id),
         include_deleted=body.include_deleted,
         offset=body.offset,
         limit=body.limit,
         is_history=body.is_history,
+        cursor=body.cursor,
+        with_count=body.with_count,
+        estimate_count=body.estimate_count,
+        filters=body,
+        columns=projection(File, schema),
     )
-    if user.role == UserRole.ADMIN:
-        return FileListAdminResponse.model_validate(
-            {"objects": files, "total_count": count}
-        )
-    else:
-        return FileListUserResponse.model_validate(
-            {"objects": files, "total_count": count}
-        )
+    page = {
+        "objects": files,
+        "total_count": count.value if count else None,
+        "count_estimated": count.estimated if count else None,
+        "next_cursor": next_cursor,
+    }
+    return json_response(page_schema, page)
 
 
 @router.post("/", response_model=FileAdminResponse | FileResponse)
@@ -65,6 +254,106 @@ async def upload_file(
         return FileResponse.model_validate(obj)
 
 
+@router.put("/", response_model=FileAdminResponse | FileResponse)
+async def upload_file_raw(
+    request: Request,
+    filename: str | None = Query(default=None, min_length=1, max_length=255),
+    x_filename: str | None = Header(default=None),
+    content_type: str | None = Header(default=None),
+    content_length: int | None = Header(default=None, ge=0),
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> FileAdminResponse | FileResponse:
+    name = filename or (unquote(x_filename) if x_filename else None)
+    if not name or len(name) > 255:
+        raise BadRequestExc("Filename required")
+    if content_length is None:
+        raise BadRequestExc("Content-Length required")
+    obj = await FileService.upload_stream(
+        db,
+        user,
+        request.stream(),
+        filename=name,
+        declared_type=content_type,
+        size=content_length,
+    )
+
+    if user.role == UserRole.ADMIN:
+        return FileAdminResponse.model_validate(obj)
+    else:
+        return FileResponse.model_validate(obj)
+
+
+@router.get("/batch", response_model=FileBatchAdminResponse | FileBatchUserResponse)
+async def get_files_batch(
+    ids: list[UUID] = Query(min_length=1, max_length=200),
+    include_deleted: bool = Query(default=False),
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> FileBatchAdminResponse | FileBatchUserResponse:
+    # As in the list, only admins may see soft-deleted files.
+    if user.role == UserRole.CLIENT:
+        include_deleted = False
+    files, missing = await FileService.get_many(
+        db, unique_ids(ids), user, include_deleted=include_deleted
+    )
+    page = {"objects": files, "missing": missing}
+    if user.role == UserRole.ADMIN:
+        return FileBatchAdminResponse.model_validate(page)
+    else:
+        return FileBatchUserResponse.model_validate(page)
+
+
+@router.get("/archive")
+async def download_files_archive(
+    ids: list[UUID] = Query(min_length=1, max_length=200),
+    deflate: bool = Query(default=False),
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    entries = await FileService.get_archive(db, unique_ids(ids), user)
+    return StreamingResponse(
+        stream_zip(entries, deflate),
+        media_type="application/zip",
+        headers={"content-disposition": 'attachment; filename="files.zip"'},
+    )
+
+
+@router.post("/batch/delete", response_model=FileBatchResponse)
+async def delete_files_batch(
+    body: FileBatchDeleteRequest = Body(),
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> FileBatchResponse:
+    is_hard = body.is_hard
+    if user.role == AccessType.CLIENT:
+        is_hard = False
+    results = await FileService.delete_many(
+        db, unique_ids(body.ids), user, is_hard=is_hard
+    )
+    return FileBatchResponse(results=results)
+
+
+@router.post("/batch/restore", response_model=FileBatchResponse)
+async def restore_files_batch(
+    body: FileBatchRequest = Body(),
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> FileBatchResponse:
+    results = await FileService.restore_many(db, unique_ids(body.ids), user)
+    return FileBatchResponse(results=results)
+
+
 @router.get("/{file_id}", response_model=FileAdminResponse | FileResponse)
 async def get_file_info_by_id(
     file_id: UUID,
@@ -93,9 +382,50 @@ async def download_file_by_id(
         AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
     ),
     db: AsyncSession = Depends(get_db),
-) -> FastFileResponse:
-    file = await FileService.download_by_id(db, str(file_id), user)
-    return FastFileResponse(path=file.path, media_type=str(file.format))
+    if_none_match: str | None = Header(default=None),
+    range_header: str | None = Header(default=None, alias="range"),
+    if_range: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+) -> Response:
+    file = await FileService.get_for_download(db, str(file_id), user)
+    encoding = file.encoding
+    passthrough = encoding is not None and accepts_encoding(accept_encoding, encoding)
+
+    headers = {"etag": FileService.etag(file, encoding if passthrough else None)}
+    # Stored bytes never change for a file id, so both paths send the upload
+    # time and accept it as an If-Range validator.
+    if file.created_at is not None:
+        headers["last-modified"] = last_modified(file.created_at)
+    if encoding is not None:
+        headers["vary"] = "Accept-Encoding"
+    if passthrough:
+        headers["content-encoding"] = str(encoding)
+
+    if if_none_match is not None and etag_matches(if_none_match, headers["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    headers["content-disposition"] = content_disposition(str(file.filename))
+    # Rows uploaded before sniffing have no content type.
+    media_type = str(file.content_type or "application/octet-stream")
+
+    if encoding is not None and not passthrough:
+        # Decoded on the fly; ranges are ignored since they would need the
+        # stream to be decompressed from the start anyway.
+        await FileService.ensure_stored(file)
+        headers["content-length"] = str(file.size)
+        return StreamingResponse(
+            FileService.read(file),
+            media_type=media_type,
+            headers=headers,
+        )
+
+    local_path = storage.local_path(str(file.path))
+    if local_path is None:
+        return await stream_stored_file(
+            str(file.path), media_type, headers, range_header, if_range
+        )
+
+    await FileService.ensure_stored(file)
+    return FastFileResponse(path=local_path, media_type=media_type, headers=headers)
 
 
 @router.patch("/{file_id}", response_model=FileAdminResponse | FileResponse)
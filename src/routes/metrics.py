@@ -0,0 +1,126 @@
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.metrics import (
+    COUNT_BUCKETS,
+    SIZE_BUCKETS,
+    Counter,
+    Histogram,
+    QueryStats,
+    query_stats,
+    registry,
+)
+
+router = APIRouter()
+
+request_seconds = Histogram(
+    registry,
+    "http_request_duration_seconds",
+    "Time until the response body is sent",
+    labels=("method", "route", "status"),
+)
+request_bytes = Counter(
+    registry,
+    "http_request_bytes_total",
+    "Request body bytes received",
+    labels=("method", "route"),
+)
+response_bytes = Counter(
+    registry,
+    "http_response_bytes_total",
+    "Response body bytes sent",
+    labels=("method", "route"),
+)
+request_queries = Histogram(
+    registry,
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    labels=("method", "route"),
+    buckets=COUNT_BUCKETS,
+)
+request_db_seconds = Histogram(
+    registry,
+    "http_request_db_seconds",
+    "Time spent in SQL statements per request",
+    labels=("method", "route"),
+)
+response_size = Histogram(
+    registry,
+    "http_response_size_bytes",
+    "Response body size",
+    labels=("method", "route"),
+    buckets=SIZE_BUCKETS,
+)
+
+
+def route_template(scope: Scope) -> str:
+    # Put the parameter names back into the matched path to keep the number
+    # of label values bounded: /file/<uuid>/download -> /file/{file_id}/download
+    if scope.get("route") is None:
+        return "unmatched"
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(
+        f"{{{names[segment]}}}" if segment in names else segment
+        for segment in scope["path"].split("/")
+    )
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        status = 500
+        received = 0
+        sent = 0
+        content_length = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, sent, content_length
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-length":
+                        content_length = int(value)
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend":
+                sent += content_length
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            query_stats.reset(token)
+
+            labels = (scope["method"], route_template(scope))
+            request_seconds.observe(elapsed, labels + (str(status),))
+            request_bytes.inc(received, labels)
+            response_bytes.inc(sent, labels)
+            response_size.observe(sent, labels)
+            request_queries.observe(stats.count, labels)
+            request_db_seconds.observe(stats.duration, labels)
+
+
+@router.get("", include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
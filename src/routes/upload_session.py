@@ -0,0 +1,84 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Body, Depends, Path, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.base import get_db
+from ..models.user import User, UserRole
+from ..schemas.file import FileAdminResponse, FileResponse
+from ..schemas.upload_session import (
+    UploadPartResponse,
+    UploadSessionCreate,
+    UploadSessionResponse,
+)
+from ..services.auth import AccessType, AuthService
+from ..services.upload_session import UploadSessionService
+
+router = APIRouter()
+
+
+@router.post("/", response_model=UploadSessionResponse)
+async def create_upload_session(
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+    body: UploadSessionCreate = Body(),
+) -> UploadSessionResponse:
+    session = await UploadSessionService.create(db, user, body)
+    return await UploadSessionService.to_response(session)
+
+
+@router.get("/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: UUID,
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> UploadSessionResponse:
+    session = await UploadSessionService.get_by_id(db, str(session_id), user)
+    return await UploadSessionService.to_response(session)
+
+
+@router.put("/{session_id}/parts/{part_number}", response_model=UploadPartResponse)
+async def upload_part(
+    request: Request,
+    session_id: UUID,
+    part_number: int = Path(ge=1),
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> UploadPartResponse:
+    size = await UploadSessionService.put_part(
+        db, str(session_id), part_number, user, request.stream()
+    )
+    return UploadPartResponse(part_number=part_number, size=size)
+
+
+@router.post("/{session_id}/complete", response_model=FileAdminResponse | FileResponse)
+async def complete_upload_session(
+    session_id: UUID,
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> FileAdminResponse | FileResponse:
+    obj = await UploadSessionService.complete(db, str(session_id), user)
+
+    if user.role == UserRole.ADMIN:
+        return FileAdminResponse.model_validate(obj)
+    else:
+        return FileResponse.model_validate(obj)
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(
+    session_id: UUID,
+    user: User = Depends(
+        AuthService.requires_role([AccessType.ADMIN, AccessType.CLIENT])
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> None:
+    await UploadSessionService.abort(db, str(session_id), user)
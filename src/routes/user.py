@@ -1,21 +1,27 @@
 from uuid import UUID
 
-from fastapi import APIRouter, Body, Depends, Query, status
+from fastapi import APIRouter, Body, Depends, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.base import get_db
 from ..models.user import User, UserRole
+from ..schemas.common import CacheStatsResponse
 from ..schemas.user import (
     GetUsersListAdminRequest,
     UserAdminResponse,
     UserResponse,
     UsersListAdminResponse,
+    UsersUsageAdminResponse,
     UserUpdate,
     UserUpdateAdminRequest,
+    UserUsageResponse,
 )
 from ..services.auth import AccessType, AuthService
 from ..services.exceptions import ObjectNotFoundExc
-from ..services.user import UserService
+from ..services.pagination import projection
+from ..services.usage import UsageService
+from ..services.user import UserService, user_cache
+from .common import json_response
 
 router = APIRouter()
 
@@ -25,12 +31,65 @@ async def get_users_list(
     _: User = Depends(AuthService.requires_role([AccessType.ADMIN])),
     db: AsyncSession = Depends(get_db),
     filters: GetUsersListAdminRequest = Query(),
-) -> tuple[list[User], int]:
-    return await UserService.get_list(
+) -> Response:
+    users, count, next_cursor = await UserService.get_list(
         db,
         include_deleted=filters.include_deleted,
         offset=filters.offset,
         limit=filters.limit,
+        cursor=filters.cursor,
+        with_count=filters.with_count,
+        estimate_count=filters.estimate_count,
+        columns=projection(User, UserAdminResponse),
+    )
+    return json_response(
+        UsersListAdminResponse,
+        {
+            "objects": users,
+            "count": count.value if count else None,
+            "count_estimated": count.estimated if count else None,
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+@router.get("/usage", response_model=UsersUsageAdminResponse)
+async def get_users_usage(
+    _: User = Depends(AuthService.requires_role([AccessType.ADMIN])),
+    db: AsyncSession = Depends(get_db),
+    filters: GetUsersListAdminRequest = Query(),
+) -> UsersUsageAdminResponse:
+    users, count, next_cursor = await UserService.get_list(
+        db,
+        include_deleted=filters.include_deleted,
+        offset=filters.offset,
+        limit=filters.limit,
+        cursor=filters.cursor,
+        with_count=filters.with_count,
+        estimate_count=filters.estimate_count,
+    )
+    return UsersUsageAdminResponse(
+        objects=[
+            UserUsageResponse.model_validate(user).model_copy(
+                update={"quota_bytes": UsageService.quota(user)}
+            )
+            for user in users
+        ],
+        count=count.value if count else None,
+        count_estimated=count.estimated if count else None,
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def get_user_cache_stats(
+    _: User = Depends(AuthService.requires_role([AccessType.ADMIN])),
+) -> CacheStatsResponse:
+    return CacheStatsResponse(
+        size=len(user_cache),
+        hits=user_cache.hits,
+        misses=user_cache.misses,
+        hit_ratio=user_cache.hit_ratio,
     )
 
 
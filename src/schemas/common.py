@@ -4,7 +4,17 @@ from pydantic import BaseModel, Field
 class ObjectListRequest(BaseModel):
     limit: int = Field(default=50, gt=0, le=200)
     offset: int = Field(default=0, ge=0)
+    cursor: str | None = Field(default=None)
+    with_count: bool = Field(default=False)
 
 
 class ObjectListAdminFilters(BaseModel):
     include_deleted: bool = Field(default=False)
+    estimate_count: bool = Field(default=False)
+
+
+class CacheStatsResponse(BaseModel):
+    size: int
+    hits: int
+    misses: int
+    hit_ratio: float
@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import Any, Dict, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -20,6 +21,11 @@ class FileResponse(FileBase):
     id: UUID
     size: int
     path: str
+    checksum: Optional[str]
+    content_type: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = Field(
+        default=None, validation_alias="metadata_"
+    )
     created_at: datetime
 
     class Config:
@@ -29,6 +35,8 @@ class FileResponse(FileBase):
 class FileAdminResponse(FileResponse):
     deleted_at: Optional[datetime]
     user_id: UUID
+    encoding: Optional[str] = None
+    stored_size: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -36,17 +44,66 @@ class FileAdminResponse(FileResponse):
 
 class FileListUserResponse(BaseModel):
     objects: list[FileResponse]
-    total_count: int
+    total_count: Optional[int] = None
+    count_estimated: Optional[bool] = None
+    next_cursor: Optional[str] = None
 
 
 class FileListAdminResponse(BaseModel):
     objects: list[FileAdminResponse]
-    total_count: int
+    total_count: Optional[int] = None
+    count_estimated: Optional[bool] = None
+    next_cursor: Optional[str] = None
 
 
-class GetFilesListUserRequest(ObjectListRequest):
+class FileListFilters(BaseModel):
+    filename: str | None = Field(default=None, min_length=1, max_length=255)
+    filename_prefix: str | None = Field(default=None, min_length=1, max_length=255)
+    format: str | None = Field(default=None, max_length=10, example="mp3")
+    min_size: int | None = Field(default=None, ge=0)
+    max_size: int | None = Field(default=None, ge=0)
+    created_after: datetime | None = Field(default=None)
+    created_before: datetime | None = Field(default=None)
+
+
+class GetFilesListUserRequest(ObjectListRequest, FileListFilters):
     pass
 
 
 class GetFilesListAdminRequest(ObjectListAdminFilters, GetFilesListUserRequest):
     is_history: bool = Field(default=False)
+
+
+class FileBatchRequest(BaseModel):
+    ids: list[UUID] = Field(min_length=1, max_length=1000)
+
+
+class FileBatchDeleteRequest(FileBatchRequest):
+    is_hard: bool = Field(default=False)
+
+
+class FileBatchStatus(str, Enum):
+    OK = "ok"
+    NOT_FOUND = "not_found"
+    ACCESS_DENIED = "access_denied"
+    NOT_DELETED = "not_deleted"
+    ALREADY_DELETED = "already_deleted"
+
+
+class FileBatchResult(BaseModel):
+    id: UUID
+    status: FileBatchStatus
+
+
+class FileBatchResponse(BaseModel):
+    results: list[FileBatchResult]
+
+
+class FileBatchUserResponse(BaseModel):
+    objects: list[FileResponse]
+    missing: list[UUID]
+
+
+class FileBatchAdminResponse(BaseModel):
+    objects: list[FileAdminResponse]
+    missing: list[UUID]
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str = Field(max_length=255, example="my_song.mp3")
+    content_type: str = Field(max_length=255, example="audio/mpeg")
+    size: int = Field(gt=0, example=104857600)
+    part_size: Optional[int] = Field(default=None, gt=0, example=8388608)
+
+
+class UploadSessionResponse(BaseModel):
+    id: UUID
+    filename: str
+    content_type: str
+    size: int
+    part_size: int
+    part_count: int
+    created_at: datetime
+    expires_at: datetime
+    missing_parts: list[int]
+
+
+class UploadPartResponse(BaseModel):
+    part_number: int
+    size: int
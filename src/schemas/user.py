@@ -44,7 +44,28 @@ class UserAdminResponse(UserResponse):
 
 class UsersListAdminResponse(BaseModel):
     objects: list[UserAdminResponse]
-    count: int
+    count: int | None = None
+    count_estimated: bool | None = None
+    next_cursor: str | None = None
+
+
+class UserUsageResponse(BaseModel):
+    id: UUID
+    login: str
+    role: UserRole
+    used_bytes: int
+    file_count: int
+    quota_bytes: int | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class UsersUsageAdminResponse(BaseModel):
+    objects: list[UserUsageResponse]
+    count: int | None = None
+    count_estimated: bool | None = None
+    next_cursor: str | None = None
 
 
 class UserUpdateAdminRequest(UserUpdate):
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+
+from ..config import reload_settings, settings
+from .channel import channel
+from .metrics import Counter, Gauge, Histogram, Labels, registry
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_TOPIC = "settings"
+MB = 1024 * 1024
+
+# Idle users with a full bucket are forgotten once there are this many.
+PRUNE_SIZE = 1024
+
+queue_seconds = Histogram(
+    registry,
+    "upload_admission_wait_seconds",
+    "Time uploads waited for a free global slot",
+)
+rejected = Counter(
+    registry,
+    "upload_admission_rejected_total",
+    "Uploads turned away with 429, by the limit they hit",
+    labels=("reason",),
+)
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class ConcurrencyLimit:
+    # A FIFO semaphore whose size is read on every call, so a settings reload
+    # applies to the next upload; 0 means unlimited.
+
+    def __init__(self, limit: Callable[[], int]) -> None:
+        self._limit = limit
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self.active = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _free(self) -> bool:
+        limit = self._limit()
+        return limit == 0 or self.active < limit
+
+    async def acquire(self, timeout: float) -> bool:
+        if not self._waiters and self._free():
+            self.active += 1
+            return True
+        if timeout <= 0:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return False
+        except BaseException:
+            # The slot was handed over just as the client went away.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self.wake()
+
+    def wake(self) -> None:
+        while self._waiters and self._free():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+
+@dataclass
+class UserState:
+    active: int = 0
+    tokens: float = 0.0
+    updated: float = field(default_factory=time.monotonic)
+
+    def refill(self, rate: float, burst: float, now: float) -> None:
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+class AdmissionService:
+    # Decides before the request body is read whether an upload may start:
+    # a global concurrency limit with a bounded wait, then per-user limits on
+    # concurrent uploads and on bytes per second (a token bucket that may go
+    # into debt, so uploads larger than the burst still pass one at a time).
+
+    uploads = ConcurrencyLimit(lambda: settings.file.upload_max_concurrency)
+    users: Dict[str, UserState] = {}
+    _prune_size = PRUNE_SIZE
+
+    @staticmethod
+    def _rate() -> float:
+        return settings.file.upload_user_rate * MB
+
+    @staticmethod
+    def _burst() -> float:
+        burst = settings.file.upload_user_burst
+        return burst * MB if burst is not None else AdmissionService._rate()
+
+    @staticmethod
+    def _user(user_id: str, now: float) -> UserState:
+        users = AdmissionService.users
+        state = users.get(user_id)
+        if state is None:
+            if len(users) >= AdmissionService._prune_size:
+                AdmissionService._prune(now)
+            state = users[user_id] = UserState(
+                tokens=AdmissionService._burst(), updated=now
+            )
+        return state
+
+    @staticmethod
+    def _prune(now: float) -> None:
+        users = AdmissionService.users
+        rate, burst = AdmissionService._rate(), AdmissionService._burst()
+        for user_id, state in list(users.items()):
+            state.refill(rate, burst, now)
+            if state.active == 0 and state.tokens >= burst:
+                del users[user_id]
+        AdmissionService._prune_size = max(PRUNE_SIZE, 2 * len(users))
+
+    @staticmethod
+    def _reject(reason: str, retry_after: float) -> Rejected:
+        rejected.inc(labels=(reason,))
+        return Rejected(reason, retry_after)
+
+    @staticmethod
+    async def acquire(user_id: Optional[str], size: Optional[int]) -> None:
+        # Raises Rejected; on success the caller must call release().
+        retry_after = settings.file.upload_retry_after_seconds
+        state = None
+        if user_id is not None:
+            now = time.monotonic()
+            state = AdmissionService._user(user_id, now)
+            limit = settings.file.upload_user_max_concurrency
+            if limit and state.active >= limit:
+                raise AdmissionService._reject("user_concurrency", retry_after)
+
+            rate = AdmissionService._rate()
+            if rate:
+                state.refill(rate, AdmissionService._burst(), now)
+                if state.tokens <= 0:
+                    raise AdmissionService._reject("user_rate", -state.tokens / rate)
+                # Bodies of unknown length are charged as they arrive.
+                state.tokens -= size or 0
+            state.active += 1
+
+        started = time.perf_counter()
+        try:
+            admitted = await AdmissionService.uploads.acquire(
+                settings.file.upload_queue_timeout_seconds
+            )
+        except BaseException:
+            AdmissionService._release_user(state, refund=size)
+            raise
+        queue_seconds.observe(time.perf_counter() - started)
+        if not admitted:
+            AdmissionService._release_user(state, refund=size)
+            raise AdmissionService._reject("global", retry_after)
+
+    @staticmethod
+    def charge(user_id: Optional[str], size: int) -> None:
+        state = AdmissionService.users.get(user_id) if user_id is not None else None
+        if state is not None and settings.file.upload_user_rate:
+            state.tokens -= size
+
+    @staticmethod
+    def release(user_id: Optional[str]) -> None:
+        if user_id is not None:
+            AdmissionService._release_user(AdmissionService.users.get(user_id))
+        AdmissionService.uploads.release()
+
+    @staticmethod
+    def _release_user(state: Optional[UserState], refund: Optional[int] = None) -> None:
+        if state is None:
+            return
+        state.active -= 1
+        # Uploads that never started give their bytes back.
+        if refund and settings.file.upload_user_rate:
+            state.tokens += refund
+
+    @staticmethod
+    def state() -> Dict[Labels, float]:
+        return {
+            ("active",): float(AdmissionService.uploads.active),
+            ("waiting",): float(AdmissionService.uploads.waiting),
+        }
+
+
+Gauge(
+    registry,
+    "uploads",
+    "Uploads in progress and waiting for a global slot",
+    callback=AdmissionService.state,
+    labels=("state",),
+)
+
+
+def _reload(key: str) -> None:
+    try:
+        reload_settings()
+    except Exception as e:
+        logger.error(f"Settings reload failed, keeping the old ones: {str(e)}")
+        return
+    logger.info("Settings reloaded")
+    # A raised limit lets queued uploads through right away.
+    AdmissionService.uploads.wake()
+
+
+channel.subscribe(SETTINGS_TOPIC, _reload)
@@ -9,8 +9,10 @@ from sqlalchemy.sql import select
 
 from ..config import settings
 from ..models.base import get_db
+from ..models.replica import set_user
 from ..models.user import User, UserRole
 from ..schemas.auth import Token
+from ..services.count import CountService
 from ..services.exceptions import AccessDeniedExc, NotAuthorizedExc
 from ..services.user import UserService
 
@@ -68,6 +70,7 @@ class AuthService:
             )
             db.add(user)
             await db.commit()
+            CountService.invalidate_users()
 
         return user
 
@@ -105,7 +108,8 @@ class AuthService:
         if not user_id:
             raise INVALID_EXC
 
-        user = await UserService.get_by_id(db, user_id)
+        set_user(db, user_id)
+        user = await UserService.get_active_by_id(db, user_id)
         if user is None:
             raise INVALID_EXC
 
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.blob import Blob
+from ..models.file import File
+from ..storage import storage
+from ..storage.layout import sharded_key
+
+logger = logging.getLogger(__name__)
+
+BLOBS_PREFIX = "blobs"
+
+
+class AcquiredBlob(NamedTuple):
+    key: str
+    encoding: Optional[str]
+    stored_size: Optional[int]
+    created: bool
+
+
+class BlobService:
+    @staticmethod
+    def key_for(checksum: str) -> str:
+        # The suffix gives every incarnation of a blob its own key, so deleting
+        # a released blob after commit can never hit a re-uploaded copy.
+        return sharded_key(BLOBS_PREFIX, f"{checksum}.{uuid.uuid4().hex[:8]}")
+
+    @staticmethod
+    async def acquire(
+        db: AsyncSession,
+        temp_key: str,
+        checksum: str,
+        size: int,
+        encoding: Optional[str] = None,
+        stored_size: Optional[int] = None,
+    ) -> AcquiredBlob:
+        # An existing blob wins, together with the encoding it was stored in.
+        existing = await BlobService._increment(db, checksum)
+        if existing is not None:
+            await storage.delete(temp_key)
+            return existing
+
+        blob_key = BlobService.key_for(checksum)
+        await storage.rename(temp_key, blob_key)
+
+        try:
+            async with db.begin_nested():
+                db.add(
+                    Blob(
+                        checksum=checksum,
+                        size=size,
+                        path=blob_key,
+                        encoding=encoding,
+                        stored_size=stored_size,
+                        ref_count=1,
+                    )
+                )
+        except IntegrityError:
+            # A concurrent upload of the same content inserted the row first.
+            await storage.delete(blob_key)
+            existing = await BlobService._increment(db, checksum)
+            if existing is None:
+                raise
+            return existing
+        return AcquiredBlob(blob_key, encoding, stored_size, True)
+
+    @staticmethod
+    async def _increment(db: AsyncSession, checksum: str) -> Optional[AcquiredBlob]:
+        result = await db.execute(
+            update(Blob)
+            .where(Blob.checksum == checksum)
+            .values(ref_count=Blob.ref_count + 1)
+            .returning(Blob.path, Blob.encoding, Blob.stored_size)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return AcquiredBlob(row.path, row.encoding, row.stored_size, False)
+
+    @staticmethod
+    async def discard(db: AsyncSession, key: str) -> None:
+        result = await db.execute(select(Blob.checksum).where(Blob.path == key))
+        if result.scalar_one_or_none() is None:
+            await storage.delete(key)
+
+    @staticmethod
+    async def release(db: AsyncSession, file: File) -> Optional[str]:
+        # Reload under lock: the storage migration may have moved the file.
+        await db.refresh(file, with_for_update=True)
+        if file.checksum is not None:
+            result = await db.execute(
+                update(Blob)
+                .where(Blob.checksum == file.checksum)
+                .values(ref_count=Blob.ref_count - 1)
+                .returning(Blob.ref_count)
+            )
+            ref_count = result.scalar_one_or_none()
+            if ref_count is not None and ref_count > 0:
+                return None
+            await db.execute(delete(Blob).where(Blob.checksum == file.checksum))
+        return str(file.path)
+
+    @staticmethod
+    async def release_many(
+        db: AsyncSession, files: Sequence[Tuple[Optional[str], str]]
+    ) -> List[str]:
+        counts = Counter(checksum for checksum, _ in files if checksum is not None)
+        keys = [path for checksum, path in files if checksum is None]
+        if counts:
+            await db.execute(
+                update(Blob)
+                .where(Blob.checksum.in_(counts))
+                .values(ref_count=Blob.ref_count - case(counts, value=Blob.checksum))
+            )
+            result = await db.execute(
+                delete(Blob)
+                .where(Blob.checksum.in_(counts), Blob.ref_count <= 0)
+                .returning(Blob.path)
+            )
+            keys.extend(result.scalars().all())
+        return keys
+
+    @staticmethod
+    async def purge_many(keys: Sequence[str]) -> None:
+        semaphore = asyncio.Semaphore(settings.file.io_workers)
+
+        async def purge(key: str) -> None:
+            async with semaphore:
+                await BlobService.purge(key)
+
+        await asyncio.gather(*(purge(key) for key in keys))
+
+    @staticmethod
+    async def purge(key: Optional[str]) -> None:
+        if key is None:
+            return
+        try:
+            await storage.delete(key)
+        except Exception as e:
+            logger.warning(f"Removing {key} from storage failed: {str(e)}")
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SOCKET_SUFFIX = ".sock"
+
+
+class LocalChannel:
+    # Every worker on the host binds a datagram socket in a shared directory;
+    # publishing sends the message to every socket found there.
+
+    def __init__(self) -> None:
+        self._handlers: defaultdict[str, list[Callable[[str], None]]] = defaultdict(
+            list
+        )
+        self._directory: Optional[Path] = None
+        self._socket: Optional[socket.socket] = None
+        self._path: Optional[Path] = None
+
+    def subscribe(self, topic: str, handler: Callable[[str], None]) -> None:
+        self._handlers[topic].append(handler)
+
+    async def start(self, directory: str) -> None:
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._path = self._directory / f"{os.getpid()}{SOCKET_SUFFIX}"
+        self._path.unlink(missing_ok=True)
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(str(self._path))
+        asyncio.get_running_loop().add_reader(self._socket.fileno(), self._receive)
+
+    def stop(self) -> None:
+        if self._socket is not None:
+            asyncio.get_running_loop().remove_reader(self._socket.fileno())
+            self._socket.close()
+            self._socket = None
+        if self._path is not None:
+            self._path.unlink(missing_ok=True)
+            self._path = None
+
+    def publish(self, topic: str, key: str) -> None:
+        self._dispatch(topic, key)
+        if self._socket is None or self._directory is None:
+            return
+
+        message = f"{topic}\n{key}".encode()
+        for path in self._directory.glob(f"*{SOCKET_SUFFIX}"):
+            if path == self._path:
+                continue
+            try:
+                self._socket.sendto(message, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                logger.warning(f"Invalidation channel {path} is full")
+
+    def _receive(self) -> None:
+        assert self._socket is not None
+        while True:
+            try:
+                message = self._socket.recv(4096)
+            except BlockingIOError:
+                return
+            topic, _, key = message.decode().partition("\n")
+            self._dispatch(topic, key)
+
+    def _dispatch(self, topic: str, key: str) -> None:
+        for handler in self._handlers.get(topic, []):
+            handler(key)
+
+
+channel = LocalChannel()
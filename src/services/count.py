@@ -0,0 +1,92 @@
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import Select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from .cache import TTLCache
+from .channel import channel
+from .metrics import register_cache
+
+COUNT_TOPIC = "count"
+USERS = "*"
+
+CountKey = tuple[str, Optional[str], bool]
+
+count_cache: TTLCache[CountKey, int] = TTLCache(
+    ttl=settings.cache.count_ttl_seconds, max_size=settings.cache.count_max_size
+)
+register_cache("count", count_cache)
+
+
+class TotalCount(NamedTuple):
+    value: int
+    estimated: bool
+
+
+def _invalidate(owner: str) -> None:
+    for include_deleted in (False, True):
+        if owner == USERS:
+            count_cache.invalidate(("users", None, include_deleted))
+            continue
+        # A change to one user's files also changes the listing of all files.
+        count_cache.invalidate(("files", owner, include_deleted))
+        count_cache.invalidate(("files", None, include_deleted))
+
+
+channel.subscribe(COUNT_TOPIC, _invalidate)
+
+
+class CountService:
+    @staticmethod
+    async def get(
+        db: AsyncSession,
+        key: Optional[CountKey],
+        query: Select[Any],
+        estimate: bool = False,
+    ) -> TotalCount:
+        if key is None:
+            return TotalCount((await db.execute(query)).scalar_one(), False)
+
+        # Only listings without filters can use the planner statistics: the
+        # row estimate of the whole table says nothing about a subset of it.
+        table, owner, include_deleted = key
+        if estimate and owner is None and include_deleted:
+            estimated = await CountService.estimate(db, table)
+            if estimated is not None:
+                return TotalCount(estimated, True)
+
+        if settings.cache.enabled:
+            cached = count_cache.get(key)
+            if cached is not None:
+                return TotalCount(cached, False)
+
+        count = (await db.execute(query)).scalar_one()
+        if settings.cache.enabled:
+            count_cache.set(key, count)
+        return TotalCount(count, False)
+
+    @staticmethod
+    async def estimate(db: AsyncSession, table: str) -> Optional[int]:
+        if db.get_bind().dialect.name != "postgresql":
+            return None
+        result = await db.execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = CAST(:table AS regclass)"
+            ),
+            {"table": table},
+        )
+        reltuples = result.scalar_one_or_none()
+        # -1 until the table is vacuumed or analyzed for the first time.
+        if reltuples is None or reltuples < 0:
+            return None
+        return int(reltuples)
+
+    @staticmethod
+    def invalidate_files(user_id: str) -> None:
+        channel.publish(COUNT_TOPIC, user_id)
+
+    @staticmethod
+    def invalidate_users() -> None:
+        channel.publish(COUNT_TOPIC, USERS)
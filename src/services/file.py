@@ -1,26 +1,70 @@
+import asyncio
 import logging
+import time
 import uuid
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set
 
 from fastapi import UploadFile
-from sqlalchemy import desc, func, select
+from sqlalchemy import ColumnElement, Update, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 
 from ..config import settings
+from ..config.file import Compression
 from ..models.file import File
+from ..models.replica import read_replica
 from ..models.user import User, UserRole
-from ..schemas.file import FileUpdate
+from ..schemas.file import (
+    FileBatchResult,
+    FileBatchStatus,
+    FileListFilters,
+    FileUpdate,
+)
+from ..storage import io, storage
+from ..storage.archive import ArchiveEntry
+from ..storage.base import StorageWriter
+from ..storage.compression import CompressedWriter, decompress
+from . import media
+from .blob import BlobService
+from .count import CountService, TotalCount
 from .exceptions import (
     AccessDeniedExc,
     BadRequestExc,
     ObjectNotFoundExc,
     SomethingWrongExc,
 )
+from .metadata import MetadataService
+from .metrics import SIZE_BUCKETS, Counter, Histogram, registry
+from .pagination import as_dicts, paginate, split_page
+from .usage import UsageService
 
 logger = logging.getLogger(__name__)
 
+TEMP_PREFIX = "tmp"
+
+upload_bytes = Counter(registry, "file_upload_bytes_total", "Stored upload bytes")
+upload_seconds = Histogram(
+    registry,
+    "file_upload_duration_seconds",
+    "Time to stream an upload to storage and record it",
+)
+upload_size = Histogram(
+    registry, "file_upload_size_bytes", "Stored upload size", buckets=SIZE_BUCKETS
+)
+upload_rejected = Counter(
+    registry,
+    "file_upload_rejected_total",
+    "Uploads rejected before storing",
+    labels=("reason",),
+)
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
 class FileService:
     @staticmethod
@@ -31,10 +75,21 @@ class FileService:
         offset: int = 0,
         limit: int = 100,
         is_history: bool = True,
-    ) -> tuple[List[File], int]:
-        query = select(File)
+        cursor: Optional[str] = None,
+        with_count: bool = False,
+        estimate_count: bool = False,
+        filters: Optional[FileListFilters] = None,
+        columns: Optional[Sequence[InstrumentedAttribute[Any]]] = None,
+    ) -> tuple[List[Any], Optional[TotalCount], Optional[str]]:
+        # With columns the page holds dicts of just those columns.
+        query = select(*columns) if columns else select(File)
         query_count = select(func.count()).select_from(File)
 
+        conditions = FileService.filter_conditions(filters) if filters else []
+        if conditions:
+            query = query.where(*conditions)
+            query_count = query_count.where(*conditions)
+
         if is_history:
             query = query.where(File.user_id == user_id)
             query_count = query_count.where(File.user_id == user_id)
@@ -43,16 +98,56 @@ class FileService:
             query = query.where(File.deleted_at.is_(None))
             query_count = query_count.where(File.deleted_at.is_(None))
 
-        query = query.order_by(desc(File.created_at))
+        query = paginate(query, File.created_at, File.id, cursor, offset, limit)
+
+        with read_replica(db):
+            result = await db.execute(query)
+            rows = as_dicts(result) if columns else result.scalars().all()
+            files, next_cursor = split_page(rows, limit)
 
-        result = await db.execute(query.offset(offset).limit(limit))
-        count = await db.execute(query_count)
-        return result.scalars().all(), count.scalar_one()
+            count = None
+            if with_count:
+                # Filtered counts are neither cached nor estimated.
+                key = None
+                if not conditions:
+                    key = ("files", user_id if is_history else None, include_deleted)
+                count = await CountService.get(db, key, query_count, estimate_count)
+        return files, count, next_cursor
+
+    @staticmethod
+    def filter_conditions(filters: FileListFilters) -> List[ColumnElement[bool]]:
+        conditions: List[ColumnElement[bool]] = []
+        if filters.filename is not None:
+            pattern = f"%{escape_like(filters.filename)}%"
+            conditions.append(File.filename.ilike(pattern, escape="\\"))
+        if filters.filename_prefix is not None:
+            # Matches the lower(filename) expression index.
+            pattern = f"{escape_like(filters.filename_prefix.lower())}%"
+            conditions.append(func.lower(File.filename).like(pattern, escape="\\"))
+        if filters.format is not None:
+            conditions.append(File.format == filters.format.lower())
+        if filters.min_size is not None:
+            conditions.append(File.size >= filters.min_size)
+        if filters.max_size is not None:
+            conditions.append(File.size <= filters.max_size)
+        if filters.created_after is not None:
+            conditions.append(File.created_at >= filters.created_after)
+        if filters.created_before is not None:
+            conditions.append(File.created_at < filters.created_before)
+        return conditions
 
     @staticmethod
     async def get_info_by_id(
         db: AsyncSession, file_id: str, include_deleted: bool = False
     ) -> Optional[File]:
+        with read_replica(db):
+            return await FileService._get_by_id(db, file_id, include_deleted)
+
+    @staticmethod
+    async def _get_by_id(
+        db: AsyncSession, file_id: str, include_deleted: bool = False
+    ) -> Optional[File]:
+        # Changes start from the primary's copy, never a lagging replica's.
         query = select(File).where(File.id == file_id)
         if not include_deleted:
             query = query.where(File.deleted_at.is_(None))
@@ -61,7 +156,7 @@ class FileService:
         return result.scalars().first()
 
     @staticmethod
-    async def download_by_id(db: AsyncSession, file_id: str, user: User) -> File:
+    async def get_for_download(db: AsyncSession, file_id: str, user: User) -> File:
         file = await FileService.get_info_by_id(db, file_id)
         if not file:
             logger.debug(f"File {file_id} not found")
@@ -71,74 +166,262 @@ class FileService:
             logger.debug(f"File {file_id} access denied")
             raise AccessDeniedExc("Access denied")
 
-        file_path = Path(file.path)
-        if not file_path.exists():
-            logger.debug(f"File {file_id} not found on disk")
+        return file
+
+    @staticmethod
+    async def ensure_stored(file: File) -> None:
+        if await storage.stat(str(file.path)) is None:
+            logger.debug(f"File {file.id} not found on disk")
             raise ObjectNotFoundExc("File not found on disk")
 
+    @staticmethod
+    async def download_by_id(db: AsyncSession, file_id: str, user: User) -> File:
+        file = await FileService.get_for_download(db, file_id, user)
+        await FileService.ensure_stored(file)
         return file
 
     @staticmethod
-    async def upload(db: AsyncSession, user: User, upload_file: UploadFile) -> File:
+    def read(file: File) -> AsyncIterator[bytes]:
+        stream = storage.read(str(file.path))
+        if file.encoding is None:
+            return stream
+        return decompress(stream, Compression(file.encoding))
+
+    @staticmethod
+    async def get_archive(
+        db: AsyncSession, file_ids: List[str], user: User
+    ) -> List[ArchiveEntry]:
+        files, missing = await FileService.get_many(db, file_ids, user)
+        if missing:
+            logger.debug(f"Files {missing} not found")
+            raise ObjectNotFoundExc(f"Files not found: {', '.join(missing)}")
+
+        # Nothing can be reported once the archive has started streaming, so
+        # every object is checked upfront.
+        semaphore = asyncio.Semaphore(settings.file.io_workers)
+
+        async def stat(file: File) -> bool:
+            async with semaphore:
+                return await storage.stat(str(file.path)) is not None
+
+        stored = await asyncio.gather(*(stat(file) for file in files))
+        if not all(stored):
+            raise ObjectNotFoundExc("File not found on disk")
+
+        names: Set[str] = set()
+        entries = []
+        for file in files:
+            entries.append(
+                ArchiveEntry(
+                    name=FileService._archive_name(str(file.filename), names),
+                    size=int(file.size),
+                    modified_at=file.created_at,
+                    open=partial(FileService.read, file),
+                )
+            )
+        return entries
+
+    @staticmethod
+    def _archive_name(filename: str, names: Set[str]) -> str:
+        name = filename.replace("/", "_").replace("\\", "_").lstrip(".") or "file"
+        path = Path(name)
+        number = 0
+        while name.lower() in names:
+            number += 1
+            name = f"{path.stem} ({number}){path.suffix}"
+        names.add(name.lower())
+        return name
+
+    @staticmethod
+    def etag(file: File, encoding: Optional[str] = None) -> str:
+        # Each content encoding is a separate representation with its own tag.
+        suffix = f"-{encoding}" if encoding else ""
+        if file.checksum is not None:
+            return f'"{file.size}-{file.checksum}{suffix}"'
+        return f'"{file.size}-{file.created_at:%Y%m%d%H%M%S%f}{suffix}"'
+
+    @staticmethod
+    def check_format(content_type: str | None) -> None:
         if (
             "*" not in settings.file.supported_formats
-            and upload_file.content_type not in settings.file.supported_formats
+            and content_type not in settings.file.supported_formats
         ):
-            logger.debug(f"Invalid file type: {upload_file.content_type}")
+            logger.debug(f"Invalid file type: {content_type}")
+            upload_rejected.inc(labels=("type",))
             raise BadRequestExc("Invalid file type")
 
-        user_dir = Path("/uploads") / str(user.id)
-        user_dir.mkdir(exist_ok=True, parents=True)
+    @staticmethod
+    def sniff(head: bytes, declared: str | None) -> str:
+        content_type = media.sniff(head, declared)
+        if declared is not None and content_type != declared:
+            logger.debug(f"Declared type {declared} detected as {content_type}")
+        FileService.check_format(content_type)
+        return content_type
 
-        file_ext = str(upload_file.filename).split(".")[-1]
-        file_id = str(uuid.uuid4())
-        filename = f"{file_id}.{file_ext}"
-        file_path = user_dir / filename
-        temp_path = file_path.with_suffix(".tmp")
+    @staticmethod
+    async def upload(db: AsyncSession, user: User, upload_file: UploadFile) -> File:
+        await UsageService.check(db, user, upload_file.size or 0)
+        try:
+            return await FileService._upload(
+                db,
+                user,
+                FileService._read_upload(upload_file),
+                filename=str(upload_file.filename),
+                declared_type=upload_file.content_type,
+            )
+        finally:
+            await upload_file.close()
 
-        new_file: File
+    @staticmethod
+    async def upload_stream(
+        db: AsyncSession,
+        user: User,
+        stream: AsyncIterator[bytes],
+        filename: str,
+        declared_type: Optional[str],
+        size: int,
+    ) -> File:
+        # The request body goes straight to storage: no spooled copy, and
+        # the size is known before the first byte is read.
+        FileService.check_size(size)
+        await UsageService.check(db, user, size)
+        return await FileService._upload(
+            db,
+            user,
+            io.rechunk(stream, settings.file.chunk_size),
+            filename=filename,
+            declared_type=declared_type,
+            size=size,
+        )
+
+    @staticmethod
+    async def _read_upload(upload_file: UploadFile) -> AsyncIterator[bytes]:
+        while chunk := await upload_file.read(settings.file.chunk_size):
+            yield chunk
+
+    @staticmethod
+    def check_size(size: int) -> None:
+        if size > settings.file.max_size * 1024 * 1024:
+            upload_rejected.inc(labels=("size",))
+            raise BadRequestExc("File too large")
+
+    @staticmethod
+    async def _upload(
+        db: AsyncSession,
+        user: User,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        declared_type: Optional[str],
+        size: Optional[int] = None,
+    ) -> File:
+        file_id = str(uuid.uuid4())
+        temp_key = FileService.temp_key(file_id)
+        started = time.perf_counter()
 
         try:
-            file_size = 0
-            with open(temp_path, "wb") as buffer:
-                while chunk := await upload_file.read(1024 * 1024):
-                    file_size += len(chunk)
-                    if file_size > settings.file.max_size * 1024 * 1024:
+            chunk = await anext(chunks, b"")
+            content_type = FileService.sniff(chunk, declared_type)
+
+            async with FileService.writer(temp_key, content_type) as buffer:
+                if size is not None and settings.file.preallocate:
+                    await buffer.preallocate(size)
+                while chunk:
+                    if buffer.size + len(chunk) > settings.file.max_size * 1024 * 1024:
                         logger.debug(f"File {file_id} too large")
+                        upload_rejected.inc(labels=("size",))
                         raise BadRequestExc("File too large")
-                    buffer.write(chunk)
+                    await buffer.write(chunk)
+                    chunk = await anext(chunks, b"")
+                if size is not None and buffer.size != size:
+                    raise BadRequestExc("Body does not match Content-Length")
+
+            file = await FileService.store(
+                db,
+                user,
+                file_id,
+                temp_key,
+                filename=filename,
+                content_type=content_type,
+                size=buffer.size,
+                checksum=buffer.checksum,
+                encoding=buffer.encoding,
+                stored_size=buffer.stored_size,
+            )
+            upload_bytes.inc(buffer.size)
+            upload_size.observe(buffer.size)
+            upload_seconds.observe(time.perf_counter() - started)
+            return file
 
-            temp_path.rename(file_path)
+        except BadRequestExc:
+            raise
+        except Exception as e:
+            logger.warning(f"File upload failed: {str(e)}")
+            raise SomethingWrongExc("File upload failed")
+
+    @staticmethod
+    def temp_key(file_id: str) -> str:
+        return f"{TEMP_PREFIX}/{file_id}.tmp"
+
+    @staticmethod
+    def writer(key: str, content_type: str | None) -> StorageWriter:
+        writer = storage.writer(key)
+        encoding = settings.file.compression.get(str(content_type))
+        if encoding is None:
+            return writer
+        return CompressedWriter(writer, encoding, settings.file.compression_level)
+
+    @staticmethod
+    async def store(
+        db: AsyncSession,
+        user: User,
+        file_id: str,
+        temp_key: str,
+        filename: str,
+        content_type: str,
+        size: int,
+        checksum: str,
+        encoding: Optional[str] = None,
+        stored_size: Optional[int] = None,
+    ) -> File:
+        blob = None
+        try:
+            await UsageService.reserve(db, user, size)
+            blob = await BlobService.acquire(
+                db, temp_key, checksum, size, encoding, stored_size
+            )
 
             new_file = File(
                 id=file_id,
                 user_id=user.id,
-                filename=str(upload_file.filename),
-                size=file_size,
-                format=str(upload_file.content_type).split("/")[-1],
-                path=str(file_path),
+                filename=filename,
+                size=size,
+                format=media.extension(content_type),
+                content_type=content_type,
+                metadata_=MetadataService.initial(content_type),
+                path=blob.key,
+                checksum=checksum,
+                encoding=blob.encoding,
+                stored_size=blob.stored_size,
             )
 
             db.add(new_file)
             await db.commit()
             await db.refresh(new_file)
-
-        except Exception as e:
-            if temp_path.exists():
-                temp_path.unlink()
-            if file_path.exists():
-                file_path.unlink()
-            logger.warning(f"File upload failed: {str(e)}")
-            raise SomethingWrongExc("File upload failed")
-        finally:
-            await upload_file.close()
+            CountService.invalidate_files(str(user.id))
+            MetadataService.schedule(new_file)
+        except Exception:
+            await db.rollback()
+            await storage.delete(temp_key)
+            if blob is not None and blob.created:
+                await BlobService.discard(db, blob.key)
+            raise
         return new_file
 
     @staticmethod
     async def update_info_by_id(
         db: AsyncSession, file_id: str, update_data: FileUpdate, user: User
     ) -> File:
-        file = await FileService.get_info_by_id(db, file_id)
+        file = await FileService._get_by_id(db, file_id)
         if not file:
             logger.debug(f"File {file_id} not found")
             raise ObjectNotFoundExc("File not found")
@@ -147,19 +430,11 @@ class FileService:
             logger.debug(f"File {file_id} access denied")
             raise AccessDeniedExc("Access denied")
 
+        # The filename is only shown to people; storage keys never derive
+        # from it, so a rename touches the row and nothing else.
         update_dict = update_data.model_dump(exclude_unset=True)
         if "filename" in update_dict:
-            new_filename = update_dict["filename"]
-            old_path = Path(file.path)
-            new_path = old_path.with_name(new_filename)
-
-            try:
-                old_path.rename(new_path)
-                file.path = str(new_path)
-                file.filename = new_filename
-            except OSError as e:
-                logger.warning(f"File rename failed: {str(e)}")
-                raise SomethingWrongExc("File rename failed")
+            file.filename = update_dict["filename"]
 
         await db.commit()
         await db.refresh(file)
@@ -169,7 +444,7 @@ class FileService:
     async def delete_by_id(
         db: AsyncSession, file_id: str, user: User, is_hard: bool = False
     ) -> None:
-        file = await FileService.get_info_by_id(db, file_id, include_deleted=True)
+        file = await FileService._get_by_id(db, file_id, include_deleted=True)
         if not file:
             logger.debug(f"File {file_id} not found")
             raise ObjectNotFoundExc("File not found")
@@ -178,25 +453,27 @@ class FileService:
             logger.debug(f"File {file_id} access denied")
             raise AccessDeniedExc("Access denied")
 
-        if is_hard:
-            try:
-                Path(file.path).unlink()
-            except FileNotFoundError:
-                pass
-            await db.delete(file)
-        else:
-            file.deleted_at = datetime.now(datetime.timezone.utc)
-
+        released = None
         try:
+            if is_hard:
+                released = await BlobService.release(db, file)
+                await UsageService.release(db, [(str(file.user_id), int(file.size))])
+                await db.delete(file)
+            else:
+                await db.execute(FileService._soft_delete([File.id == file.id]))
+
             await db.commit()
         except Exception as e:
             await db.rollback()
             logger.warning(f"Deletion failed: {str(e)}")
             raise SomethingWrongExc("Deletion failed")
 
+        CountService.invalidate_files(str(file.user_id))
+        await BlobService.purge(released)
+
     @staticmethod
     async def restore_by_id(db: AsyncSession, file_id: str, user: User) -> File:
-        file = await FileService.get_info_by_id(db, file_id, include_deleted=True)
+        file = await FileService._get_by_id(db, file_id, include_deleted=True)
         if not file:
             logger.debug(f"File {file_id} not found")
             raise ObjectNotFoundExc("File not found")
@@ -211,5 +488,157 @@ class FileService:
 
         file.deleted_at = None
         await db.commit()
+        CountService.invalidate_files(str(file.user_id))
         await db.refresh(file)
         return file
+
+    @staticmethod
+    async def get_many(
+        db: AsyncSession, file_ids: List[str], user: User, include_deleted: bool = False
+    ) -> tuple[List[File], List[str]]:
+        query = select(File).where(File.id.in_(file_ids))
+        if user.role != UserRole.ADMIN:
+            query = query.where(File.user_id == user.id)
+        if not include_deleted:
+            query = query.where(File.deleted_at.is_(None))
+
+        result = await db.execute(query)
+        found = {str(file.id): file for file in result.scalars().all()}
+        return (
+            [found[file_id] for file_id in file_ids if file_id in found],
+            [file_id for file_id in file_ids if file_id not in found],
+        )
+
+    @staticmethod
+    async def _check_batch(
+        db: AsyncSession, file_ids: List[str], user: User
+    ) -> tuple[Dict[str, FileBatchStatus], List[str]]:
+        result = await db.execute(
+            select(File.id, File.user_id).where(File.id.in_(file_ids))
+        )
+        owners = {str(file_id): str(user_id) for file_id, user_id in result.all()}
+
+        statuses: Dict[str, FileBatchStatus] = {}
+        allowed = []
+        for file_id in file_ids:
+            if file_id not in owners:
+                statuses[file_id] = FileBatchStatus.NOT_FOUND
+            elif owners[file_id] != user.id and user.role != UserRole.ADMIN:
+                statuses[file_id] = FileBatchStatus.ACCESS_DENIED
+            else:
+                allowed.append(file_id)
+        return statuses, allowed
+
+    @staticmethod
+    def _batch_filter(file_ids: List[str], user: User) -> List[ColumnElement[bool]]:
+        conditions = [File.id.in_(file_ids)]
+        if user.role != UserRole.ADMIN:
+            conditions.append(File.user_id == user.id)
+        return conditions
+
+    @staticmethod
+    def _soft_delete(conditions: List[ColumnElement[bool]]) -> Update:
+        # Rows deleted before keep their purge deadline.
+        return (
+            update(File)
+            .where(*conditions, File.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow())
+        )
+
+    @staticmethod
+    def _batch_results(
+        file_ids: List[str], statuses: Dict[str, FileBatchStatus]
+    ) -> List[FileBatchResult]:
+        return [
+            FileBatchResult(id=file_id, status=statuses[file_id])
+            for file_id in file_ids
+        ]
+
+    @staticmethod
+    async def delete_many(
+        db: AsyncSession, file_ids: List[str], user: User, is_hard: bool = False
+    ) -> List[FileBatchResult]:
+        statuses, allowed = await FileService._check_batch(db, file_ids, user)
+        if not allowed:
+            return FileService._batch_results(file_ids, statuses)
+
+        released: List[str] = []
+        try:
+            if is_hard:
+                result = await db.execute(
+                    delete(File)
+                    .where(*FileService._batch_filter(allowed, user))
+                    .returning(
+                        File.id, File.checksum, File.path, File.user_id, File.size
+                    )
+                )
+                rows = result.all()
+                released = await BlobService.release_many(
+                    db, [(row.checksum, row.path) for row in rows]
+                )
+                await UsageService.release(
+                    db, [(row.user_id, row.size) for row in rows]
+                )
+            else:
+                result = await db.execute(
+                    FileService._soft_delete(
+                        FileService._batch_filter(allowed, user)
+                    ).returning(File.id, File.user_id)
+                )
+                rows = result.all()
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Batch deletion failed: {str(e)}")
+            raise SomethingWrongExc("Deletion failed")
+
+        for owner in {str(row.user_id) for row in rows}:
+            CountService.invalidate_files(owner)
+
+        deleted = {str(row.id) for row in rows}
+        missed = (
+            FileBatchStatus.NOT_FOUND if is_hard else FileBatchStatus.ALREADY_DELETED
+        )
+        for file_id in allowed:
+            statuses[file_id] = FileBatchStatus.OK if file_id in deleted else missed
+
+        await BlobService.purge_many(released)
+        return FileService._batch_results(file_ids, statuses)
+
+    @staticmethod
+    async def restore_many(
+        db: AsyncSession, file_ids: List[str], user: User
+    ) -> List[FileBatchResult]:
+        statuses, allowed = await FileService._check_batch(db, file_ids, user)
+        if not allowed:
+            return FileService._batch_results(file_ids, statuses)
+
+        try:
+            result = await db.execute(
+                update(File)
+                .where(
+                    *FileService._batch_filter(allowed, user),
+                    File.deleted_at.is_not(None),
+                )
+                .values(deleted_at=None)
+                .returning(File.id, File.user_id)
+            )
+            rows = result.all()
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Batch restoration failed: {str(e)}")
+            raise SomethingWrongExc("Restoration failed")
+
+        for owner in {str(row.user_id) for row in rows}:
+            CountService.invalidate_files(owner)
+
+        restored = {str(row.id) for row in rows}
+
+        for file_id in allowed:
+            statuses[file_id] = (
+                FileBatchStatus.OK
+                if file_id in restored
+                else FileBatchStatus.NOT_DELETED
+            )
+        return FileService._batch_results(file_ids, statuses)
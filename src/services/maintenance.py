@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.base import async_session
+from ..models.blob import Blob
+from ..models.file import File
+from ..models.lock import try_lock
+from ..models.released_object import ReleasedObject
+from ..storage import storage
+from ..storage.base import ObjectStat
+from .blob import BLOBS_PREFIX, BlobService
+from .count import CountService
+from .file import TEMP_PREFIX
+from .metadata import MetadataService
+from .metrics import Counter, Gauge, registry
+from .storage_migration import StorageMigrationService
+from .usage import UsageService
+
+logger = logging.getLogger(__name__)
+
+TEMP_SUFFIX = ".tmp"
+
+last_run: Dict[str, float] = {"missing": 0}
+
+purged_files = Counter(
+    registry,
+    "maintenance_purged_files_total",
+    "Soft-deleted files removed after the retention period",
+)
+removed_objects = Counter(
+    registry,
+    "maintenance_removed_objects_total",
+    "Objects removed from storage by the maintenance worker",
+    labels=("reason",),
+)
+Gauge(
+    registry,
+    "maintenance_missing_objects",
+    "Rows whose bytes were missing from storage on the last run",
+    callback=lambda: {(): last_run["missing"]},
+)
+
+
+class MaintenanceService:
+    @staticmethod
+    async def purge_deleted(db: AsyncSession) -> int:
+        cutoff = datetime.utcnow() - timedelta(days=settings.maintenance.retention_days)
+        purged = 0
+        while True:
+            result = await db.execute(
+                select(File.id)
+                .where(File.deleted_at < cutoff)
+                .limit(settings.maintenance.batch_size)
+            )
+            file_ids = list(result.scalars().all())
+            if not file_ids:
+                return purged
+
+            result = await db.execute(
+                delete(File)
+                .where(File.id.in_(file_ids), File.deleted_at < cutoff)
+                .returning(File.checksum, File.path, File.user_id, File.size)
+            )
+            rows = result.all()
+            released = await BlobService.release_many(
+                db, [(row.checksum, row.path) for row in rows]
+            )
+            await UsageService.release(db, [(row.user_id, row.size) for row in rows])
+            await db.commit()
+            for owner in {str(row.user_id) for row in rows}:
+                CountService.invalidate_files(owner)
+            await BlobService.purge_many(released)
+
+            # Rows restored in the meantime are skipped by the DELETE.
+            purged += len(rows)
+            purged_files.inc(len(rows))
+            await asyncio.sleep(settings.maintenance.batch_pause_seconds)
+
+    @staticmethod
+    async def remove_stale_temp() -> int:
+        cutoff = time.time() - settings.maintenance.temp_max_age_hours * 3600
+        removed = 0
+        async for key, stat in storage.list(TEMP_PREFIX):
+            if stat.modified_at < cutoff:
+                await storage.delete(key)
+                removed += 1
+        removed_objects.inc(removed, labels=("temp",))
+        return removed
+
+    @staticmethod
+    async def _remove_orphans(
+        db: AsyncSession, objects: List[Tuple[str, ObjectStat]]
+    ) -> int:
+        now = time.time()
+        temp_cutoff = now - settings.maintenance.temp_max_age_hours * 3600
+        orphan_cutoff = now - settings.maintenance.orphan_min_age_hours * 3600
+
+        # Young objects may belong to an upload that has not committed yet.
+        temp = [
+            key
+            for key, stat in objects
+            if key.endswith(TEMP_SUFFIX) and stat.modified_at < temp_cutoff
+        ]
+        candidates = [
+            key
+            for key, stat in objects
+            if not key.endswith(TEMP_SUFFIX) and stat.modified_at < orphan_cutoff
+        ]
+        orphans = []
+        if candidates:
+            result = await db.execute(
+                select(Blob.path).where(Blob.path.in_(candidates))
+            )
+            known = set(result.scalars().all())
+            orphans = [key for key in candidates if key not in known]
+
+        for key in temp + orphans:
+            logger.info(f"Removing unreferenced object {key}")
+            await storage.delete(key)
+        removed_objects.inc(len(temp), labels=("temp",))
+        removed_objects.inc(len(orphans), labels=("orphan",))
+        return len(temp) + len(orphans)
+
+    @staticmethod
+    async def remove_orphans(db: AsyncSession) -> int:
+        # Storage is walked as a stream and checked against the blobs table
+        # one batch at a time, so memory does not grow with the volume size.
+        removed = 0
+        objects: List[Tuple[str, ObjectStat]] = []
+        async for key, stat in storage.list(BLOBS_PREFIX):
+            objects.append((key, stat))
+            if len(objects) >= settings.maintenance.batch_size:
+                removed += await MaintenanceService._remove_orphans(db, objects)
+                objects.clear()
+                await asyncio.sleep(settings.maintenance.batch_pause_seconds)
+        if objects:
+            removed += await MaintenanceService._remove_orphans(db, objects)
+        await db.commit()
+        return removed + await MaintenanceService.remove_released(db)
+
+    @staticmethod
+    async def remove_released(db: AsyncSession) -> int:
+        # Keys given up outside the blobs prefix, e.g. by the legacy path
+        # migration, get the same grace period as orphaned blobs.
+        cutoff = datetime.utcnow() - timedelta(
+            hours=settings.maintenance.orphan_min_age_hours
+        )
+        removed = 0
+        while True:
+            result = await db.execute(
+                select(ReleasedObject.key)
+                .where(ReleasedObject.released_at < cutoff)
+                .limit(settings.maintenance.batch_size)
+            )
+            keys = list(result.scalars().all())
+            if not keys:
+                return removed
+
+            result = await db.execute(select(File.path).where(File.path.in_(keys)))
+            referenced = set(result.scalars().all())
+            released = [key for key in keys if key not in referenced]
+            for key in released:
+                logger.info(f"Removing released object {key}")
+                await storage.delete(key)
+            await db.execute(delete(ReleasedObject).where(ReleasedObject.key.in_(keys)))
+            await db.commit()
+            removed += len(released)
+            removed_objects.inc(len(released), labels=("released",))
+            await asyncio.sleep(settings.maintenance.batch_pause_seconds)
+
+    @staticmethod
+    async def _count_missing(rows: List[Tuple[str, str]]) -> int:
+        semaphore = asyncio.Semaphore(settings.file.io_workers)
+
+        async def check(key: str, path: str) -> bool:
+            async with semaphore:
+                if await storage.stat(path) is not None:
+                    return False
+            logger.warning(f"Stored object {path} for {key} is missing")
+            return True
+
+        found = await asyncio.gather(*(check(key, path) for key, path in rows))
+        return sum(found)
+
+    @staticmethod
+    async def find_missing(db: AsyncSession) -> int:
+        missing = 0
+        for get_batch in (
+            StorageMigrationService.get_blob_batch,
+            StorageMigrationService.get_legacy_batch,
+        ):
+            after = ""
+            while rows := await get_batch(db, after, settings.maintenance.batch_size):
+                after = rows[-1][0]
+                missing += await MaintenanceService._count_missing(rows)
+                await asyncio.sleep(settings.maintenance.batch_pause_seconds)
+        await db.commit()
+        last_run["missing"] = missing
+        return missing
+
+    @staticmethod
+    async def run_once() -> None:
+        async with async_session() as db:
+            purged = await MaintenanceService.purge_deleted(db)
+            orphans = await MaintenanceService.remove_orphans(db)
+            missing = await MaintenanceService.find_missing(db)
+            repaired = await UsageService.repair(db)
+            described = await MetadataService.backfill(db)
+        temp = await MaintenanceService.remove_stale_temp()
+        logger.info(
+            f"Maintenance: purged {purged} files, removed {orphans} orphaned "
+            f"and {temp} temporary objects, {missing} objects missing, "
+            f"repaired usage of {repaired} users, "
+            f"extracted metadata of {described} files"
+        )
+
+    @staticmethod
+    async def run_worker() -> None:
+        while True:
+            try:
+                # One worker of the deployment does the pass.
+                async with try_lock("maintenance") as leader:
+                    if leader:
+                        await MaintenanceService.run_once()
+            except Exception as e:
+                logger.warning(f"Maintenance failed: {str(e)}")
+            await asyncio.sleep(settings.maintenance.interval_seconds)
@@ -0,0 +1,371 @@
+import codecs
+import gzip
+import mimetypes
+import re
+import struct
+from typing import IO, Any, Callable, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Runs inside the metadata worker processes as well, so it only depends on
+# the standard library.
+
+OCTET_STREAM = "application/octet-stream"
+TEXT_TYPES = {
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/x-yaml",
+    "application/yaml",
+    "image/svg+xml",
+}
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/bmp": "bmp",
+    "image/tiff": "tif",
+    "image/x-icon": "ico",
+    "image/heic": "heic",
+    "image/avif": "avif",
+    "audio/mpeg": "mp3",
+    "audio/aac": "aac",
+    "audio/flac": "flac",
+    "audio/ogg": "ogg",
+    "audio/wav": "wav",
+    "audio/midi": "mid",
+    "audio/mp4": "m4a",
+    "video/mp4": "mp4",
+    "video/quicktime": "mov",
+    "video/webm": "webm",
+    "video/x-matroska": "mkv",
+    "video/x-msvideo": "avi",
+    "application/pdf": "pdf",
+    "application/zip": "zip",
+    "application/gzip": "gz",
+    "application/x-7z-compressed": "7z",
+    "application/vnd.rar": "rar",
+    OCTET_STREAM: "bin",
+}
+FTYP_BRANDS = {
+    b"M4A ": "audio/mp4",
+    b"M4B ": "audio/mp4",
+    b"qt  ": "video/quicktime",
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"mif1": "image/heic",
+    b"avif": "image/avif",
+}
+PDF_SCAN_LIMIT = 256 * 1024 * 1024
+PDF_PAGE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+MP3_BITRATES = {
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+def _is_mp3_frame(head: bytes) -> bool:
+    # MPEG audio frame sync with layer III; ADTS (AAC) has layer bits 00.
+    return len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE6 == 0xE2
+
+
+def _is_text(head: bytes) -> bool:
+    if b"\x00" in head:
+        return False
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def sniff_binary(head: bytes) -> Optional[str]:
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head.startswith(b"RIFF") and head[8:12] in (b"WEBP", b"WAVE", b"AVI "):
+        return {b"WEBP": "image/webp", b"WAVE": "audio/wav"}.get(
+            head[8:12], "video/x-msvideo"
+        )
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"ID3") or _is_mp3_frame(head):
+        return "audio/mpeg"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        return "audio/aac"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"MThd"):
+        return "audio/midi"
+    if head[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(head[8:12], "video/mp4")
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video/webm" if b"webm" in head[:64] else "video/x-matroska"
+    if head.startswith(b"PK\x03\x04"):
+        return "application/zip"
+    if head.startswith(b"\x1f\x8b"):
+        return "application/gzip"
+    if head.startswith(b"7z\xbc\xaf\x27\x1c"):
+        return "application/x-7z-compressed"
+    if head.startswith(b"Rar!\x1a\x07"):
+        return "application/vnd.rar"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    if head.startswith(b"BM") and len(head) >= 26 and head[6:10] == b"\x00" * 4:
+        return "image/bmp"
+    if head.startswith(b"\x00\x00\x01\x00"):
+        return "image/x-icon"
+    return None
+
+
+def sniff(head: bytes, declared: Optional[str]) -> str:
+    # Magic bytes win. Text has no magic, so for text the declared type is
+    # kept as long as it is a text type itself.
+    detected = sniff_binary(head)
+    if detected is not None:
+        return detected
+    if not _is_text(head):
+        return OCTET_STREAM
+    declared = (declared or "").split(";")[0].strip().lower()
+    if declared.startswith("text/") or declared in TEXT_TYPES:
+        return declared
+    return "text/plain"
+
+
+def extension(content_type: str) -> str:
+    if content_type in EXTENSIONS:
+        return EXTENSIONS[content_type]
+    guessed = mimetypes.guess_extension(content_type)
+    if guessed is None:
+        return "txt" if content_type.startswith("text/") else "bin"
+    return guessed.lstrip(".")[:10]
+
+
+def _png(source: IO[bytes], size: int) -> Dict[str, Any]:
+    header = source.read(24)
+    width, height = struct.unpack(">II", header[16:24])
+    return {"width": width, "height": height}
+
+
+def _gif(source: IO[bytes], size: int) -> Dict[str, Any]:
+    width, height = struct.unpack("<HH", source.read(10)[6:10])
+    return {"width": width, "height": height}
+
+
+def _jpeg(source: IO[bytes], size: int) -> Dict[str, Any]:
+    source.read(2)
+    while True:
+        marker = source.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return {}
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        (length,) = struct.unpack(">H", source.read(2))
+        # Start-of-frame markers, excluding DHT, JPG and DAC.
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", source.read(5)[1:5])
+            return {"width": width, "height": height}
+        source.read(length - 2)
+
+
+def _webp(source: IO[bytes], size: int) -> Dict[str, Any]:
+    header = source.read(30)
+    chunk = header[12:16]
+    if chunk == b"VP8X":
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+    elif chunk == b"VP8L":
+        bits = int.from_bytes(header[21:25], "little")
+        width, height = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    elif chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", header[26:30])
+        width, height = width & 0x3FFF, height & 0x3FFF
+    else:
+        return {}
+    return {"width": width, "height": height}
+
+
+def _bmp(source: IO[bytes], size: int) -> Dict[str, Any]:
+    width, height = struct.unpack("<ii", source.read(26)[18:26])
+    return {"width": width, "height": abs(height)}
+
+
+def _wav(source: IO[bytes], size: int) -> Dict[str, Any]:
+    source.read(12)
+    byte_rate = 0
+    result: Dict[str, Any] = {}
+    while True:
+        header = source.read(8)
+        if len(header) < 8:
+            return result
+        name, length = header[:4], struct.unpack("<I", header[4:])[0]
+        if name == b"fmt ":
+            fmt = source.read(length)
+            channels, sample_rate, byte_rate = struct.unpack("<HII", fmt[2:12])
+            result.update(channels=channels, sample_rate=sample_rate)
+        elif name == b"data":
+            if byte_rate:
+                result["duration"] = round(length / byte_rate, 3)
+            return result
+        else:
+            source.read(length + length % 2)
+
+
+def _flac(source: IO[bytes], size: int) -> Dict[str, Any]:
+    info = source.read(42)[8:26]
+    bits = int.from_bytes(info[10:18], "big")
+    sample_rate = bits >> 44
+    channels = ((bits >> 41) & 0x7) + 1
+    samples = bits & 0xFFFFFFFFF
+    result: Dict[str, Any] = {"sample_rate": sample_rate, "channels": channels}
+    if sample_rate:
+        result["duration"] = round(samples / sample_rate, 3)
+    return result
+
+
+def _mp3(source: IO[bytes], size: int) -> Dict[str, Any]:
+    header = source.read(10)
+    offset = 0
+    if header.startswith(b"ID3"):
+        offset = 10 + sum(
+            byte << (7 * (3 - index)) for index, byte in enumerate(header[6:10])
+        )
+    source.seek(offset)
+    frame = source.read(4096)
+    position = next(
+        (index for index in range(len(frame) - 3) if _is_mp3_frame(frame[index:])),
+        None,
+    )
+    if position is None:
+        return {}
+    version = (frame[position + 1] >> 3) & 0x3
+    rate_index = (frame[position + 2] >> 2) & 0x3
+    if version == 1 or rate_index == 3:
+        return {}
+    bitrate = MP3_BITRATES[3 if version == 3 else 2][frame[position + 2] >> 4] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    channels = 1 if frame[position + 3] >> 6 == 3 else 2
+    result: Dict[str, Any] = {"sample_rate": sample_rate, "channels": channels}
+
+    # A Xing/Info frame carries the frame count of VBR files.
+    samples_per_frame = 1152 if version == 3 else 576
+    xing = frame.find(b"Xing", position, position + 64)
+    if xing < 0:
+        xing = frame.find(b"Info", position, position + 64)
+    if xing >= 0 and frame[xing + 7] & 0x1:
+        (frames,) = struct.unpack(">I", frame[xing + 8 : xing + 12])
+        result["duration"] = round(frames * samples_per_frame / sample_rate, 3)
+    elif bitrate:
+        result["bitrate"] = bitrate
+        result["duration"] = round((size - offset - position) * 8 / bitrate, 3)
+    return result
+
+
+def _mp4(source: IO[bytes], size: int) -> Dict[str, Any]:
+    # Walks the top-level boxes to moov, which may sit at the end of the file.
+    position = 0
+    while position < size:
+        source.seek(position)
+        header = source.read(8)
+        if len(header) < 8:
+            return {}
+        length, name = struct.unpack(">I4s", header)
+        if length == 1:
+            (length,) = struct.unpack(">Q", source.read(8))
+        elif length == 0:
+            length = size - position
+        if name == b"moov":
+            return _mvhd(source.read(min(length, 1024 * 1024)))
+        if length < 8:
+            return {}
+        position += length
+    return {}
+
+
+def _mvhd(moov: bytes) -> Dict[str, Any]:
+    index = moov.find(b"mvhd")
+    if index < 0:
+        return {}
+    version = moov[index + 4]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", moov[index + 24 : index + 36])
+    else:
+        timescale, duration = struct.unpack(">II", moov[index + 16 : index + 24])
+    if not timescale:
+        return {}
+    return {"duration": round(duration / timescale, 3)}
+
+
+def _pdf(source: IO[bytes], size: int) -> Dict[str, Any]:
+    pages = 0
+    tail = b""
+    scanned = 0
+    while scanned < PDF_SCAN_LIMIT:
+        chunk = source.read(1024 * 1024)
+        if not chunk:
+            break
+        scanned += len(chunk)
+        data = tail + chunk
+        # Matches across the chunk boundary are counted with the next chunk.
+        cut = max(len(data) - 32, 0)
+        pages += len(PDF_PAGE.findall(data, 0, cut))
+        tail = data[cut:]
+    pages += len(PDF_PAGE.findall(tail))
+    return {"pages": pages}
+
+
+EXTRACTORS: Dict[str, Callable[[IO[bytes], int], Dict[str, Any]]] = {
+    "image/png": _png,
+    "image/gif": _gif,
+    "image/jpeg": _jpeg,
+    "image/webp": _webp,
+    "image/bmp": _bmp,
+    "audio/wav": _wav,
+    "audio/flac": _flac,
+    "audio/mpeg": _mp3,
+    "audio/mp4": _mp4,
+    "video/mp4": _mp4,
+    "video/quicktime": _mp4,
+    "application/pdf": _pdf,
+}
+
+
+def has_extractor(content_type: str) -> bool:
+    return content_type in EXTRACTORS
+
+
+def _open(path: str, encoding: Optional[str]) -> IO[bytes]:
+    if encoding == "gzip":
+        return gzip.open(path, "rb")
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return open(path, "rb")
+
+
+def extract(
+    path: str, content_type: str, size: int, encoding: Optional[str] = None
+) -> Dict[str, Any]:
+    extractor = EXTRACTORS.get(content_type)
+    if extractor is None:
+        return {}
+    with _open(path, encoding) as source:
+        try:
+            return extractor(source, size)
+        except (struct.error, IndexError, ValueError, ZeroDivisionError):
+            return {}
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.base import async_session
+from ..models.file import File
+from ..storage import io, storage
+from . import media
+from .metrics import Counter, Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+METADATA_DIR = Path(settings.storage.staging_path) / "metadata"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_tasks: Set["asyncio.Task[None]"] = set()
+
+extracted = Counter(
+    registry,
+    "file_metadata_extracted_total",
+    "Files processed by the metadata workers",
+    labels=("result",),
+)
+extract_seconds = Histogram(
+    registry, "file_metadata_duration_seconds", "Time to extract file metadata"
+)
+
+
+def _noop() -> None:
+    pass
+
+
+class MetadataService:
+    # Extraction runs in worker processes after the upload has committed, so
+    # neither its CPU time nor a slow parser shows up in request latency.
+    # Rows missed on restart keep NULL metadata and are picked up again by
+    # the maintenance worker.
+
+    @staticmethod
+    def start() -> None:
+        global _executor
+        if settings.file.metadata_workers == 0 or _executor is not None:
+            return
+        _executor = ProcessPoolExecutor(max_workers=settings.file.metadata_workers)
+        # Start the workers now, before the service spawns its own threads.
+        _executor.submit(_noop).result()
+
+    @staticmethod
+    async def stop() -> None:
+        global _executor
+        for task in list(_tasks):
+            task.cancel()
+        await asyncio.gather(*_tasks, return_exceptions=True)
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+    @staticmethod
+    def initial(content_type: str) -> Optional[Dict[str, Any]]:
+        # NULL marks rows still waiting for extraction.
+        return None if media.has_extractor(content_type) else {}
+
+    @staticmethod
+    def schedule(file: File) -> None:
+        if _executor is None or file.metadata_ is not None:
+            return
+        task = asyncio.create_task(MetadataService.update(str(file.id)))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+    @staticmethod
+    async def extract(file: File) -> Dict[str, Any]:
+        assert _executor is not None
+        loop = asyncio.get_running_loop()
+        args = (str(file.content_type), int(file.size), file.encoding)
+
+        local_path = storage.local_path(str(file.path))
+        if local_path is not None:
+            return await loop.run_in_executor(
+                _executor, media.extract, str(local_path), *args
+            )
+
+        # Remote objects are copied next to the upload staging area first.
+        await io.makedirs(METADATA_DIR)
+        temp_path = METADATA_DIR / f"{file.id}.tmp"
+        try:
+            async with io.AsyncFileWriter(temp_path) as buffer:
+                async for chunk in storage.read(str(file.path)):
+                    await buffer.write(chunk)
+            return await loop.run_in_executor(
+                _executor, media.extract, str(temp_path), *args
+            )
+        finally:
+            await io.unlink(temp_path)
+
+    @staticmethod
+    async def update(file_id: str) -> None:
+        try:
+            async with async_session() as db:
+                await MetadataService._update(db, file_id)
+        except Exception as e:
+            extracted.inc(labels=("error",))
+            logger.warning(f"Metadata extraction for {file_id} failed: {str(e)}")
+
+    @staticmethod
+    async def _update(db: AsyncSession, file_id: str) -> None:
+        file = await db.get(File, file_id)
+        if file is None or file.metadata_ is not None:
+            return
+
+        # Identical content has identical metadata.
+        metadata = None
+        if file.checksum is not None:
+            result = await db.execute(
+                select(File.metadata_)
+                .where(File.checksum == file.checksum, File.metadata_.is_not(None))
+                .limit(1)
+            )
+            metadata = result.scalar_one_or_none()
+        if metadata is None:
+            started = time.perf_counter()
+            metadata = await MetadataService.extract(file)
+            extract_seconds.observe(time.perf_counter() - started)
+            extracted.inc(labels=("ok",))
+
+        await db.execute(
+            update(File)
+            .where(File.id == file_id, File.metadata_.is_(None))
+            .values(metadata_=metadata)
+        )
+        await db.commit()
+
+    @staticmethod
+    async def backfill(db: AsyncSession) -> int:
+        if _executor is None:
+            return 0
+        # Recent rows are still being handled by their own upload's task.
+        cutoff = datetime.utcnow() - timedelta(minutes=10)
+        updated = 0
+        after = ""
+        while True:
+            result = await db.execute(
+                select(File.id)
+                .where(
+                    File.metadata_.is_(None),
+                    File.content_type.is_not(None),
+                    File.created_at < cutoff,
+                    File.id > after,
+                )
+                .order_by(File.id)
+                .limit(settings.maintenance.batch_size)
+            )
+            file_ids = list(result.scalars().all())
+            await db.commit()
+            if not file_ids:
+                return updated
+            after = file_ids[-1]
+
+            for file_id in file_ids:
+                await MetadataService.update(file_id)
+            updated += len(file_ids)
+            await asyncio.sleep(settings.maintenance.batch_pause_seconds)
@@ -0,0 +1,203 @@
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config import settings
+from .cache import TTLCache
+
+Labels = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(float(4**power * 1024) for power in range(11))
+COUNT_BUCKETS = (0.0, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 50.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.enabled = registry.enabled
+        registry.register(self)
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        return iter(())
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {value!r}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ):
+        super().__init__(registry, name, documentation, labels)
+        self._values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        if self.enabled:
+            self._values[labels] += amount
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for values, value in list(self._values.items()):
+            yield "", _format_labels(self.labels, values), value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = defaultdict(float)
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        if not self.enabled:
+            return
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        names = self.labels + ("le",)
+        for values, counts in list(self._counts.items()):
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                total += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield "_bucket", _format_labels(names, values + (le,)), float(total)
+            yield "_sum", _format_labels(self.labels, values), self._sums[values]
+            yield "_count", _format_labels(self.labels, values), float(total)
+
+
+class Gauge(Metric):
+    # Read on scrape from the callback, e.g. pool or cache state.
+    type = "gauge"
+
+    def __init__(
+        self,
+        registry: "Registry",
+        name: str,
+        documentation: str,
+        callback: Callable[[], Dict[Labels, float]],
+        labels: Sequence[str] = (),
+        type: Optional[str] = None,
+    ):
+        super().__init__(registry, name, documentation, labels)
+        self.callback = callback
+        if type is not None:
+            self.type = type
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        for values, value in self.callback().items():
+            yield "", _format_labels(self.labels, values), float(value)
+
+
+class Registry:
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(enabled=settings.metrics.enabled)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+
+
+# Per-request database usage, filled in by the engine event listeners.
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+caches: Dict[str, TTLCache[Any, Any]] = {}
+
+
+def register_cache(name: str, cache: TTLCache[Any, Any]) -> None:
+    caches[name] = cache
+
+
+Gauge(
+    registry,
+    "cache_hits_total",
+    "Cache lookups that found a live entry",
+    callback=lambda: {(name,): cache.hits for name, cache in caches.items()},
+    labels=("cache",),
+    type="counter",
+)
+Gauge(
+    registry,
+    "cache_misses_total",
+    "Cache lookups that found nothing or an expired entry",
+    callback=lambda: {(name,): cache.misses for name, cache in caches.items()},
+    labels=("cache",),
+    type="counter",
+)
+Gauge(
+    registry,
+    "cache_hit_ratio",
+    "Share of cache lookups served from the cache",
+    callback=lambda: {(name,): cache.hit_ratio for name, cache in caches.items()},
+    labels=("cache",),
+)
+Gauge(
+    registry,
+    "cache_entries",
+    "Entries currently held in the cache",
+    callback=lambda: {(name,): len(cache) for name, cache in caches.items()},
+    labels=("cache",),
+)
@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import Result, Select, and_, desc, or_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from .exceptions import BadRequestExc
+
+T = TypeVar("T")
+
+
+def encode_cursor(created_at: datetime, object_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), str(object_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, object_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(object_id)
+    except (ValueError, TypeError) as e:
+        raise BadRequestExc("Invalid cursor") from e
+
+
+def paginate(
+    query: Select[Any],
+    created_at: InstrumentedAttribute[Any],
+    id_: InstrumentedAttribute[Any],
+    cursor: Optional[str],
+    offset: int,
+    limit: int,
+) -> Select[Any]:
+    query = query.order_by(desc(created_at), id_)
+    if cursor is not None:
+        last_created_at, last_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                created_at < last_created_at,
+                and_(created_at == last_created_at, id_ > last_id),
+            )
+        )
+    else:
+        query = query.offset(offset)
+    return query.limit(limit + 1)
+
+
+def split_page(objects: Sequence[T], limit: int) -> tuple[list[T], Optional[str]]:
+    page = list(objects[:limit])
+    if len(objects) <= limit:
+        return page, None
+    last: Any = page[-1]
+    if isinstance(last, dict):
+        return page, encode_cursor(last["created_at"], last["id"])
+    return page, encode_cursor(last.created_at, last.id)
+
+
+def projection(
+    entity: Any, schema: type[BaseModel]
+) -> list[InstrumentedAttribute[Any]]:
+    # The columns a response schema reads, so list pages can be loaded as
+    # plain rows instead of ORM objects.
+    return [
+        getattr(entity, str(field.validation_alias or name))
+        for name, field in schema.model_fields.items()
+    ]
+
+
+def as_dicts(result: Result[Any]) -> list[dict[str, Any]]:
+    # pydantic validates plain dicts several times faster than it reads
+    # attributes off Row objects.
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -0,0 +1,112 @@
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.blob import Blob
+from ..models.file import File
+from ..storage import storage
+from ..storage.layout import is_sharded
+from .blob import BLOBS_PREFIX, BlobService
+from .file import FileService
+
+logger = logging.getLogger(__name__)
+
+
+class StorageMigrationService:
+    # Objects are copied to their new key first and the rows are switched
+    # under a row lock afterwards, so the service keeps reading the old key
+    # until the commit. Old keys are returned for deletion by the caller.
+
+    @staticmethod
+    async def get_blob_batch(
+        db: AsyncSession, after: str, batch_size: int
+    ) -> List[Tuple[str, str]]:
+        result = await db.execute(
+            select(Blob.checksum, Blob.path)
+            .where(Blob.checksum > after)
+            .order_by(Blob.checksum)
+            .limit(batch_size)
+        )
+        return [(checksum, path) for checksum, path in result.all()]
+
+    @staticmethod
+    async def get_legacy_batch(
+        db: AsyncSession, after: str, batch_size: int
+    ) -> List[Tuple[str, str]]:
+        result = await db.execute(
+            select(File.id, File.path)
+            .where(File.checksum.is_(None), File.id > after)
+            .order_by(File.id)
+            .limit(batch_size)
+        )
+        return [(str(file_id), path) for file_id, path in result.all()]
+
+    @staticmethod
+    def needs_move(key: str) -> bool:
+        return not is_sharded(key, BLOBS_PREFIX)
+
+    @staticmethod
+    async def move_blob(db: AsyncSession, checksum: str, old_key: str) -> Optional[str]:
+        new_key = BlobService.key_for(checksum)
+        await storage.copy(old_key, new_key)
+
+        try:
+            result = await db.execute(
+                select(Blob).where(Blob.checksum == checksum).with_for_update()
+            )
+            blob = result.scalars().first()
+            if blob is None or blob.path != old_key:
+                await db.rollback()
+                await storage.delete(new_key)
+                return None
+
+            blob.path = new_key
+            await db.execute(
+                update(File)
+                .where(File.checksum == checksum, File.path == old_key)
+                .values(path=new_key)
+            )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await storage.delete(new_key)
+            raise
+        return old_key
+
+    @staticmethod
+    async def move_legacy_file(
+        db: AsyncSession, file_id: str, old_key: str
+    ) -> Optional[str]:
+        # Files stored before deduplication have no checksum: hash them on
+        # the way and turn them into regular blobs.
+        temp_key = FileService.temp_key(file_id)
+        async with storage.writer(temp_key) as buffer:
+            async for chunk in storage.read(old_key):
+                await buffer.write(chunk)
+
+        blob = None
+        try:
+            result = await db.execute(
+                select(File).where(File.id == file_id).with_for_update()
+            )
+            file = result.scalars().first()
+            if file is None or file.path != old_key or file.checksum is not None:
+                await db.rollback()
+                await storage.delete(temp_key)
+                return None
+
+            blob = await BlobService.acquire(db, temp_key, buffer.checksum, buffer.size)
+            file.path = blob.key
+            file.checksum = buffer.checksum
+            file.encoding = blob.encoding
+            file.stored_size = blob.stored_size
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            await storage.delete(temp_key)
+            if blob is not None and blob.created:
+                await BlobService.discard(db, blob.key)
+            raise
+        return old_key
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import math
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import IO, AsyncIterator, List
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.base import async_session
+from ..models.file import File
+from ..models.lock import try_lock
+from ..models.upload_session import UploadSession
+from ..models.user import User, UserRole
+from ..schemas.upload_session import UploadSessionCreate, UploadSessionResponse
+from ..storage import io
+from .exceptions import (
+    AccessDeniedExc,
+    BadRequestExc,
+    ObjectNotFoundExc,
+    SomethingWrongExc,
+)
+from .file import FileService, upload_bytes, upload_rejected
+from .usage import UsageService
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DIR = Path(settings.storage.staging_path)
+PART_SUFFIX = ".part"
+
+
+def _session_dir(session_id: str) -> Path:
+    return SESSIONS_DIR / session_id
+
+
+def _part_path(session_id: str, part_number: int) -> Path:
+    return _session_dir(session_id) / f"{part_number}{PART_SUFFIX}"
+
+
+def _list_parts(session_dir: Path) -> List[int]:
+    try:
+        names = os.listdir(session_dir)
+    except FileNotFoundError:
+        return []
+    return [
+        int(name[: -len(PART_SUFFIX)]) for name in names if name.endswith(PART_SUFFIX)
+    ]
+
+
+def _open(path: Path) -> IO[bytes]:
+    return open(path, "rb")
+
+
+async def _read_parts(parts: List[Path]) -> AsyncIterator[bytes]:
+    for part in parts:
+        source = await io.run_io(_open, part)
+        try:
+            while chunk := await io.run_io(source.read, settings.file.chunk_size):
+                yield chunk
+        finally:
+            await io.run_io(source.close)
+
+
+class UploadSessionService:
+    @staticmethod
+    def part_length(session: UploadSession, part_number: int) -> int:
+        if part_number < session.part_count:
+            return int(session.part_size)
+        return int(session.size) - int(session.part_size) * (session.part_count - 1)
+
+    @staticmethod
+    async def to_response(session: UploadSession) -> UploadSessionResponse:
+        uploaded = set(await io.run_io(_list_parts, _session_dir(str(session.id))))
+        return UploadSessionResponse(
+            id=session.id,
+            filename=session.filename,
+            content_type=session.content_type,
+            size=session.size,
+            part_size=session.part_size,
+            part_count=session.part_count,
+            created_at=session.created_at,
+            expires_at=session.expires_at,
+            missing_parts=[
+                number
+                for number in range(1, session.part_count + 1)
+                if number not in uploaded
+            ],
+        )
+
+    @staticmethod
+    async def create(
+        db: AsyncSession, user: User, data: UploadSessionCreate
+    ) -> UploadSession:
+        FileService.check_format(data.content_type)
+
+        if data.size > settings.file.max_size * 1024 * 1024:
+            logger.debug(f"Upload session for {data.filename} too large")
+            upload_rejected.inc(labels=("size",))
+            raise BadRequestExc("File too large")
+        await UsageService.check(db, user, data.size)
+
+        part_size = data.part_size or settings.file.part_max_size * 1024 * 1024
+        if part_size > settings.file.part_max_size * 1024 * 1024:
+            raise BadRequestExc("Part size too large")
+        if (
+            part_size < settings.file.part_min_size * 1024 * 1024
+            and part_size < data.size
+        ):
+            raise BadRequestExc("Part size too small")
+
+        now = datetime.utcnow()
+        session = UploadSession(
+            id=str(uuid.uuid4()),
+            user_id=user.id,
+            filename=data.filename,
+            content_type=data.content_type,
+            size=data.size,
+            part_size=part_size,
+            part_count=math.ceil(data.size / part_size),
+            created_at=now,
+            expires_at=now + timedelta(minutes=settings.file.session_expire_minutes),
+        )
+        await io.makedirs(_session_dir(str(session.id)))
+
+        db.add(session)
+        await db.commit()
+        await db.refresh(session)
+        return session
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, session_id: str, user: User) -> UploadSession:
+        session = await db.get(UploadSession, session_id)
+        if not session or session.expires_at < datetime.utcnow():
+            logger.debug(f"Upload session {session_id} not found")
+            raise ObjectNotFoundExc("Upload session not found")
+
+        if session.user_id != user.id and user.role != UserRole.ADMIN:
+            logger.debug(f"Upload session {session_id} access denied")
+            raise AccessDeniedExc("Access denied")
+
+        return session
+
+    @staticmethod
+    async def put_part(
+        db: AsyncSession,
+        session_id: str,
+        part_number: int,
+        user: User,
+        stream: AsyncIterator[bytes],
+    ) -> int:
+        session = await UploadSessionService.get_by_id(db, session_id, user)
+        if not 1 <= part_number <= session.part_count:
+            raise BadRequestExc("Invalid part number")
+
+        expected = UploadSessionService.part_length(session, part_number)
+        part_path = _part_path(session_id, part_number)
+        temp_path = part_path.with_name(f"{part_number}.{uuid.uuid4()}.tmp")
+
+        try:
+            part_size = 0
+            async with io.AsyncFileWriter(temp_path) as buffer:
+                async for chunk in io.rechunk(stream, settings.file.chunk_size):
+                    part_size += len(chunk)
+                    if part_size > expected:
+                        raise BadRequestExc("Part too large")
+                    await buffer.write(chunk)
+
+            if part_size != expected:
+                raise BadRequestExc(f"Part must be {expected} bytes")
+
+            await io.rename(temp_path, part_path)
+            upload_bytes.inc(part_size)
+        except BadRequestExc:
+            await io.unlink(temp_path)
+            raise
+        except Exception as e:
+            await io.unlink(temp_path)
+            logger.warning(f"Part upload failed: {str(e)}")
+            raise SomethingWrongExc("Part upload failed")
+
+        return part_size
+
+    @staticmethod
+    async def complete(db: AsyncSession, session_id: str, user: User) -> File:
+        session = await UploadSessionService.get_by_id(db, session_id, user)
+
+        response = await UploadSessionService.to_response(session)
+        if response.missing_parts:
+            raise BadRequestExc(f"Missing parts: {response.missing_parts}")
+
+        owner = await db.get(User, session.user_id)
+        if owner is None:
+            raise ObjectNotFoundExc("User not found")
+
+        result = await db.execute(
+            delete(UploadSession).where(UploadSession.id == session_id)
+        )
+        if result.rowcount != 1:
+            raise ObjectNotFoundExc("Upload session not found")
+
+        file_id = str(uuid.uuid4())
+        temp_key = FileService.temp_key(file_id)
+        parts = [
+            _part_path(session_id, number)
+            for number in range(1, session.part_count + 1)
+        ]
+
+        try:
+            chunks = _read_parts(parts)
+            head = await anext(chunks, b"")
+            content_type = FileService.sniff(head, session.content_type)
+
+            async with FileService.writer(temp_key, content_type) as buffer:
+                await buffer.write(head)
+                async for chunk in chunks:
+                    await buffer.write(chunk)
+
+            file = await FileService.store(
+                db,
+                owner,
+                file_id,
+                temp_key,
+                filename=str(session.filename),
+                content_type=content_type,
+                size=int(session.size),
+                checksum=buffer.checksum,
+                encoding=buffer.encoding,
+                stored_size=buffer.stored_size,
+            )
+        except BadRequestExc:
+            await db.rollback()
+            raise
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Upload session {session_id} completion failed: {e}")
+            raise SomethingWrongExc("File upload failed")
+
+        await io.rmtree(_session_dir(session_id))
+        return file
+
+    @staticmethod
+    async def abort(db: AsyncSession, session_id: str, user: User) -> None:
+        session = await UploadSessionService.get_by_id(db, session_id, user)
+        await db.delete(session)
+        await db.commit()
+        await io.rmtree(_session_dir(session_id))
+
+    @staticmethod
+    async def collect_garbage(db: AsyncSession, batch_size: int = 100) -> int:
+        removed = 0
+        while True:
+            result = await db.execute(
+                select(UploadSession.id)
+                .where(UploadSession.expires_at < datetime.utcnow())
+                .limit(batch_size)
+            )
+            session_ids = list(result.scalars().all())
+            if not session_ids:
+                return removed
+
+            await db.execute(
+                delete(UploadSession).where(UploadSession.id.in_(session_ids))
+            )
+            await db.commit()
+            for session_id in session_ids:
+                await io.rmtree(_session_dir(session_id))
+            removed += len(session_ids)
+
+    @staticmethod
+    async def run_garbage_collector() -> None:
+        while True:
+            try:
+                removed = 0
+                async with try_lock("upload_sessions") as leader:
+                    if leader:
+                        async with async_session() as db:
+                            removed = await UploadSessionService.collect_garbage(db)
+                if removed:
+                    logger.info(f"Removed {removed} expired upload sessions")
+            except Exception as e:
+                logger.warning(f"Upload session cleanup failed: {str(e)}")
+            await asyncio.sleep(settings.file.session_gc_interval_seconds)
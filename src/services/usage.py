@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models.file import File
+from ..models.user import User
+from .exceptions import BadRequestExc
+from .metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+quota_rejected = Counter(
+    registry, "file_quota_rejected_total", "Uploads rejected by the storage quota"
+)
+
+
+class UsageService:
+    # Usage is the logical size of every file row a user owns, including
+    # soft-deleted ones, which keep their bytes until they are purged.
+
+    @staticmethod
+    def quota(user: User) -> Optional[int]:
+        limit = settings.file.quota.get(str(user.role.value))
+        if limit is None:
+            return None
+        return limit * 1024 * 1024
+
+    @staticmethod
+    async def check(db: AsyncSession, user: User, size: int) -> None:
+        limit = UsageService.quota(user)
+        if limit is None:
+            return
+        result = await db.execute(select(User.used_bytes).where(User.id == user.id))
+        used = result.scalar_one_or_none() or 0
+        if used + size > limit:
+            logger.debug(f"User {user.id} is over quota")
+            quota_rejected.inc()
+            raise BadRequestExc("Storage quota exceeded")
+
+    @staticmethod
+    async def reserve(db: AsyncSession, user: User, size: int) -> None:
+        # Checked and incremented in one statement, so concurrent uploads
+        # cannot overshoot the quota together.
+        query = update(User).where(User.id == user.id)
+        limit = UsageService.quota(user)
+        if limit is not None:
+            query = query.where(User.used_bytes + size <= limit)
+        result = await db.execute(
+            query.values(
+                used_bytes=User.used_bytes + size, file_count=User.file_count + 1
+            )
+        )
+        if result.rowcount != 1:
+            logger.debug(f"User {user.id} is over quota")
+            quota_rejected.inc()
+            raise BadRequestExc("Storage quota exceeded")
+
+    @staticmethod
+    async def release(db: AsyncSession, files: Sequence[Tuple[str, int]]) -> None:
+        sizes: Dict[str, int] = defaultdict(int)
+        counts: Dict[str, int] = defaultdict(int)
+        for user_id, size in files:
+            sizes[user_id] += size
+            counts[user_id] += 1
+        if not counts:
+            return
+        await db.execute(
+            update(User)
+            .where(User.id.in_(counts))
+            .values(
+                used_bytes=User.used_bytes - case(sizes, value=User.id),
+                file_count=User.file_count - case(counts, value=User.id),
+            )
+        )
+
+    @staticmethod
+    async def repair(db: AsyncSession) -> int:
+        repaired = 0
+        after = ""
+        while True:
+            # Locking the users first makes concurrent uploads and deletes
+            # wait, so the totals below cannot race with their increments.
+            result = await db.execute(
+                select(User.id, User.used_bytes, User.file_count)
+                .where(User.id > after)
+                .order_by(User.id)
+                .limit(settings.maintenance.batch_size)
+                .with_for_update()
+            )
+            users = result.all()
+            if not users:
+                return repaired
+            after = users[-1].id
+
+            result = await db.execute(
+                select(File.user_id, func.sum(File.size), func.count())
+                .where(File.user_id.in_([user.id for user in users]))
+                .group_by(File.user_id)
+            )
+            totals = {
+                user_id: (int(used), count) for user_id, used, count in result.all()
+            }
+
+            for user in users:
+                used, count = totals.get(user.id, (0, 0))
+                if (user.used_bytes, user.file_count) == (used, count):
+                    continue
+                logger.warning(
+                    f"Usage of user {user.id} drifted: {user.used_bytes} bytes in "
+                    f"{user.file_count} files, actual {used} bytes in {count} files"
+                )
+                await db.execute(
+                    update(User)
+                    .where(User.id == user.id)
+                    .values(used_bytes=used, file_count=count)
+                )
+                repaired += 1
+            await db.commit()
+            await asyncio.sleep(settings.maintenance.batch_pause_seconds)
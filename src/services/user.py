@@ -1,16 +1,37 @@
 import logging
 from datetime import datetime, timezone
+from typing import Any, Sequence
 
-from sqlalchemy import delete, desc, func, select, update
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
 
+from ..config import settings
+from ..models.replica import read_replica, stick
 from ..models.user import User, UserRole
 from ..schemas.user import UserUpdate
+from .cache import TTLCache
+from .channel import channel
+from .count import CountService, TotalCount
 from .exceptions import BadRequestExc, ObjectNotFoundExc, SomethingWrongExc
+from .metrics import register_cache
+from .pagination import as_dicts, paginate, split_page
 
 logger = logging.getLogger(__name__)
 
+USER_TOPIC = "user"
+
+# Usage counters change with every upload and delete without publishing
+# USER_TOPIC, so they stay out of the cache and are read from the database.
+UNCACHED_COLUMNS = ("used_bytes", "file_count")
+
+user_cache: TTLCache[str, dict[str, Any]] = TTLCache(
+    ttl=settings.cache.user_ttl_seconds, max_size=settings.cache.user_max_size
+)
+channel.subscribe(USER_TOPIC, user_cache.invalidate)
+register_cache("user", user_cache)
+
 
 class UserService:
     @staticmethod
@@ -19,18 +40,30 @@ class UserService:
         include_deleted: bool = False,
         offset: int = 0,
         limit: int = 100,
-    ) -> tuple[list[User], int]:
-        query = select(User)
+        cursor: str | None = None,
+        with_count: bool = False,
+        estimate_count: bool = False,
+        columns: Sequence[InstrumentedAttribute[Any]] | None = None,
+    ) -> tuple[list[Any], TotalCount | None, str | None]:
+        # With columns the page holds dicts of just those columns.
+        query = select(*columns) if columns else select(User)
         query_count = select(func.count()).select_from(User)
         if not include_deleted:
             query = query.where(User.deleted_at.is_(None))
             query_count = query_count.where(User.deleted_at.is_(None))
 
-        query = query.order_by(desc(User.created_at))
+        query = paginate(query, User.created_at, User.id, cursor, offset, limit)
 
-        result = await db.execute(query.offset(offset).limit(limit))
-        count = await db.execute(query_count)
-        return result.scalars().all(), count.scalar_one()
+        with read_replica(db):
+            result = await db.execute(query)
+            rows = as_dicts(result) if columns else result.scalars().all()
+            users, next_cursor = split_page(rows, limit)
+
+            count = None
+            if with_count:
+                key = ("users", None, include_deleted)
+                count = await CountService.get(db, key, query_count, estimate_count)
+        return users, count, next_cursor
 
     @staticmethod
     async def get_by_id(
@@ -43,6 +76,32 @@ class UserService:
         result = await db.execute(query)
         return result.scalars().first()
 
+    @staticmethod
+    async def get_active_by_id(db: AsyncSession, user_id: str) -> User | None:
+        if settings.cache.enabled:
+            snapshot = user_cache.get(user_id)
+            if snapshot is not None:
+                return User(**snapshot)
+
+        with read_replica(db, user_id):
+            user = await UserService.get_by_id(db, user_id)
+        if user is not None and settings.cache.enabled:
+            user_cache.set(
+                user_id,
+                {
+                    c.key: getattr(user, c.key)
+                    for c in User.__table__.columns
+                    if c.key not in UNCACHED_COLUMNS
+                },
+            )
+        return user
+
+    @staticmethod
+    def invalidate(user_id: str) -> None:
+        channel.publish(USER_TOPIC, user_id)
+        # Keeps a lagging replica from refilling the cache with the old row.
+        stick(user_id)
+
     # @staticmethod
     # async def create(db: AsyncSession, user_data: UserCreate) -> User:
     #     user = User(
@@ -79,6 +138,7 @@ class UserService:
 
         await db.execute(update(User).where(User.id == user_id).values(**update_dict))
         await db.commit()
+        UserService.invalidate(user_id)
         await db.refresh(user)
         return user
 
@@ -105,6 +165,11 @@ class UserService:
             logger.warning(f"Deletion failed: {str(e)}")
             raise SomethingWrongExc("Deletion failed")
 
+        UserService.invalidate(user_id)
+        CountService.invalidate_users()
+        if is_hard:
+            CountService.invalidate_files(user_id)
+
     @staticmethod
     async def restore_by_id(db: AsyncSession, user_id: str) -> User:
         user = await UserService.get_by_id(db, user_id, include_deleted=True)
@@ -118,5 +183,7 @@ class UserService:
 
         user.deleted_at = None
         await db.commit()
+        UserService.invalidate(user_id)
+        CountService.invalidate_users()
         await db.refresh(user)
         return user
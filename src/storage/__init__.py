@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from ..config import settings
+from ..config.storage import StorageBackendType
+from .base import StorageBackend
+
+
+def create_storage() -> StorageBackend:
+    if settings.storage.backend == StorageBackendType.S3:
+        from .s3 import S3Backend
+
+        return S3Backend(
+            endpoint=str(settings.storage.s3_endpoint),
+            bucket=str(settings.storage.s3_bucket),
+            region=settings.storage.s3_region,
+            access_key=str(settings.storage.s3_access_key),
+            secret_key=str(settings.storage.s3_secret_key),
+            part_size=settings.storage.s3_part_size * 1024 * 1024,
+        )
+
+    from .local import LocalBackend
+
+    return LocalBackend(Path(settings.storage.path))
+
+
+storage: StorageBackend = create_storage()
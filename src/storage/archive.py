@@ -0,0 +1,69 @@
+import zipfile
+from contextlib import aclosing
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterable, List, NamedTuple
+
+from . import io
+
+
+class ArchiveEntry(NamedTuple):
+    name: str
+    size: int
+    modified_at: datetime
+    open: Callable[[], AsyncIterator[bytes]]
+
+
+class _Sink:
+    # Without seek() zipfile treats the target as unseekable: it writes data
+    # descriptors after each member and never goes back, so everything it
+    # produces can be handed to the client as soon as it is written.
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(
+    entries: Iterable[ArchiveEntry], deflate: bool = False
+) -> AsyncIterator[bytes]:
+    sink = _Sink()
+    archive = zipfile.ZipFile(
+        sink,
+        "w",
+        compression=zipfile.ZIP_DEFLATED if deflate else zipfile.ZIP_STORED,
+        allowZip64=True,
+    )
+    for entry in entries:
+        info = zipfile.ZipInfo(entry.name, date_time=entry.modified_at.timetuple()[:6])
+        info.compress_type = archive.compression
+        # The expected size lets zipfile switch the member to ZIP64 upfront.
+        info.file_size = entry.size
+        member = archive.open(info, "w")
+        async with aclosing(entry.open()) as chunks:
+            async for chunk in chunks:
+                await io.run_io(member.write, chunk)
+                if data := sink.drain():
+                    yield data
+        await io.run_io(member.close)
+        yield sink.drain()
+    archive.close()
+    yield sink.drain()
@@ -0,0 +1,86 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import AsyncIterator, Optional, Tuple, Type
+
+
+@dataclass
+class ObjectStat:
+    size: int
+    modified_at: float
+
+
+class StorageWriter(ABC):
+    size: int = 0
+    encoding: Optional[str] = None
+
+    @property
+    def stored_size(self) -> int:
+        return self.size
+
+    @property
+    @abstractmethod
+    def checksum(self) -> str: ...
+
+    async def open(self) -> None:
+        pass
+
+    async def preallocate(self, size: int) -> None:
+        # A hint that exactly this many bytes will be written.
+        pass
+
+    @abstractmethod
+    async def write(self, chunk: bytes) -> None: ...
+
+    @abstractmethod
+    async def commit(self) -> None: ...
+
+    @abstractmethod
+    async def abort(self) -> None: ...
+
+    async def __aenter__(self) -> "StorageWriter":
+        await self.open()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.abort()
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def writer(self, key: str) -> StorageWriter: ...
+
+    @abstractmethod
+    def read(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]: ...
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[ObjectStat]: ...
+
+    @abstractmethod
+    def list(self, prefix: str) -> AsyncIterator[Tuple[str, ObjectStat]]: ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def copy(self, src: str, dst: str) -> None: ...
+
+    @abstractmethod
+    async def rename(self, src: str, dst: str) -> None: ...
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,87 @@
+import hashlib
+import zlib
+from typing import Any, AsyncIterator, Optional
+
+from ..config.file import Compression
+from . import io
+from .base import StorageWriter
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+
+def compressor(encoding: Compression, level: Optional[int] = None) -> Any:
+    if encoding == Compression.GZIP:
+        return zlib.compressobj(
+            level if level is not None else 6, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+    if zstandard is None:
+        raise RuntimeError("zstd compression requires the zstandard package")
+    return zstandard.ZstdCompressor(
+        level=level if level is not None else 3
+    ).compressobj()
+
+
+def decompressor(encoding: Compression) -> Any:
+    if encoding == Compression.GZIP:
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if zstandard is None:
+        raise RuntimeError("zstd compression requires the zstandard package")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def _compress(checksum: Any, codec: Any, chunk: bytes) -> bytes:
+    checksum.update(chunk)
+    return codec.compress(chunk)
+
+
+class CompressedWriter(StorageWriter):
+    # Hashes and counts the logical bytes and stores the compressed stream.
+
+    def __init__(
+        self, writer: StorageWriter, encoding: Compression, level: Optional[int]
+    ):
+        self.writer = writer
+        self.encoding = encoding.value
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._codec = compressor(encoding, level)
+
+    @property
+    def checksum(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def stored_size(self) -> int:
+        return self.writer.size
+
+    async def open(self) -> None:
+        await self.writer.open()
+
+    async def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        data = await io.run_io(_compress, self._hash, self._codec, chunk)
+        if data:
+            await self.writer.write(data)
+
+    async def commit(self) -> None:
+        await self.writer.write(self._codec.flush())
+        await self.writer.commit()
+
+    async def abort(self) -> None:
+        await self.writer.abort()
+
+
+async def decompress(
+    stream: AsyncIterator[bytes], encoding: Compression
+) -> AsyncIterator[bytes]:
+    codec = decompressor(encoding)
+    async for chunk in stream:
+        data = await io.run_io(codec.decompress, chunk)
+        if data:
+            yield data
+    tail = codec.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Any, AsyncIterator, Callable, Optional, Type, TypeVar
+
+from ..config import settings
+from ..config.file import FsyncPolicy
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.file.io_workers, thread_name_prefix="file-io"
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(func, *args, **kwargs))
+
+
+async def makedirs(path: Path) -> None:
+    await run_io(path.mkdir, parents=True, exist_ok=True)
+
+
+async def rename(src: Path, dst: Path) -> None:
+    await run_io(src.rename, dst)
+
+
+async def unlink(path: Path) -> None:
+    await run_io(path.unlink, missing_ok=True)
+
+
+async def exists(path: Path) -> bool:
+    return await run_io(path.exists)
+
+
+async def rmtree(path: Path) -> None:
+    await run_io(shutil.rmtree, path, ignore_errors=True)
+
+
+async def rechunk(stream: AsyncIterator[bytes], size: int) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for data in stream:
+        buffer += data
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class AsyncFileWriter:
+    def __init__(self, path: Path, fsync_policy: Optional[FsyncPolicy] = None):
+        self.path = path
+        self.fsync_policy = fsync_policy or settings.file.fsync_policy
+        self._buffer: Optional[IO[bytes]] = None
+        self._hash = hashlib.sha256()
+
+    @property
+    def checksum(self) -> str:
+        return self._hash.hexdigest()
+
+    async def __aenter__(self) -> "AsyncFileWriter":
+        self._buffer = await run_io(open, self.path, "wb")
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close(sync=exc_type is None)
+
+    async def close(self, sync: bool = True) -> None:
+        if self._buffer is not None:
+            await run_io(self._close, sync)
+            self._buffer = None
+
+    async def preallocate(self, size: int) -> None:
+        # Reserves the blocks up front so the file is laid out in one piece
+        # and a full disk fails the upload before it is written.
+        if size > 0 and hasattr(os, "posix_fallocate"):
+            assert self._buffer is not None
+            await run_io(os.posix_fallocate, self._buffer.fileno(), 0, size)
+
+    async def write(self, chunk: bytes) -> None:
+        await run_io(self._write, chunk)
+
+    def _write(self, chunk: bytes) -> None:
+        assert self._buffer is not None
+        self._buffer.write(chunk)
+        self._hash.update(chunk)
+        if self.fsync_policy == FsyncPolicy.PER_CHUNK:
+            self._buffer.flush()
+            os.fsync(self._buffer.fileno())
+
+    def _close(self, sync: bool) -> None:
+        assert self._buffer is not None
+        try:
+            if sync and self.fsync_policy == FsyncPolicy.ON_CLOSE:
+                self._buffer.flush()
+                os.fsync(self._buffer.fileno())
+        finally:
+            self._buffer.close()
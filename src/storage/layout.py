@@ -0,0 +1,17 @@
+from ..config import settings
+
+
+def shard(name: str) -> str:
+    width = settings.storage.shard_width
+    return "/".join(
+        name[level * width : (level + 1) * width]
+        for level in range(settings.storage.shard_depth)
+    )
+
+
+def sharded_key(prefix: str, name: str) -> str:
+    return "/".join(part for part in (prefix, shard(name), name) if part)
+
+
+def is_sharded(key: str, prefix: str) -> bool:
+    return key == sharded_key(prefix, key.rsplit("/", 1)[-1])
@@ -0,0 +1,165 @@
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import IO, AsyncIterator, Iterator, List, Optional, Tuple
+
+from ..config import settings
+from . import io
+from .base import ObjectStat, StorageBackend, StorageWriter
+
+LIST_CHUNK_SIZE = 1000
+
+
+class LocalWriter(StorageWriter):
+    def __init__(self, path: Path):
+        self.path = path
+        self.size = 0
+        self._file = io.AsyncFileWriter(
+            path.with_name(f"{path.name}.{uuid.uuid4()}.tmp")
+        )
+
+    @property
+    def checksum(self) -> str:
+        return self._file.checksum
+
+    async def open(self) -> None:
+        await io.makedirs(self.path.parent)
+        await self._file.__aenter__()
+
+    async def preallocate(self, size: int) -> None:
+        await self._file.preallocate(size)
+
+    async def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        await self._file.write(chunk)
+
+    async def commit(self) -> None:
+        await self._file.close()
+        await io.rename(self._file.path, self.path)
+
+    async def abort(self) -> None:
+        await self._file.close(sync=False)
+        await io.unlink(self._file.path)
+
+
+def _object_stat(result: os.stat_result) -> ObjectStat:
+    # rename() and link() keep mtime but bump ctime; the later of the two
+    # tells when the object appeared under its current key.
+    return ObjectStat(
+        size=result.st_size, modified_at=max(result.st_mtime, result.st_ctime)
+    )
+
+
+def _stat(path: Path) -> Optional[ObjectStat]:
+    try:
+        return _object_stat(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
+Entry = Tuple[str, bool, Optional[ObjectStat]]
+
+
+def _scandir(path: Path) -> Optional[Iterator[os.DirEntry[str]]]:
+    try:
+        return os.scandir(path)
+    except FileNotFoundError:
+        return None
+
+
+def _next_entries(entries: Iterator[os.DirEntry[str]], count: int) -> List[Entry]:
+    chunk: List[Entry] = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            chunk.append((entry.name, True, None))
+        else:
+            chunk.append((entry.name, False, _object_stat(entry.stat())))
+        if len(chunk) >= count:
+            break
+    return chunk
+
+
+def _copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Hard links do not cross filesystems (or may be unsupported).
+        temp = dst.with_name(f"{dst.name}.{uuid.uuid4()}.tmp")
+        shutil.copyfile(src, temp)
+        os.replace(temp, dst)
+
+
+def _open(path: Path, start: int) -> IO[bytes]:
+    buffer = open(path, "rb")
+    buffer.seek(start)
+    return buffer
+
+
+class LocalBackend(StorageBackend):
+    def __init__(self, root: Path):
+        self.root = root
+
+    def local_path(self, key: str) -> Path:
+        path = Path(key)
+        return path if path.is_absolute() else self.root / path
+
+    def writer(self, key: str) -> LocalWriter:
+        return LocalWriter(self.local_path(key))
+
+    async def read(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        buffer = await io.run_io(_open, self.local_path(key), start)
+        try:
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                size = settings.file.chunk_size
+                if remaining is not None:
+                    size = min(size, remaining)
+                chunk = await io.run_io(buffer.read, size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await io.run_io(buffer.close)
+
+    async def stat(self, key: str) -> Optional[ObjectStat]:
+        return await io.run_io(_stat, self.local_path(key))
+
+    async def list(self, prefix: str) -> AsyncIterator[Tuple[str, ObjectStat]]:
+        # Directories are read in chunks so that a flat directory with
+        # millions of entries never has to be held in memory.
+        pending = [prefix.strip("/")]
+        while pending:
+            directory = pending.pop()
+            entries = await io.run_io(_scandir, self.root / directory)
+            if entries is None:
+                continue
+            try:
+                while chunk := await io.run_io(_next_entries, entries, LIST_CHUNK_SIZE):
+                    for name, is_dir, stat in chunk:
+                        key = f"{directory}/{name}" if directory else name
+                        if is_dir:
+                            pending.append(key)
+                        elif stat is not None:
+                            yield key, stat
+            finally:
+                await io.run_io(entries.close)  # type: ignore[attr-defined]
+
+    async def delete(self, key: str) -> None:
+        await io.unlink(self.local_path(key))
+
+    async def copy(self, src: str, dst: str) -> None:
+        target = self.local_path(dst)
+        await io.makedirs(target.parent)
+        await io.run_io(_copy, self.local_path(src), target)
+
+    async def rename(self, src: str, dst: str) -> None:
+        target = self.local_path(dst)
+        await io.makedirs(target.parent)
+        await io.rename(self.local_path(src), target)
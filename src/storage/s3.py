@@ -0,0 +1,290 @@
+import hashlib
+import hmac
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+
+import httpx
+
+from ..config import settings
+from ..services.exceptions import SomethingWrongExc
+from . import io
+from .base import ObjectStat, StorageBackend, StorageWriter
+
+logger = logging.getLogger(__name__)
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def _local_name(element: ElementTree.Element) -> str:
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def _find(document: bytes, tag: str) -> Optional[str]:
+    if not document:
+        return None
+    for element in ElementTree.fromstring(document).iter():
+        if _local_name(element) == tag:
+            return element.text
+    return None
+
+
+class S3Writer(StorageWriter):
+    def __init__(self, backend: "S3Backend", key: str):
+        self.backend = backend
+        self.key = key
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._parts: List[Tuple[int, str]] = []
+
+    @property
+    def checksum(self) -> str:
+        return self._hash.hexdigest()
+
+    async def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        await io.run_io(self._hash.update, chunk)
+        self._buffer += chunk
+        if len(self._buffer) >= self.backend.part_size:
+            await self._upload_part()
+
+    async def _upload_part(self) -> None:
+        if self._upload_id is None:
+            response = await self.backend.request(
+                "POST", self.key, params={"uploads": ""}
+            )
+            self._upload_id = _find(response.content, "UploadId")
+
+        part_number = len(self._parts) + 1
+        response = await self.backend.request(
+            "PUT",
+            self.key,
+            params={"partNumber": str(part_number), "uploadId": str(self._upload_id)},
+            content=bytes(self._buffer),
+        )
+        self._parts.append((part_number, response.headers["etag"]))
+        self._buffer.clear()
+
+    async def commit(self) -> None:
+        if self._upload_id is None:
+            await self.backend.request("PUT", self.key, content=bytes(self._buffer))
+            return
+
+        if self._buffer:
+            await self._upload_part()
+        parts = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+            for number, etag in self._parts
+        )
+        response = await self.backend.request(
+            "POST",
+            self.key,
+            params={"uploadId": self._upload_id},
+            content=f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode(),
+        )
+        if _find(response.content, "Code") is not None:
+            await self.abort()
+            raise SomethingWrongExc("Storage request failed")
+
+    async def abort(self) -> None:
+        self._buffer.clear()
+        if self._upload_id is not None:
+            await self.backend.request(
+                "DELETE", self.key, params={"uploadId": self._upload_id}
+            )
+            self._upload_id = None
+
+
+class S3Backend(StorageBackend):
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        region: str,
+        access_key: str,
+        secret_key: str,
+        part_size: int,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.bucket = bucket
+        self.region = region
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.part_size = part_size
+        self.host = urlsplit(endpoint).netloc
+        self.client = httpx.AsyncClient(
+            base_url=endpoint, transport=transport, timeout=httpx.Timeout(60.0)
+        )
+
+    def _path(self, key: str) -> str:
+        if not key:
+            return f"/{self.bucket}"
+        return f"/{self.bucket}/{_quote(key, safe='/-_.~')}"
+
+    def _sign(
+        self, method: str, path: str, query: str, headers: Dict[str, str]
+    ) -> Dict[str, str]:
+        now = datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+
+        headers = {
+            **{name.lower(): value.strip() for name, value in headers.items()},
+            "host": self.host,
+            "x-amz-date": amz_date,
+            "x-amz-content-sha256": UNSIGNED_PAYLOAD,
+        }
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                query,
+                "".join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+                signed_headers,
+                UNSIGNED_PAYLOAD,
+            ]
+        )
+        string_to_sign = "\n".join(
+            [
+                "AWS4-HMAC-SHA256",
+                amz_date,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+
+        key = ("AWS4" + self.secret_key).encode()
+        for part in (amz_date[:8], self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return headers
+
+    def _build(
+        self,
+        method: str,
+        key: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Optional[bytes] = None,
+    ) -> httpx.Request:
+        path = self._path(key)
+        query = "&".join(
+            f"{_quote(name)}={_quote(value)}"
+            for name, value in sorted((params or {}).items())
+        )
+        return self.client.build_request(
+            method,
+            f"{path}?{query}" if query else path,
+            headers=self._sign(method, path, query, headers or {}),
+            content=content,
+        )
+
+    async def request(
+        self,
+        method: str,
+        key: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        content: Optional[bytes] = None,
+    ) -> httpx.Response:
+        response = await self.client.send(
+            self._build(method, key, params, headers, content)
+        )
+        if response.status_code >= 300 and response.status_code != 404:
+            logger.warning(
+                f"S3 {method} {key} failed: {response.status_code} {response.text}"
+            )
+            raise SomethingWrongExc("Storage request failed")
+        return response
+
+    def writer(self, key: str) -> S3Writer:
+        return S3Writer(self, key)
+
+    async def read(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        headers = {}
+        if start or end is not None:
+            headers["range"] = f"bytes={start}-{'' if end is None else end - 1}"
+
+        response = await self.client.send(
+            self._build("GET", key, headers=headers), stream=True
+        )
+        try:
+            if response.status_code >= 300:
+                logger.warning(f"S3 GET {key} failed: {response.status_code}")
+                raise SomethingWrongExc("Storage request failed")
+            async for chunk in response.aiter_bytes(settings.file.chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def stat(self, key: str) -> Optional[ObjectStat]:
+        response = await self.request("HEAD", key)
+        if response.status_code == 404:
+            return None
+        modified = response.headers.get("last-modified")
+        return ObjectStat(
+            size=int(response.headers["content-length"]),
+            modified_at=parsedate_to_datetime(modified).timestamp() if modified else 0,
+        )
+
+    async def list(self, prefix: str) -> AsyncIterator[Tuple[str, ObjectStat]]:
+        params = {"list-type": "2", "prefix": prefix}
+        while True:
+            response = await self.request("GET", "", params=params)
+            root = ElementTree.fromstring(response.content)
+            token = None
+            for element in root:
+                name = _local_name(element)
+                if name == "NextContinuationToken":
+                    token = element.text
+                if name != "Contents":
+                    continue
+                fields = {_local_name(field): field.text or "" for field in element}
+                yield fields["Key"], ObjectStat(
+                    size=int(fields["Size"]),
+                    modified_at=datetime.fromisoformat(
+                        fields["LastModified"].replace("Z", "+00:00")
+                    ).timestamp(),
+                )
+            if token is None:
+                return
+            params["continuation-token"] = token
+
+    async def delete(self, key: str) -> None:
+        await self.request("DELETE", key)
+
+    async def copy(self, src: str, dst: str) -> None:
+        response = await self.request(
+            "PUT", dst, headers={"x-amz-copy-source": self._path(src)}
+        )
+        if response.status_code == 404 or _find(response.content, "Code"):
+            logger.warning(f"S3 copy {src} -> {dst} failed: {response.text}")
+            raise SomethingWrongExc("Storage request failed")
+
+    async def rename(self, src: str, dst: str) -> None:
+        await self.copy(src, dst)
+        await self.delete(src)
+
+    async def close(self) -> None:
+        await self.client.aclose()
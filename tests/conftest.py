@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+import pytest
+
+# Settings are read when src is first imported, so the environment points
+# at a throwaway SQLite database and storage directory before that.
+ROOT = Path(tempfile.mkdtemp(prefix="file-uploader-tests-"))
+DB_PATH = ROOT / "test.sqlite"
+os.environ.update(
+    DB_URI=f"sqlite+aiosqlite:///{DB_PATH}",
+    DB_REPLICA_URIS="[]",
+    STORAGE_BACKEND="local",
+    STORAGE_PATH=str(ROOT / "storage"),
+    STORAGE_STAGING_PATH=str(ROOT / "sessions"),
+    CACHE_ENABLED="false",
+    METRICS_ENABLED="false",
+    FILE_MAX_SIZE="20",
+    FILE_SUPPORTED_FORMATS='["*"]',
+    FILE_COMPRESSION="{}",
+    FILE_QUOTA="{}",
+)
+for name in ("YANDEX_CLIENT_ID", "YANDEX_CLIENT_SECRET", "YANDEX_CLIENT_URI"):
+    os.environ.setdefault(name, "")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from src.models import schema  # noqa: E402, F401
+from src.models.base import Base, async_session, engine  # noqa: E402
+from src.models.file import File  # noqa: E402
+from src.models.user import User, UserRole  # noqa: E402
+from src.services.auth import AuthService  # noqa: E402
+from src.services.file import FileService  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+def reset_storage() -> None:
+    # Every test starts from an empty database file and storage directory.
+    DB_PATH.unlink(missing_ok=True)
+    shutil.rmtree(ROOT / "storage", ignore_errors=True)
+    shutil.rmtree(ROOT / "sessions", ignore_errors=True)
+
+
+@pytest.fixture
+async def db() -> AsyncIterator[AsyncSession]:
+    reset_storage()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_session() as session:
+        yield session
+    await engine.dispose()
+    reset_storage()
+
+
+async def create_user(db: AsyncSession, role: UserRole = UserRole.CLIENT) -> User:
+    user = User(role=role)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+@pytest.fixture
+async def user(db: AsyncSession) -> User:
+    return await create_user(db)
+
+
+@pytest.fixture
+async def other_user(db: AsyncSession) -> User:
+    return await create_user(db)
+
+
+def auth_headers(user: User) -> Dict[str, str]:
+    token = AuthService.create_tokens(str(user.id)).access_token
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def chunks(data: bytes, size: Optional[int] = None) -> AsyncIterator[bytes]:
+    size = size or len(data) or 1
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def upload(
+    db: AsyncSession, user: User, data: bytes, filename: str = "notes.txt"
+) -> File:
+    return await FileService.upload_stream(
+        db, user, chunks(data), filename, "text/plain", len(data)
+    )
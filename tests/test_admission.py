@@ -0,0 +1,138 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.app import app
+from src.config import settings
+from src.services.admission import MB, AdmissionService, ConcurrencyLimit, Rejected
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def limits(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Every test starts with fresh per-process state and no limits.
+    monkeypatch.setattr(
+        AdmissionService,
+        "uploads",
+        ConcurrencyLimit(lambda: settings.file.upload_max_concurrency),
+    )
+    monkeypatch.setattr(AdmissionService, "users", {})
+    for name, value in (
+        ("upload_max_concurrency", 0),
+        ("upload_queue_timeout_seconds", 0),
+        ("upload_user_max_concurrency", 0),
+        ("upload_user_rate", 0),
+        ("upload_user_burst", None),
+    ):
+        monkeypatch.setattr(settings.file, name, value)
+
+
+async def test_concurrency_limit_admits_waiters_in_order() -> None:
+    limit = ConcurrencyLimit(lambda: 1)
+    assert await limit.acquire(0)
+    order = []
+
+    async def wait(name: str) -> None:
+        assert await limit.acquire(1)
+        order.append(name)
+
+    first = asyncio.create_task(wait("first"))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(wait("second"))
+    await asyncio.sleep(0)
+    assert limit.waiting == 2
+
+    limit.release()
+    await first
+    assert order == ["first"] and limit.waiting == 1
+    limit.release()
+    await second
+    assert order == ["first", "second"] and limit.active == 1
+
+
+async def test_concurrency_limit_times_out() -> None:
+    limit = ConcurrencyLimit(lambda: 1)
+    assert await limit.acquire(0)
+
+    assert not await limit.acquire(0)
+    assert not await limit.acquire(0.01)
+    assert (limit.active, limit.waiting) == (1, 0)
+
+
+async def test_raised_limit_wakes_waiters() -> None:
+    size = 1
+    limit = ConcurrencyLimit(lambda: size)
+    assert await limit.acquire(0)
+    waiter = asyncio.create_task(limit.acquire(1))
+    await asyncio.sleep(0)
+
+    size = 2
+    limit.wake()
+
+    assert await waiter
+    assert limit.active == 2
+
+
+async def test_user_concurrency(limits: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings.file, "upload_user_max_concurrency", 1)
+    await AdmissionService.acquire("user", None)
+
+    with pytest.raises(Rejected) as e:
+        await AdmissionService.acquire("user", None)
+    assert e.value.reason == "user_concurrency"
+    await AdmissionService.acquire("other", None)
+
+    AdmissionService.release("user")
+    await AdmissionService.acquire("user", None)
+
+
+async def test_user_rate_lets_one_large_upload_through(
+    limits: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings.file, "upload_user_rate", 1)
+    await AdmissionService.acquire("user", 3 * MB)
+    AdmissionService.release("user")
+
+    with pytest.raises(Rejected) as e:
+        await AdmissionService.acquire("user", 1)
+    assert e.value.reason == "user_rate"
+    # Two megabytes of debt at one megabyte per second.
+    assert e.value.retry_after == 2
+
+
+async def test_global_rejection_refunds_the_user(
+    limits: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings.file, "upload_user_rate", 1)
+    monkeypatch.setattr(settings.file, "upload_max_concurrency", 1)
+    await AdmissionService.acquire(None, None)
+
+    with pytest.raises(Rejected) as e:
+        await AdmissionService.acquire("user", MB)
+    assert e.value.reason == "global"
+
+    state = AdmissionService.users["user"]
+    assert state.active == 0
+    assert state.tokens == pytest.approx(MB)
+
+
+async def test_rejection_carries_cors_headers(
+    limits: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings.file, "upload_max_concurrency", 1)
+    await AdmissionService.acquire(None, None)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.put(
+            "/file/?filename=a.txt",
+            content=b"data",
+            headers={"Origin": "http://example.com"},
+        )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert "access-control-allow-origin" in response.headers
+    assert "retry-after" in response.headers["access-control-expose-headers"].lower()
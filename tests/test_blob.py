@@ -0,0 +1,96 @@
+import hashlib
+
+import pytest
+from conftest import upload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.blob import Blob
+from src.models.user import User
+from src.services.blob import BlobService
+from src.services.file import FileService
+from src.storage import storage
+
+pytestmark = pytest.mark.anyio
+
+DATA = b"the same bytes"
+CHECKSUM = hashlib.sha256(DATA).hexdigest()
+SIZE = len(DATA)
+
+
+async def put_temp(name: str, data: bytes = DATA) -> str:
+    key = FileService.temp_key(name)
+    async with storage.writer(key) as buffer:
+        await buffer.write(data)
+    return key
+
+
+async def ref_count(db: AsyncSession, checksum: str = CHECKSUM) -> int | None:
+    result = await db.execute(select(Blob.ref_count).where(Blob.checksum == checksum))
+    return result.scalar_one_or_none()
+
+
+async def test_acquire_stores_new_content(db: AsyncSession) -> None:
+    temp_key = await put_temp("first")
+
+    blob = await BlobService.acquire(db, temp_key, CHECKSUM, SIZE)
+    await db.commit()
+
+    assert blob.created
+    assert await ref_count(db) == 1
+    assert await storage.stat(temp_key) is None
+    stored = b"".join([chunk async for chunk in storage.read(blob.key)])
+    assert stored == DATA
+
+
+async def test_acquire_existing_content_shares_the_blob(db: AsyncSession) -> None:
+    first = await BlobService.acquire(db, await put_temp("first"), CHECKSUM, SIZE)
+    temp_key = await put_temp("second")
+
+    second = await BlobService.acquire(db, temp_key, CHECKSUM, SIZE)
+    await db.commit()
+
+    assert not second.created
+    assert second.key == first.key
+    assert await ref_count(db) == 2
+    assert await storage.stat(temp_key) is None
+
+
+async def test_release_many_frees_the_blob_with_its_last_reference(
+    db: AsyncSession,
+) -> None:
+    blob = await BlobService.acquire(db, await put_temp("first"), CHECKSUM, SIZE)
+    await BlobService.acquire(db, await put_temp("second"), CHECKSUM, SIZE)
+    await db.commit()
+
+    assert await BlobService.release_many(db, [(CHECKSUM, blob.key)]) == []
+    assert await ref_count(db) == 1
+
+    assert await BlobService.release_many(db, [(CHECKSUM, blob.key)]) == [blob.key]
+    assert await ref_count(db) is None
+
+
+async def test_release_many_counts_every_reference_in_one_call(
+    db: AsyncSession,
+) -> None:
+    blob = await BlobService.acquire(db, await put_temp("first"), CHECKSUM, SIZE)
+    await BlobService.acquire(db, await put_temp("second"), CHECKSUM, SIZE)
+    await db.commit()
+
+    released = await BlobService.release_many(
+        db, [(CHECKSUM, blob.key), (CHECKSUM, blob.key), (None, "legacy/key")]
+    )
+
+    assert sorted(released) == sorted([blob.key, "legacy/key"])
+    assert await ref_count(db) is None
+
+
+async def test_uploads_of_equal_content_are_stored_once(
+    db: AsyncSession, user: User
+) -> None:
+    first = await upload(db, user, DATA, "a.txt")
+    second = await upload(db, user, DATA, "b.txt")
+
+    assert first.path == second.path
+    assert first.checksum == CHECKSUM
+    assert await ref_count(db) == 2
@@ -0,0 +1,182 @@
+import re
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+import httpx
+import pytest
+from conftest import auth_headers, upload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.app import app
+from src.models.file import File
+from src.models.user import User
+from src.routes import file as file_routes
+from src.routes.file import etag_matches, merge_ranges, parse_range
+from src.storage import storage
+from src.storage.base import StorageBackend
+
+pytestmark = pytest.mark.anyio
+
+DATA = b"0123456789abcdefghij"
+
+
+class RemoteStorage:
+    # The local backend without local paths, like S3: downloads are streamed.
+
+    def __init__(self, backend: StorageBackend) -> None:
+        self._backend = backend
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._backend, name)
+
+
+@pytest.fixture
+async def file(db: AsyncSession, user: User) -> File:
+    return await upload(db, user, DATA)
+
+
+@pytest.fixture(params=["local", "streamed"])
+async def client(
+    request: pytest.FixtureRequest,
+    monkeypatch: pytest.MonkeyPatch,
+    user: User,
+) -> AsyncIterator[httpx.AsyncClient]:
+    # Local files go through FileResponse; other backends are streamed.
+    if request.param == "streamed":
+        monkeypatch.setattr(file_routes, "storage", RemoteStorage(storage))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", headers=auth_headers(user)
+    ) as client:
+        yield client
+
+
+def url(file: File) -> str:
+    return f"/file/{file.id}/download"
+
+
+def byteranges(response: httpx.Response) -> List[Tuple[str, bytes]]:
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/byteranges; boundary=")
+    boundary = content_type.split("boundary=")[1].encode()
+    body = response.content
+    assert body.endswith(b"--" + boundary + b"--")
+    parts = []
+    for raw in body.split(b"--" + boundary)[1:-1]:
+        head, _, content = raw.partition(b"\r\n\r\n")
+        match = re.search(rb"Content-Range: (\S+ \S+)", head)
+        assert match is not None
+        parts.append((match.group(1).decode(), content.removesuffix(b"\r\n")))
+    return parts
+
+
+def test_parse_range() -> None:
+    assert parse_range("bytes=0-3", 20) == [(0, 4)]
+    assert parse_range("bytes=5-", 20) == [(5, 20)]
+    assert parse_range("bytes=-3", 20) == [(17, 20)]
+    assert parse_range("bytes=10-99", 20) == [(10, 20)]
+    assert parse_range("bytes=0-1, 4-5", 20) == [(0, 2), (4, 6)]
+    assert parse_range("items=0-1", 20) is None
+    assert parse_range("bytes=a-b", 20) is None
+
+
+def test_merge_ranges() -> None:
+    assert merge_ranges([(8, 10), (0, 4), (2, 6)]) == [(0, 6), (8, 10)]
+    assert merge_ranges([(0, 4), (4, 6)]) == [(0, 6)]
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+
+
+async def test_download_sends_etag_and_content_type(
+    client: httpx.AsyncClient, file: File
+) -> None:
+    response = await client.get(url(file))
+
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["etag"]
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "filename*=UTF-8''notes.txt" in response.headers["content-disposition"]
+
+
+async def test_matching_if_none_match_is_not_modified(
+    client: httpx.AsyncClient, file: File
+) -> None:
+    etag = (await client.get(url(file))).headers["etag"]
+
+    response = await client.get(url(file), headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = await client.get(url(file), headers={"if-none-match": '"other"'})
+    assert response.status_code == 200
+
+
+async def test_single_range(client: httpx.AsyncClient, file: File) -> None:
+    response = await client.get(url(file), headers={"range": "bytes=2-5"})
+
+    assert response.status_code == 206
+    assert response.content == DATA[2:6]
+    assert response.headers["content-range"] == "bytes 2-5/20"
+
+
+async def test_multiple_ranges(client: httpx.AsyncClient, file: File) -> None:
+    response = await client.get(url(file), headers={"range": "bytes=0-3,10-11"})
+
+    assert response.status_code == 206
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert byteranges(response) == [
+        ("bytes 0-3/20", DATA[0:4]),
+        ("bytes 10-11/20", DATA[10:12]),
+    ]
+
+
+async def test_unsatisfiable_range(client: httpx.AsyncClient, file: File) -> None:
+    response = await client.get(url(file), headers={"range": "bytes=50-60"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */20"
+
+
+async def test_stale_if_range_sends_the_whole_file(
+    client: httpx.AsyncClient, file: File
+) -> None:
+    response = await client.get(
+        url(file), headers={"range": "bytes=2-5", "if-range": '"stale"'}
+    )
+
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+async def test_matching_if_range_sends_the_range(
+    client: httpx.AsyncClient, file: File
+) -> None:
+    headers = (await client.get(url(file))).headers
+    assert headers["last-modified"].endswith(" GMT")
+
+    for validator in (headers["etag"], headers["last-modified"]):
+        response = await client.get(
+            url(file), headers={"range": "bytes=2-5", "if-range": validator}
+        )
+        assert response.status_code == 206
+        assert response.content == DATA[2:6]
+
+
+async def test_stale_if_range_date_sends_the_whole_file(
+    client: httpx.AsyncClient, file: File
+) -> None:
+    response = await client.get(
+        url(file),
+        headers={"range": "bytes=2-5", "if-range": "Thu, 01 Jan 2026 00:00:00 GMT"},
+    )
+
+    assert response.status_code == 200
+    assert response.content == DATA
@@ -0,0 +1,148 @@
+import uuid
+from typing import Any, Dict, List
+
+import pytest
+from conftest import create_user, upload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.blob import Blob
+from src.models.file import File
+from src.models.user import User, UserRole
+from src.schemas.file import FileBatchResult, FileBatchStatus
+from src.services.exceptions import SomethingWrongExc
+from src.services.file import FileService
+
+pytestmark = pytest.mark.anyio
+
+
+def statuses(results: List[FileBatchResult]) -> Dict[str, FileBatchStatus]:
+    return {str(result.id): result.status for result in results}
+
+
+async def test_delete_many_reports_a_status_per_id(
+    db: AsyncSession, user: User, other_user: User
+) -> None:
+    own = await upload(db, user, b"own")
+    foreign = await upload(db, other_user, b"foreign")
+    missing = str(uuid.uuid4())
+
+    results = await FileService.delete_many(
+        db, [str(own.id), str(foreign.id), missing], user
+    )
+
+    assert statuses(results) == {
+        str(own.id): FileBatchStatus.OK,
+        str(foreign.id): FileBatchStatus.ACCESS_DENIED,
+        missing: FileBatchStatus.NOT_FOUND,
+    }
+    await db.refresh(own)
+    await db.refresh(foreign)
+    assert own.deleted_at is not None
+    assert foreign.deleted_at is None
+
+
+async def test_deleting_again_keeps_the_purge_deadline(
+    db: AsyncSession, user: User
+) -> None:
+    file = await upload(db, user, b"data")
+    await FileService.delete_many(db, [str(file.id)], user)
+    await db.refresh(file)
+    deleted_at = file.deleted_at
+
+    results = await FileService.delete_many(db, [str(file.id)], user)
+
+    assert statuses(results) == {str(file.id): FileBatchStatus.ALREADY_DELETED}
+    await db.refresh(file)
+    assert file.deleted_at == deleted_at
+
+
+async def test_restore_many_reports_a_status_per_id(
+    db: AsyncSession, user: User
+) -> None:
+    deleted = await upload(db, user, b"deleted")
+    live = await upload(db, user, b"live")
+    await FileService.delete_many(db, [str(deleted.id)], user)
+
+    results = await FileService.restore_many(db, [str(deleted.id), str(live.id)], user)
+
+    assert statuses(results) == {
+        str(deleted.id): FileBatchStatus.OK,
+        str(live.id): FileBatchStatus.NOT_DELETED,
+    }
+    await db.refresh(deleted)
+    assert deleted.deleted_at is None
+
+
+async def test_failed_restore_rolls_back(
+    db: AsyncSession, user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    file = await upload(db, user, b"data")
+    file_id = str(file.id)
+    await FileService.delete_many(db, [file_id], user)
+
+    async def fail(*args: Any, **kwargs: Any) -> None:
+        raise RuntimeError("connection lost")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db, "commit", fail)
+        with pytest.raises(SomethingWrongExc):
+            await FileService.restore_many(db, [file_id], user)
+
+    # The session is usable again and the row is still deleted.
+    result = await db.execute(select(File.deleted_at).where(File.id == file_id))
+    assert result.scalar_one() is not None
+
+
+async def test_hard_delete_releases_usage_and_shared_blobs(
+    db: AsyncSession, user: User
+) -> None:
+    first = await upload(db, user, b"same", "a.txt")
+    second = await upload(db, user, b"same", "b.txt")
+
+    results = await FileService.delete_many(db, [str(first.id)], user, is_hard=True)
+
+    assert statuses(results) == {str(first.id): FileBatchStatus.OK}
+    await db.refresh(user)
+    assert (user.used_bytes, user.file_count) == (4, 1)
+    blob = await db.get(Blob, second.checksum)
+    assert blob is not None and blob.ref_count == 1
+
+    await FileService.delete_many(db, [str(second.id)], user, is_hard=True)
+    db.expire_all()
+    assert await db.get(Blob, second.checksum) is None
+    assert await db.get(File, second.id) is None
+
+
+async def test_get_many_hides_deleted_files_unless_asked(
+    db: AsyncSession, user: User
+) -> None:
+    admin = await create_user(db, UserRole.ADMIN)
+    live = await upload(db, user, b"live", "a.txt")
+    deleted = await upload(db, user, b"deleted", "b.txt")
+    await FileService.delete_many(db, [str(deleted.id)], user)
+    ids = [str(live.id), str(deleted.id)]
+
+    for viewer in (user, admin):
+        files, missing = await FileService.get_many(db, ids, viewer)
+        assert [file.id for file in files] == [live.id]
+        assert missing == [str(deleted.id)]
+
+    files, missing = await FileService.get_many(db, ids, admin, include_deleted=True)
+    assert [file.id for file in files] == [live.id, deleted.id]
+    assert missing == []
+
+
+async def test_deleting_one_file_again_keeps_the_purge_deadline(
+    db: AsyncSession, user: User
+) -> None:
+    file = await upload(db, user, b"data")
+    await FileService.delete_by_id(db, str(file.id), user)
+    await db.refresh(file)
+    deleted_at = file.deleted_at
+    assert deleted_at is not None
+
+    await FileService.delete_by_id(db, str(file.id), user)
+
+    await db.refresh(file)
+    assert file.deleted_at == deleted_at
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from conftest import upload
+from sqlalchemy import Delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.models.file import File
+from src.models.user import User
+from src.services.maintenance import MaintenanceService
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def no_pause(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings.maintenance, "batch_pause_seconds", 0)
+
+
+async def expire(db: AsyncSession, file: File) -> None:
+    deleted_at = datetime.utcnow() - timedelta(
+        days=settings.maintenance.retention_days + 1
+    )
+    await db.execute(
+        update(File).where(File.id == file.id).values(deleted_at=deleted_at)
+    )
+    await db.commit()
+
+
+async def test_purge_removes_files_past_retention(db: AsyncSession, user: User) -> None:
+    expired = await upload(db, user, b"expired", "a.txt")
+    recent = await upload(db, user, b"recent", "b.txt")
+    await upload(db, user, b"live", "c.txt")
+    await expire(db, expired)
+    await db.execute(
+        update(File).where(File.id == recent.id).values(deleted_at=datetime.utcnow())
+    )
+    await db.commit()
+
+    assert await MaintenanceService.purge_deleted(db) == 1
+
+    await db.refresh(user)
+    assert (user.used_bytes, user.file_count) == (10, 2)
+
+
+async def test_purge_skips_files_restored_meanwhile(
+    db: AsyncSession, user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    restored = await upload(db, user, b"restored", "a.txt")
+    expired = await upload(db, user, b"expired", "b.txt")
+    restored_id = restored.id
+    await expire(db, restored)
+    await expire(db, expired)
+    execute = db.execute
+
+    async def restore_first(statement: Any, *args: Any, **kwargs: Any) -> Any:
+        # The restore lands between the purge's SELECT and its DELETE.
+        if isinstance(statement, Delete):
+            await execute(
+                update(File).where(File.id == restored_id).values(deleted_at=None)
+            )
+        return await execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db, "execute", restore_first)
+
+    assert await MaintenanceService.purge_deleted(db) == 1
+    monkeypatch.undo()
+    assert await db.get(File, restored_id) is not None
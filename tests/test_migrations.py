@@ -0,0 +1,110 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from conftest import DB_PATH, ROOT, reset_storage
+from sqlalchemy import update
+
+from src.models.base import async_session, engine
+from src.models.released_object import ReleasedObject
+from src.models.schema import check_schema
+from src.services.blob import BLOBS_PREFIX
+from src.services.maintenance import MaintenanceService
+
+# Alembic runs its own event loop, so these tests are synchronous.
+
+
+@pytest.fixture
+def alembic_config() -> Iterator[Config]:
+    reset_storage()
+    yield Config(str(Path(__file__).parents[1] / "alembic.ini"))
+    reset_storage()
+
+
+def put_object(key: str, data: bytes) -> None:
+    path = ROOT / "storage" / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+async def verify_schema() -> None:
+    try:
+        await check_schema()
+    finally:
+        await engine.dispose()
+
+
+async def sweep_released() -> int:
+    try:
+        async with async_session() as db:
+            await db.execute(
+                update(ReleasedObject).values(
+                    released_at=datetime.utcnow() - timedelta(days=30)
+                )
+            )
+            await db.commit()
+            return await MaintenanceService.remove_released(db)
+    finally:
+        await engine.dispose()
+
+
+def test_head_matches_the_models(alembic_config: Config) -> None:
+    command.upgrade(alembic_config, "head")
+
+    command.check(alembic_config)
+    asyncio.run(verify_schema())
+    # alembic check skips expression indexes, which SQLite table copies lose.
+    with sqlite3.connect(DB_PATH) as conn:
+        indexes = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        ).fetchall()
+    assert ("ix_files_user_id_filename_lower",) in indexes
+
+
+def test_downgrade_to_base_and_back(alembic_config: Config) -> None:
+    command.upgrade(alembic_config, "head")
+    command.downgrade(alembic_config, "base")
+    command.upgrade(alembic_config, "head")
+
+    command.check(alembic_config)
+
+
+def test_upgrade_from_the_baseline_schema(
+    alembic_config: Config, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    command.upgrade(alembic_config, "0001")
+    put_object("user-1/a.txt", b"hello")
+    put_object("user-1/b.txt", b"hello, world")
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute("INSERT INTO users (id, role) VALUES ('user-1', 'CLIENT')")
+        conn.executemany(
+            "INSERT INTO files (id, user_id, filename, size, format, path, "
+            "deleted_at) VALUES (?, 'user-1', ?, ?, 'txt', ?, ?)",
+            [
+                ("file-1", "a.txt", 5, "user-1/a.txt", None),
+                ("file-2", "b.txt", 12, "user-1/b.txt", "2026-01-01 00:00:00"),
+            ],
+        )
+
+    command.upgrade(alembic_config, "head")
+
+    with sqlite3.connect(DB_PATH) as conn:
+        usage = conn.execute("SELECT used_bytes, file_count FROM users").fetchone()
+        files = conn.execute("SELECT path, checksum FROM files ORDER BY id").fetchall()
+        released = conn.execute("SELECT key FROM released_objects").fetchall()
+    # Soft-deleted files keep their bytes until purged, so they count.
+    assert usage == (17, 2)
+    assert all(path.startswith(BLOBS_PREFIX) and checksum for path, checksum in files)
+    assert sorted(released) == [("user-1/a.txt",), ("user-1/b.txt",)]
+    # Old keys stay readable until the maintenance sweep removes them.
+    assert (ROOT / "storage" / "user-1" / "a.txt").exists()
+
+    monkeypatch.setattr("src.config.settings.maintenance.batch_pause_seconds", 0)
+    assert asyncio.run(sweep_released()) == 2
+    assert not (ROOT / "storage" / "user-1" / "a.txt").exists()
+    assert all((ROOT / "storage" / path).exists() for path, _ in files)
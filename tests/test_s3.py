@@ -0,0 +1,264 @@
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+from xml.etree import ElementTree
+
+import httpx
+import pytest
+
+from src.services.exceptions import SomethingWrongExc
+from src.storage.s3 import S3Backend
+
+pytestmark = pytest.mark.anyio
+
+BUCKET = "files"
+PART_SIZE = 8
+MODIFIED = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeS3:
+    # Just enough of the S3 API, kept in memory, to run the driver against.
+
+    def __init__(self, page_size: int = 2) -> None:
+        self.objects: Dict[str, bytes] = {}
+        self.uploads: Dict[str, Dict[int, bytes]] = {}
+        self.requests: List[Tuple[str, str, Dict[str, str]]] = []
+        self.page_size = page_size
+        self.fail_parts = False
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert re.match(
+            r"AWS4-HMAC-SHA256 Credential=key/\d{8}/us-east-1/s3/aws4_request, "
+            r"SignedHeaders=\S*host;\S*x-amz-date\S*, Signature=[0-9a-f]{64}$",
+            request.headers["authorization"],
+        )
+        raw_path = request.url.raw_path.decode()
+        path, _, query = raw_path.partition("?")
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        prefix = f"/{BUCKET}"
+        assert path.startswith(prefix)
+        key = unquote(path[len(prefix) + 1 :])
+        self.requests.append((request.method, key, params))
+
+        if not key:
+            return self.list(params)
+        if request.method == "POST" and "uploads" in params:
+            upload_id = f"upload-{len(self.uploads) + 1}"
+            self.uploads[upload_id] = {}
+            return self.xml(f"<UploadId>{upload_id}</UploadId>")
+        if request.method == "POST":
+            parts = self.uploads.pop(params["uploadId"])
+            document = ElementTree.fromstring(request.content)
+            numbers = [int(str(part.findtext("PartNumber"))) for part in document]
+            assert numbers == sorted(parts)
+            self.objects[key] = b"".join(parts[number] for number in numbers)
+            return self.xml(f"<Key>{key}</Key>")
+        if request.method == "PUT" and "partNumber" in params:
+            if self.fail_parts:
+                return httpx.Response(
+                    500, content=b"<Error><Code>InternalError</Code></Error>"
+                )
+            number = int(params["partNumber"])
+            self.uploads[params["uploadId"]][number] = request.content
+            return httpx.Response(200, headers={"etag": f'"part-{number}"'})
+        if request.method == "PUT" and "x-amz-copy-source" in request.headers:
+            source = unquote(request.headers["x-amz-copy-source"])
+            assert source.startswith(f"{prefix}/")
+            data = self.objects.get(source[len(prefix) + 1 :])
+            if data is None:
+                return self.xml("<Code>NoSuchKey</Code>", 404)
+            self.objects[key] = data
+            return self.xml("<ETag>copied</ETag>")
+        if request.method == "PUT":
+            self.objects[key] = request.content
+            return httpx.Response(200)
+        if request.method == "DELETE" and "uploadId" in params:
+            self.uploads.pop(params["uploadId"], None)
+            return httpx.Response(204)
+        if request.method == "DELETE":
+            self.objects.pop(key, None)
+            return httpx.Response(204)
+
+        data = self.objects.get(key)
+        if data is None:
+            return httpx.Response(404)
+        headers = {"last-modified": format_datetime(MODIFIED, usegmt=True)}
+        if request.method == "HEAD":
+            return httpx.Response(
+                200, headers={**headers, "content-length": str(len(data))}
+            )
+        match = re.match(r"bytes=(\d+)-(\d*)$", request.headers.get("range", ""))
+        if match is None:
+            return httpx.Response(200, headers=headers, content=data)
+        start, end = int(match[1]), int(match[2] or len(data) - 1)
+        return httpx.Response(206, headers=headers, content=data[start : end + 1])
+
+    def list(self, params: Dict[str, str]) -> httpx.Response:
+        assert params["list-type"] == "2"
+        keys = sorted(key for key in self.objects if key.startswith(params["prefix"]))
+        start = int(params.get("continuation-token", 0))
+        end = start + self.page_size
+        contents = "".join(
+            f"<Contents><Key>{key}</Key><Size>{len(self.objects[key])}</Size>"
+            f"<LastModified>{MODIFIED.isoformat().replace('+00:00', 'Z')}"
+            "</LastModified></Contents>"
+            for key in keys[start:end]
+        )
+        token = (
+            f"<NextContinuationToken>{end}</NextContinuationToken>"
+            if end < len(keys)
+            else ""
+        )
+        return self.xml(f"{contents}{token}", root="ListBucketResult")
+
+    @staticmethod
+    def xml(body: str, status_code: int = 200, root: str = "Result") -> httpx.Response:
+        return httpx.Response(
+            status_code,
+            content=(
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                f'<{root} xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f"{body}</{root}>"
+            ).encode(),
+        )
+
+
+@pytest.fixture
+def fake() -> FakeS3:
+    return FakeS3()
+
+
+@pytest.fixture
+async def backend(fake: FakeS3) -> AsyncIterator[S3Backend]:
+    backend = S3Backend(
+        endpoint="http://s3.test",
+        bucket=BUCKET,
+        region="us-east-1",
+        access_key="key",
+        secret_key="secret",
+        part_size=PART_SIZE,
+        transport=httpx.MockTransport(fake),
+    )
+    yield backend
+    await backend.close()
+
+
+async def put(backend: S3Backend, key: str, data: bytes, chunk: int = 3) -> None:
+    async with backend.writer(key) as writer:
+        for start in range(0, len(data), chunk):
+            await writer.write(data[start : start + chunk])
+
+
+async def read(
+    backend: S3Backend, key: str, start: int = 0, end: Optional[int] = None
+) -> bytes:
+    return b"".join([chunk async for chunk in backend.read(key, start, end)])
+
+
+def methods(fake: FakeS3) -> List[Tuple[str, bool]]:
+    return [(method, "uploadId" in params) for method, _, params in fake.requests]
+
+
+async def test_small_objects_are_put_at_once(backend: S3Backend, fake: FakeS3) -> None:
+    data = b"x" * (PART_SIZE - 1)
+    await put(backend, "blobs/a", data)
+
+    assert fake.objects["blobs/a"] == data
+    assert methods(fake) == [("PUT", False)]
+
+
+async def test_objects_of_a_part_or_more_use_multipart(
+    backend: S3Backend, fake: FakeS3
+) -> None:
+    await put(backend, "blobs/one", b"y" * PART_SIZE)
+    assert fake.objects["blobs/one"] == b"y" * PART_SIZE
+    fake.requests.clear()
+
+    data = bytes(range(PART_SIZE * 2 + 5))
+    await put(backend, "blobs/three", data)
+
+    assert fake.objects["blobs/three"] == data
+    assert methods(fake) == [
+        ("POST", False),
+        ("PUT", True),
+        ("PUT", True),
+        ("PUT", True),
+        ("POST", True),
+    ]
+    assert fake.uploads == {}
+
+
+async def test_failed_upload_aborts_the_multipart_upload(
+    backend: S3Backend, fake: FakeS3
+) -> None:
+    with pytest.raises(RuntimeError):
+        async with backend.writer("blobs/a") as writer:
+            await writer.write(b"z" * PART_SIZE)
+            raise RuntimeError("client went away")
+
+    assert fake.requests[-1][0] == "DELETE" and "uploadId" in fake.requests[-1][2]
+    assert fake.uploads == {} and fake.objects == {}
+
+
+async def test_failed_part_aborts_the_multipart_upload(
+    backend: S3Backend, fake: FakeS3
+) -> None:
+    await put(backend, "blobs/a", b"z" * PART_SIZE)
+    fake.fail_parts = True
+
+    with pytest.raises(SomethingWrongExc):
+        await put(backend, "blobs/b", b"z" * PART_SIZE * 2)
+
+    assert fake.uploads == {}
+    assert "blobs/b" not in fake.objects
+
+
+async def test_ranged_read(backend: S3Backend, fake: FakeS3) -> None:
+    fake.objects["blobs/a"] = b"0123456789"
+
+    assert await read(backend, "blobs/a") == b"0123456789"
+    assert await read(backend, "blobs/a", 2, 5) == b"234"
+    assert await read(backend, "blobs/a", 7) == b"789"
+
+
+async def test_reading_a_missing_key_fails(backend: S3Backend) -> None:
+    with pytest.raises(SomethingWrongExc):
+        await read(backend, "blobs/missing")
+
+
+async def test_stat(backend: S3Backend, fake: FakeS3) -> None:
+    fake.objects["blobs/a"] = b"0123456789"
+
+    stat = await backend.stat("blobs/a")
+
+    assert stat is not None
+    assert (stat.size, stat.modified_at) == (10, MODIFIED.timestamp())
+    assert await backend.stat("blobs/missing") is None
+
+
+async def test_rename_quotes_the_copy_source(backend: S3Backend, fake: FakeS3) -> None:
+    key = "legacy/user 1/отчёт+v2.pdf"
+    fake.objects[key] = b"report"
+
+    await backend.rename(key, "blobs/report")
+
+    assert fake.objects == {"blobs/report": b"report"}
+    with pytest.raises(SomethingWrongExc):
+        await backend.rename(key, "blobs/again")
+
+
+async def test_list_follows_continuation_tokens(
+    backend: S3Backend, fake: FakeS3
+) -> None:
+    for name in ("a", "b", "c", "d", "e"):
+        fake.objects[f"blobs/{name}"] = name.encode() * 2
+    fake.objects["tmp/x"] = b"x"
+
+    listed = [(key, stat.size) async for key, stat in backend.list("blobs/")]
+
+    assert listed == [(f"blobs/{name}", 2) for name in "abcde"]
+    pages = [params for method, key, params in fake.requests if not key]
+    assert len(pages) == 3
+    assert "continuation-token" not in pages[0]
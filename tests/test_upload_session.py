@@ -0,0 +1,111 @@
+import hashlib
+import os
+
+import pytest
+from conftest import chunks
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.models.upload_session import UploadSession
+from src.models.user import User
+from src.schemas.upload_session import UploadSessionCreate
+from src.services.exceptions import BadRequestExc
+from src.services.upload_session import SESSIONS_DIR, UploadSessionService
+from src.storage import storage
+
+pytestmark = pytest.mark.anyio
+
+MB = 1024 * 1024
+PART_SIZE = 5 * MB
+DATA = os.urandom(2 * PART_SIZE + 1000)
+
+
+async def create_session(db: AsyncSession, user: User) -> UploadSession:
+    return await UploadSessionService.create(
+        db,
+        user,
+        UploadSessionCreate(
+            filename="video.bin",
+            content_type="application/octet-stream",
+            size=len(DATA),
+            part_size=PART_SIZE,
+        ),
+    )
+
+
+def part(number: int) -> bytes:
+    return DATA[(number - 1) * PART_SIZE : number * PART_SIZE]
+
+
+async def put_part(
+    db: AsyncSession, session: UploadSession, user: User, number: int
+) -> int:
+    return await UploadSessionService.put_part(
+        db, str(session.id), number, user, chunks(part(number), MB)
+    )
+
+
+async def test_complete_assembles_parts_in_order(db: AsyncSession, user: User) -> None:
+    session = await create_session(db, user)
+    assert session.part_count == 3
+
+    # Parts may arrive in any order.
+    for number in (3, 1, 2):
+        assert await put_part(db, session, user, number) == len(part(number))
+    response = await UploadSessionService.to_response(session)
+    assert response.missing_parts == []
+
+    file = await UploadSessionService.complete(db, str(session.id), user)
+
+    assert file.size == len(DATA)
+    assert file.checksum == hashlib.sha256(DATA).hexdigest()
+    assert file.filename == "video.bin"
+    stored = b"".join([chunk async for chunk in storage.read(str(file.path))])
+    assert stored == DATA
+
+    await db.refresh(user)
+    assert (user.used_bytes, user.file_count) == (len(DATA), 1)
+    assert await db.get(UploadSession, session.id) is None
+    assert not (SESSIONS_DIR / str(session.id)).exists()
+
+
+async def test_complete_refuses_missing_parts(db: AsyncSession, user: User) -> None:
+    session = await create_session(db, user)
+    await put_part(db, session, user, 1)
+    await put_part(db, session, user, 3)
+
+    with pytest.raises(BadRequestExc, match=r"Missing parts: \[2\]"):
+        await UploadSessionService.complete(db, str(session.id), user)
+
+    assert await db.get(UploadSession, session.id) is not None
+
+
+async def test_put_part_checks_the_part_length(db: AsyncSession, user: User) -> None:
+    session = await create_session(db, user)
+
+    with pytest.raises(BadRequestExc, match="Part must be"):
+        await UploadSessionService.put_part(
+            db, str(session.id), 1, user, chunks(b"short")
+        )
+    with pytest.raises(BadRequestExc, match="Part too large"):
+        await UploadSessionService.put_part(
+            db, str(session.id), 3, user, chunks(part(1))
+        )
+
+    response = await UploadSessionService.to_response(session)
+    assert response.missing_parts == [1, 2, 3]
+
+
+async def test_create_refuses_files_over_the_size_limit(
+    db: AsyncSession, user: User
+) -> None:
+    with pytest.raises(BadRequestExc, match="File too large"):
+        await UploadSessionService.create(
+            db,
+            user,
+            UploadSessionCreate(
+                filename="huge.bin",
+                content_type="application/octet-stream",
+                size=settings.file.max_size * MB + 1,
+            ),
+        )
@@ -0,0 +1,107 @@
+from typing import Tuple
+
+import pytest
+from conftest import upload
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.models.user import User
+from src.services.exceptions import BadRequestExc
+from src.services.usage import UsageService
+
+pytestmark = pytest.mark.anyio
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def quota(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings.file, "quota", {"CLIENT": 1})
+
+
+async def usage(db: AsyncSession, user: User) -> Tuple[int, int]:
+    await db.refresh(user)
+    return user.used_bytes, user.file_count
+
+
+async def test_reserve_counts_bytes_and_files(
+    db: AsyncSession, user: User, quota: None
+) -> None:
+    await UsageService.reserve(db, user, MB - 1)
+    await UsageService.reserve(db, user, 1)
+    await db.commit()
+
+    assert await usage(db, user) == (MB, 2)
+
+
+async def test_reserve_over_quota_changes_nothing(
+    db: AsyncSession, user: User, quota: None
+) -> None:
+    await UsageService.reserve(db, user, MB - 1)
+    await db.commit()
+
+    with pytest.raises(BadRequestExc):
+        await UsageService.reserve(db, user, 2)
+    await db.commit()
+
+    assert await usage(db, user) == (MB - 1, 1)
+
+
+async def test_reserve_without_quota_is_unlimited(db: AsyncSession, user: User) -> None:
+    await UsageService.reserve(db, user, 10 * MB)
+    await db.commit()
+
+    assert await usage(db, user) == (10 * MB, 1)
+
+
+async def test_check_rejects_uploads_over_quota(
+    db: AsyncSession, user: User, quota: None
+) -> None:
+    await UsageService.reserve(db, user, MB - 10)
+    await db.commit()
+
+    await UsageService.check(db, user, 10)
+    with pytest.raises(BadRequestExc):
+        await UsageService.check(db, user, 11)
+
+
+async def test_release_groups_files_by_user(
+    db: AsyncSession, user: User, other_user: User
+) -> None:
+    for owner, size in ((user, 5), (user, 7), (other_user, 3)):
+        await UsageService.reserve(db, owner, size)
+    await db.commit()
+
+    await UsageService.release(db, [(user.id, 5), (user.id, 7), (other_user.id, 3)])
+    await db.commit()
+
+    assert await usage(db, user) == (0, 0)
+    assert await usage(db, other_user) == (0, 0)
+
+
+async def test_upload_over_quota_keeps_usage(
+    db: AsyncSession, user: User, quota: None
+) -> None:
+    await UsageService.reserve(db, user, MB - 3)
+    await db.commit()
+
+    with pytest.raises(BadRequestExc):
+        await upload(db, user, b"four")
+
+    assert await usage(db, user) == (MB - 3, 1)
+
+
+async def test_repair_fixes_drifted_counters(
+    db: AsyncSession, user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings.maintenance, "batch_pause_seconds", 0)
+    await upload(db, user, b"hello")
+    await db.execute(
+        update(User).where(User.id == user.id).values(used_bytes=0, file_count=9)
+    )
+    await db.commit()
+
+    assert await UsageService.repair(db) == 1
+    assert await usage(db, user) == (5, 1)
+    assert await UsageService.repair(db) == 0
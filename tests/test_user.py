@@ -0,0 +1,44 @@
+from typing import Iterator
+
+import pytest
+from conftest import upload
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.models.user import User
+from src.schemas.user import UserUpdate
+from src.services.user import UserService, user_cache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(settings.cache, "enabled", True)
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+async def test_cached_users_carry_no_usage_counters(
+    db: AsyncSession, user: User
+) -> None:
+    await UserService.get_active_by_id(db, user.id)
+    await upload(db, user, b"hello")
+
+    cached = await UserService.get_active_by_id(db, user.id)
+
+    assert cached is not None and cached.role == user.role
+    # Stale counters would still read 0 bytes in 0 files here.
+    assert cached.used_bytes is None and cached.file_count is None
+    snapshot = user_cache.get(user.id)
+    assert snapshot is not None and "used_bytes" not in snapshot
+
+
+async def test_updates_invalidate_the_cache(db: AsyncSession, user: User) -> None:
+    await UserService.get_active_by_id(db, user.id)
+
+    await UserService.update_by_id(db, user.id, UserUpdate(name="Renamed"))
+
+    cached = await UserService.get_active_by_id(db, user.id)
+    assert cached is not None and cached.name == "Renamed"